@@ -0,0 +1,278 @@
+import asyncio
+import logging
+import random
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Set
+
+from discord.ext import tasks
+
+from calendar_api import NotConnectedError
+from calendar_sync import sync_employee_schedule
+from metrics import metrics
+from schedule_store import StoredWeek, normalize_name
+from utils.helpers import resolve_sync_calendar
+from utils.rate_limit import TokenBucket
+from utils.shared_db import connect_shared
+
+logger = logging.getLogger(__name__)
+
+AUTO_SYNC_PATH = "data/auto_sync.sqlite3"
+
+# How often the scheduler looks for due syncs, and how many it starts per pass
+AUTO_SYNC_POLL_SECONDS = 30
+AUTO_SYNC_BATCH = 20
+
+# A pass claims its rows for this long, so other bot processes don't run the same syncs
+AUTO_SYNC_LEASE_SECONDS = 600
+
+# Background syncs across all users: one every 3 seconds on average, so a new
+# schedule is spread out instead of hitting the Calendar API all at once
+AUTO_SYNC_RATE = 1 / 3
+
+# Failed syncs are retried with jittered exponential backoff, then dropped
+AUTO_SYNC_MAX_ATTEMPTS = 6
+AUTO_SYNC_BACKOFF_SECONDS = 60.0
+AUTO_SYNC_BACKOFF_MAX_SECONDS = 3600.0
+
+# Recorded as the last error when a subscriber's Google account is unlinked; not retried
+NOT_CONNECTED = "Google account not connected"
+
+def changed_employees(previous: Optional[StoredWeek], week: StoredWeek) -> Set[str]:
+    """Normalized names whose shifts differ between two versions of a week (all of them for a new week)."""
+    def _by_name(stored: Optional[StoredWeek]) -> dict:
+        if stored is None:
+            return {}
+        return {normalize_name(name): stored.shifts.get(name, {}) for name in stored.employees}
+
+    before, after = _by_name(previous), _by_name(week)
+    return {name for name in before.keys() | after.keys() if before.get(name) != after.get(name)}
+
+class AutoSyncScheduler:
+    """
+    Background calendar sync for users who opted in with /auto_sync.
+    Uploads enqueue one pending sync per (user, week) for the employees whose
+    shifts changed; repeated changes coalesce into that row. Pending syncs
+    live in SQLite so they survive restarts, and a discord.ext.tasks loop
+    works through them under a global rate limit, retrying with backoff.
+    """
+
+    def __init__(self, store, path: str = AUTO_SYNC_PATH):
+        self.store = store
+        self.path = path
+        self.limiter = TokenBucket(rate=AUTO_SYNC_RATE, capacity=1)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._loop = tasks.loop(seconds=AUTO_SYNC_POLL_SECONDS)(self._run_due)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = connect_shared(self.path)
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS subscriptions ("
+                " user_id INTEGER NOT NULL,"
+                " guild_id INTEGER NOT NULL,"
+                " employee TEXT NOT NULL,"
+                " norm_name TEXT NOT NULL,"
+                " use_primary INTEGER NOT NULL,"
+                " last_synced_at REAL,"
+                " last_error TEXT,"
+                " PRIMARY KEY (user_id, guild_id));"
+                "CREATE INDEX IF NOT EXISTS subscriptions_by_employee ON subscriptions (guild_id, norm_name);"
+                "CREATE TABLE IF NOT EXISTS pending ("
+                " user_id INTEGER NOT NULL,"
+                " guild_id INTEGER NOT NULL,"
+                " week_key TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " due_at REAL NOT NULL,"
+                " version INTEGER NOT NULL DEFAULT 0,"
+                " PRIMARY KEY (user_id, guild_id, week_key));"
+                "CREATE INDEX IF NOT EXISTS pending_by_due ON pending (due_at);"
+            )
+        return self._conn
+
+    def _subscribe_blocking(self, user_id: int, guild_id: int, employee: str, use_primary: bool):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO subscriptions (user_id, guild_id, employee, norm_name, use_primary)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (user_id, guild_id, employee, normalize_name(employee), int(use_primary)),
+                )
+
+    def _unsubscribe_blocking(self, user_id: int, guild_id: int) -> bool:
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                deleted = conn.execute(
+                    "DELETE FROM subscriptions WHERE user_id = ? AND guild_id = ?", (user_id, guild_id)
+                ).rowcount
+                conn.execute("DELETE FROM pending WHERE user_id = ? AND guild_id = ?", (user_id, guild_id))
+        return deleted > 0
+
+    def _subscription_blocking(self, user_id: int, guild_id: int) -> Optional[dict]:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT employee, use_primary, last_synced_at, last_error FROM subscriptions"
+                " WHERE user_id = ? AND guild_id = ?",
+                (user_id, guild_id),
+            ).fetchone()
+            if row is None:
+                return None
+            pending = conn.execute(
+                "SELECT COUNT(*) FROM pending WHERE user_id = ? AND guild_id = ?", (user_id, guild_id)
+            ).fetchone()[0]
+        return {
+            "employee": row[0],
+            "use_primary": bool(row[1]),
+            "last_synced_at": row[2],
+            "last_error": row[3],
+            "pending": pending,
+        }
+
+    def _enqueue_blocking(self, guild_id: int, week_key: str, names: Set[str], user_id: Optional[int] = None) -> int:
+        """Queue a sync of `week_key` for every subscriber following one of `names` (or just `user_id`)."""
+        with self._lock:
+            conn = self._connect()
+            if user_id is not None:
+                users = [(user_id,)]
+            else:
+                users = conn.execute(
+                    f"SELECT user_id FROM subscriptions WHERE guild_id = ? AND norm_name IN ({','.join('?' * len(names))})",
+                    (guild_id, *names),
+                ).fetchall() if names else []
+
+            now = time.time()
+            with conn:
+                for index, (subscriber,) in enumerate(users):
+                    # Stagger the first attempts. An already-pending sync keeps its place but restarts
+                    # its retries, and the version bump stops an in-flight run from clearing it
+                    conn.execute(
+                        "INSERT INTO pending (user_id, guild_id, week_key, attempts, due_at) VALUES (?, ?, ?, 0, ?)"
+                        " ON CONFLICT (user_id, guild_id, week_key) DO UPDATE SET attempts = 0,"
+                        " due_at = MIN(due_at, excluded.due_at), version = version + 1",
+                        (subscriber, guild_id, week_key, now + index / AUTO_SYNC_RATE),
+                    )
+        return len(users)
+
+    def _due_blocking(self, limit: int) -> List[tuple]:
+        """Claim up to `limit` due syncs by pushing them past the lease."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                # Take the write lock first so two processes can't claim the same rows
+                conn.execute("BEGIN IMMEDIATE")
+                due = conn.execute(
+                    "SELECT p.user_id, p.guild_id, p.week_key, p.attempts, p.version, s.employee, s.use_primary"
+                    " FROM pending p JOIN subscriptions s ON s.user_id = p.user_id AND s.guild_id = p.guild_id"
+                    " WHERE p.due_at <= ? ORDER BY p.due_at LIMIT ?",
+                    (now, limit),
+                ).fetchall()
+                conn.executemany(
+                    "UPDATE pending SET due_at = ? WHERE user_id = ? AND guild_id = ? AND week_key = ?",
+                    [(now + AUTO_SYNC_LEASE_SECONDS, row[0], row[1], row[2]) for row in due],
+                )
+            return due
+
+    def _finish_blocking(self, user_id: int, guild_id: int, week_key: str, attempts: int, version: int,
+                         error: Optional[str], retry_at: Optional[float]):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                # Rows re-queued while this run was in flight (newer version) are left for the next pass
+                if retry_at is None:
+                    conn.execute(
+                        "DELETE FROM pending WHERE user_id = ? AND guild_id = ? AND week_key = ? AND version = ?",
+                        (user_id, guild_id, week_key, version),
+                    )
+                else:
+                    conn.execute(
+                        "UPDATE pending SET attempts = ?, due_at = ?"
+                        " WHERE user_id = ? AND guild_id = ? AND week_key = ? AND version = ?",
+                        (attempts + 1, retry_at, user_id, guild_id, week_key, version),
+                    )
+                conn.execute(
+                    "UPDATE subscriptions SET last_synced_at = CASE WHEN ? IS NULL THEN ? ELSE last_synced_at END,"
+                    " last_error = ? WHERE user_id = ? AND guild_id = ?",
+                    (error, time.time(), error, user_id, guild_id),
+                )
+
+    def start(self):
+        if not self._loop.is_running():
+            self._loop.start()
+
+    def stop(self):
+        self._loop.cancel()
+
+    async def subscribe(self, user_id: int, guild_id: Optional[int], employee: str, use_primary: bool,
+                        week_key: Optional[str] = None):
+        """Opt a user in to background syncs of `employee`, syncing `week_key` right away if given."""
+        await asyncio.to_thread(self._subscribe_blocking, user_id, guild_id or 0, employee, use_primary)
+        if week_key is not None:
+            await asyncio.to_thread(self._enqueue_blocking, guild_id or 0, week_key, set(), user_id)
+
+    async def unsubscribe(self, user_id: int, guild_id: Optional[int]) -> bool:
+        return await asyncio.to_thread(self._unsubscribe_blocking, user_id, guild_id or 0)
+
+    async def subscription(self, user_id: int, guild_id: Optional[int]) -> Optional[dict]:
+        return await asyncio.to_thread(self._subscription_blocking, user_id, guild_id or 0)
+
+    async def schedule_changed(self, previous: Optional[StoredWeek], week: StoredWeek) -> int:
+        """Queue syncs for subscribers of the employees whose shifts changed; returns how many."""
+        names = changed_employees(previous, week)
+        queued = await asyncio.to_thread(self._enqueue_blocking, week.guild_id, week.week_key, names)
+        if queued:
+            logger.info("Queued background syncs: guild=%s week=%s users=%d", week.guild_id, week.week_key, queued)
+        return queued
+
+    async def _run_due(self):
+        try:
+            due = await asyncio.to_thread(self._due_blocking, AUTO_SYNC_BATCH)
+        except Exception:
+            logger.exception("Could not read pending background syncs")
+            return
+
+        for user_id, guild_id, week_key, attempts, version, employee, use_primary in due:
+            # An escaping error would end the tasks.loop for good; the row's lease lets it be retried later
+            try:
+                await self.limiter.acquire()
+                error = await self._sync(user_id, guild_id, week_key, employee, bool(use_primary))
+
+                retry_at = None
+                if error is not None and error != NOT_CONNECTED and attempts + 1 < AUTO_SYNC_MAX_ATTEMPTS:
+                    delay = min(AUTO_SYNC_BACKOFF_MAX_SECONDS, AUTO_SYNC_BACKOFF_SECONDS * 2 ** attempts)
+                    retry_at = time.time() + delay * random.uniform(0.5, 1.0)
+                metrics.inc("auto_sync", result="ok" if error is None else "retry" if retry_at else "failed")
+                await asyncio.to_thread(self._finish_blocking, user_id, guild_id, week_key, attempts, version,
+                                        error, retry_at)
+            except Exception:
+                logger.exception("Background sync bookkeeping failed: user=%s week=%s", user_id, week_key)
+
+    async def _sync(self, user_id: int, guild_id: int, week_key: str, employee: str, use_primary: bool) -> Optional[str]:
+        """Run one background sync; returns an error description, or None on success."""
+        week = await self.store.get_week(guild_id, week_key)
+        if week is None:
+            return None  # the week is gone, so there is nothing to sync
+
+        # Use the week's spelling of the name; an absent employee still clears their old events
+        employee = next((name for name in week.employees if normalize_name(name) == normalize_name(employee)), employee)
+
+        try:
+            with metrics.timer("auto_sync_run"):
+                calendar_id, _ = await resolve_sync_calendar(user_id, use_primary)
+                lines = await sync_employee_schedule(user_id, week, employee, calendar_id)
+        except NotConnectedError:
+            return NOT_CONNECTED
+        except Exception as e:
+            logger.warning("Background sync failed: user=%s week=%s error=%s", user_id, week_key, e)
+            return str(e) or type(e).__name__
+
+        problems = [line for line in lines if line.startswith("⚠️")]
+        if problems:
+            return "; ".join(problems)
+        logger.info("Background sync done: user=%s week=%s employee=%s", user_id, week_key, employee)
+        return None
@@ -0,0 +1,150 @@
+import itertools
+import json
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from email.parser import FeedParser
+from urllib.parse import parse_qs, unquote, urlparse
+
+import httplib2
+
+class FakeCalendarServer:
+    """
+    In-process stand-in for the Google Calendar v3 HTTP API.
+    Supports the endpoints calendar_api uses (calendarList, calendars,
+    events list/insert/patch/delete and batch requests), adds `latency`
+    seconds per HTTP round trip, and answers a `rate_limit_ratio` share of
+    requests with 429 so retry paths get exercised.
+    """
+
+    def __init__(self, latency: float = 0.05, rate_limit_ratio: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.rate_limit_ratio = rate_limit_ratio
+        self.calls = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._calendars = {"primary": {"id": "primary", "summary": "Primary", "primary": True}}
+        self._events = defaultdict(dict)  # calendar_id -> {event_id: event}
+
+    def transport(self):
+        """Factory matching httplib2.Http for calendar_api.transport_factory."""
+        return _FakeHttp(self)
+
+    def _rate_limited(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.rate_limit_ratio
+
+    def handle(self, method: str, uri: str, body, headers: dict):
+        """Serve one HTTP request; returns (status, content_type, body bytes)."""
+        time.sleep(self.latency)
+        parsed = urlparse(uri)
+        if parsed.path.startswith("/batch/"):
+            self.calls["batch"] += 1
+            return self._handle_batch(body, headers)
+        return self._dispatch(method, parsed.path, parse_qs(parsed.query), body)
+
+    def _dispatch(self, method: str, path: str, query: dict, body):
+        parts = [unquote(p) for p in path.split("/") if p][2:]  # drop "calendar", "v3"
+        endpoint = f"{method} {'/'.join(p if i % 2 == 0 else '*' for i, p in enumerate(parts))}"
+        self.calls[endpoint] += 1
+
+        if self._rate_limited():
+            self.calls["429"] += 1
+            error = {"error": {"code": 429, "message": "Rate Limit Exceeded",
+                               "errors": [{"reason": "rateLimitExceeded"}]}}
+            return 429, "application/json", json.dumps(error).encode("utf-8")
+
+        payload = json.loads(body) if body else {}
+        with self._lock:
+            status, result = self._route(method, parts, query, payload)
+        return status, "application/json", json.dumps(result).encode("utf-8") if result is not None else b""
+
+    def _route(self, method, parts, query, payload):
+        if parts[:2] == ["users", "me"]:
+            return 200, {"items": list(self._calendars.values()), "nextSyncToken": "sync"}
+
+        if parts == ["calendars"] and method == "POST":
+            calendar_id = f"cal{next(self._ids)}"
+            self._calendars[calendar_id] = dict(payload, id=calendar_id)
+            return 200, self._calendars[calendar_id]
+
+        calendar_id = parts[1]
+        if len(parts) == 2:
+            return 200, self._calendars.get(calendar_id, {"id": calendar_id})
+
+        events = self._events[calendar_id]
+        if len(parts) == 3 and method == "GET":
+            return 200, {"items": self._list_events(events, query)}
+        if len(parts) == 3 and method == "POST":
+            event_id = f"ev{next(self._ids)}"
+            events[event_id] = dict(payload, id=event_id, htmlLink=f"https://calendar.test/{event_id}")
+            return 200, events[event_id]
+
+        event_id = parts[3]
+        if event_id not in events:
+            return 404, {"error": {"code": 404, "message": "Not Found"}}
+        if method == "PATCH":
+            events[event_id].update(payload)
+            return 200, events[event_id]
+        if method == "DELETE":
+            del events[event_id]
+            return 204, None
+        return 200, events[event_id]
+
+    @staticmethod
+    def _list_events(events: dict, query: dict):
+        wanted = [item.split("=", 1) for item in query.get("privateExtendedProperty", [])]
+        time_min = query.get("timeMin", [None])[0]
+        time_max = query.get("timeMax", [None])[0]
+        items = []
+        for event in events.values():
+            private = event.get("extendedProperties", {}).get("private", {})
+            if any(private.get(key) != value for key, value in wanted):
+                continue
+            # Offsets are all the same in the benchmark, so ISO strings compare correctly
+            if time_min and event["end"]["dateTime"] < time_min:
+                continue
+            if time_max and event["start"]["dateTime"] > time_max:
+                continue
+            items.append(event)
+        return items
+
+    def _handle_batch(self, body, headers):
+        content_type = headers.get("content-type") or headers.get("Content-Type")
+        if isinstance(body, bytes):
+            body = body.decode("utf-8")
+        parser = FeedParser()
+        parser.feed(f"content-type: {content_type}\r\n\r\n{body}")
+        message = parser.close()
+
+        boundary = "fake_batch_boundary"
+        chunks = []
+        for part in message.get_payload():
+            request_line, rest = part.get_payload().replace("\r\n", "\n").split("\n", 1)
+            method, target, _ = request_line.split(" ", 2)
+            inner_body = rest.split("\n\n", 1)[1] if "\n\n" in rest else ""
+            parsed = urlparse(target)
+            status, inner_type, content = self._dispatch(method, parsed.path, parse_qs(parsed.query), inner_body)
+            content_id = part["Content-ID"].replace("<", "<response-", 1)
+            chunks.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: {content_id}\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status < 300 else 'Error'}\r\nContent-Type: {inner_type}\r\n\r\n"
+                f"{content.decode('utf-8')}\r\n"
+            )
+        chunks.append(f"--{boundary}--\r\n")
+        return 200, f"multipart/mixed; boundary={boundary}", "".join(chunks).encode("utf-8")
+
+class _FakeHttp:
+    """Just enough of httplib2.Http for googleapiclient and google_auth_httplib2."""
+
+    def __init__(self, server: FakeCalendarServer):
+        self.server = server
+        self.timeout = None
+        self.redirect_codes = frozenset()
+
+    def request(self, uri, method="GET", body=None, headers=None, redirections=5, connection_type=None):
+        status, content_type, content = self.server.handle(method, uri, body, headers or {})
+        response = httplib2.Response({"status": status, "content-type": content_type})
+        return response, content
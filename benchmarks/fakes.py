@@ -0,0 +1,118 @@
+import asyncio
+import itertools
+from types import SimpleNamespace
+from typing import List, Optional
+
+from discord_view import ConfirmView
+from schedule_models import Employee, Schedule, Week
+
+class FakeMessage:
+    """Message returned by followup.send(wait=True); edits are recorded."""
+
+    def __init__(self, content: Optional[str]):
+        self.content = content
+        self.edits: List[str] = []
+
+    async def edit(self, content: Optional[str] = None, **kwargs):
+        self.content = content
+        self.edits.append(content)
+
+class FakeResponse:
+    """interaction.response: records the first reply and answers confirm prompts."""
+
+    def __init__(self, interaction, confirm: bool):
+        self._interaction = interaction
+        self._confirm = confirm
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def defer(self, **kwargs):
+        self._done = True
+
+    async def send_message(self, content: Optional[str] = None, view=None, **kwargs):
+        self._done = True
+        self._interaction.sent.append(content)
+        if isinstance(view, ConfirmView):
+            # Click straight away, as the user would
+            view.value = self._confirm
+            view.stop()
+
+    async def edit_message(self, content: Optional[str] = None, **kwargs):
+        self._interaction.sent.append(content)
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self._interaction = interaction
+
+    async def send(self, content: Optional[str] = None, wait: bool = False, view=None, **kwargs):
+        self._interaction.sent.append(content)
+        if isinstance(view, ConfirmView):
+            view.value = self._interaction.response._confirm
+            view.stop()
+        return FakeMessage(content)
+
+class FakeChannel:
+    def typing(self):
+        return _NullTyping()
+
+class _NullTyping:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+class FakeInteraction:
+    """
+    Just enough of discord.Interaction to call a slash command callback
+    directly. Every message the bot sends is kept in `sent`.
+    """
+    _ids = itertools.count(1)
+
+    def __init__(self, guild_id: int, user_id: int, confirm: bool = False, **namespace):
+        self.id = next(self._ids)
+        self.guild_id = guild_id
+        self.user = SimpleNamespace(id=user_id, name=f"user{user_id}")
+        self.channel = FakeChannel()
+        self.namespace = SimpleNamespace(**namespace)
+        self.response = FakeResponse(self, confirm)
+        self.followup = FakeFollowup(self)
+        self.sent: List[Optional[str]] = []
+
+class FakeAttachment:
+    def __init__(self, url: str, content_type: str = "image/png"):
+        self.url = url
+        self.content_type = content_type
+        self.filename = url.rsplit("/", 1)[-1]
+
+class FakeGemini:
+    """
+    Canned stand-in for genai.Client: generate_content sleeps for `latency`
+    seconds and returns the same week of `employee_count` generated employees.
+    """
+
+    def __init__(self, employee_count: int = 20, latency: float = 1.0):
+        self.latency = latency
+        self.calls = 0
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content=self._generate_content))
+        self.schedule = Schedule(
+            week=Week(**{"from": "01/06/2025", "to": "01/12/2025"}),
+            employees=[_employee(index) for index in range(employee_count)],
+        )
+
+    async def _generate_content(self, model: str, contents, config=None):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return SimpleNamespace(parsed=self.schedule)
+
+def employee_name(index: int) -> str:
+    return f"Employee {index:03d}"
+
+def _employee(index: int) -> Employee:
+    slots = ["9:00 AM - 5:00 PM", "1-9", None, "10 AM - 2 PM, 5 PM - 9 PM", "PTO", "11pm-7am", None]
+    days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+    return Employee(name=employee_name(index), **{
+        day: slots[(index + offset) % len(slots)] for offset, day in enumerate(days)
+    })
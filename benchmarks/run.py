@@ -0,0 +1,236 @@
+"""
+Offline benchmark for the bot's slash commands.
+
+Drives /new_schedule, /schedule and /sync_calendar through their real
+callbacks against in-process fakes of Discord, Google Calendar and Gemini,
+then reports latency percentiles, event-loop lag and API call counts.
+
+    python -m benchmarks.run --concurrency 10 --iterations 50
+"""
+import argparse
+import asyncio
+import io
+import logging
+import os
+import random
+import tempfile
+import time
+from typing import Dict, List
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+if "TOKEN_ENCRYPTION_KEY" not in os.environ:
+    from cryptography.fernet import Fernet
+    os.environ["TOKEN_ENCRYPTION_KEY"] = Fernet.generate_key().decode("ascii")
+
+import discord
+from aiohttp import web
+from google.oauth2.credentials import Credentials
+from PIL import Image, ImageDraw
+
+import calendar_api
+from auto_sync import AutoSyncScheduler
+from benchmarks.fake_calendar import FakeCalendarServer
+from benchmarks.fakes import FakeAttachment, FakeGemini, FakeInteraction, employee_name
+from commands.new_schedule_command import setup_new_schedule_command
+from commands.schedule_command import setup_schedule_command
+from commands.sync_calendar_command import setup_sync_calendar_command
+from credential_store import CredentialStore
+from discord_bot import DiscordBot
+from metrics import LoopLagMonitor
+from schedule_cache import ExtractionCache
+from schedule_store import ScheduleStore
+
+GUILD = discord.Object(id=1)
+FIRST_USER_ID = 1000
+UPLOAD_PARAMETERS = ("schedule", "page_2", "page_3", "page_4")
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile; 0 for no samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+class _LagSamples:
+    """Registry stand-in for metrics.LoopLagMonitor that keeps raw samples for exact percentiles."""
+
+    def __init__(self):
+        self.samples: List[float] = []
+
+    def observe(self, name: str, seconds: float, **labels):
+        self.samples.append(seconds)
+
+def _make_image(index: int, size: int) -> bytes:
+    """A distinct PNG per index, so every upload misses the extraction cache."""
+    rng = random.Random(index)
+    image = Image.new("RGB", (size, size * 3 // 4), "white")
+    draw = ImageDraw.Draw(image)
+    for row in range(0, image.height, 24):
+        draw.line([(0, row), (image.width, row)], fill=(200, 200, 200))
+        draw.text((8, row + 4), f"{index}-{rng.random():.6f}", fill="black")
+    encoded = io.BytesIO()
+    image.save(encoded, format="PNG")
+    return encoded.getvalue()
+
+async def _serve_images(count: int, size: int):
+    images = await asyncio.to_thread(lambda: [_make_image(i, size) for i in range(count)])
+
+    async def handler(request):
+        body = images[int(request.match_info["index"])]
+        return web.Response(body=body, content_type="image/png")
+
+    app = web.Application()
+    app.router.add_get("/images/{index}.png", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}/images"
+
+async def _drive(name: str, calls, concurrency: int, results: Dict[str, dict]):
+    """Run the coroutine factories in `calls` with bounded concurrency, timing each one."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def timed(call):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await call()
+            except Exception as e:
+                errors += 1
+                print(f"{name} failed: {e!r}")
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(timed(call) for call in calls))
+    results[name] = {
+        "count": len(latencies),
+        "errors": errors,
+        "wall": time.perf_counter() - started,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+    }
+
+async def run(args) -> dict:
+    workdir = tempfile.TemporaryDirectory(prefix="schedbot-bench-")
+    calendar = FakeCalendarServer(latency=args.calendar_latency, rate_limit_ratio=args.rate_limit_ratio)
+    gemini = FakeGemini(employee_count=args.employees, latency=args.gemini_latency)
+
+    calendar_api.transport_factory = calendar.transport
+    calendar_api.credential_store = CredentialStore(path=os.path.join(workdir.name, "credentials.sqlite3"),
+                                                    scopes=calendar_api.SCOPES)
+    calendar_api.BACKOFF_BASE_SECONDS = args.backoff_base
+    if args.no_rate_limit:
+        calendar_api.RATE_LIMIT_PER_SECOND = 1e9
+
+    bot = DiscordBot(command_prefix="!", intents=discord.Intents.default())
+    bot.store = ScheduleStore(path=os.path.join(workdir.name, "schedules.sqlite3"))
+    bot.auto_sync = AutoSyncScheduler(bot.store, path=os.path.join(workdir.name, "auto_sync.sqlite3"))
+    bot.processor.client = gemini
+    bot.processor.cache = ExtractionCache(path=os.path.join(workdir.name, "extraction_cache.sqlite3"))
+    setup_new_schedule_command(bot, GUILD)
+    setup_schedule_command(bot, GUILD)
+    setup_sync_calendar_command(bot, GUILD)
+    new_schedule = bot.tree.get_command("new_schedule", guild=GUILD).callback
+    schedule = bot.tree.get_command("schedule", guild=GUILD).callback
+    sync_calendar = bot.tree.get_command("sync_calendar", guild=GUILD).callback
+
+    users = range(FIRST_USER_ID, FIRST_USER_ID + args.users)
+    for user_id in users:
+        await calendar_api.credential_store.save(user_id, Credentials(token=f"token-{user_id}"))
+
+    runner, image_base = await _serve_images(args.uploads * args.attachments, args.image_size)
+    bot.job_queue.start()
+    lag = _LagSamples()
+    monitor = LoopLagMonitor(lag, interval=0.01)
+    monitor.start()
+    results: Dict[str, dict] = {}
+
+    try:
+        await _drive("/new_schedule", [
+            lambda i=i: new_schedule(FakeInteraction(GUILD.id, FIRST_USER_ID), **{
+                parameter: FakeAttachment(f"{image_base}/{i * args.attachments + page}.png")
+                for page, parameter in enumerate(UPLOAD_PARAMETERS[:args.attachments])
+            })
+            for i in range(args.uploads)
+        ], args.concurrency, results)
+
+        await _drive("/schedule", [
+            lambda i=i: schedule(FakeInteraction(GUILD.id, FIRST_USER_ID),
+                                 employee=employee_name(i % args.employees).lower())
+            for i in range(args.iterations)
+        ], args.concurrency, results)
+
+        await _drive("/sync_calendar", [
+            lambda i=i: sync_calendar(FakeInteraction(GUILD.id, users[i % len(users)]),
+                                      employee_name=employee_name(i % args.employees))
+            for i in range(args.iterations)
+        ], args.concurrency, results)
+    finally:
+        await monitor.stop()
+        await bot.job_queue.stop()
+        await bot.processor.close()
+        await runner.cleanup()
+        workdir.cleanup()
+
+    return {
+        "commands": results,
+        "loop_lag": {
+            "p50": percentile(lag.samples, 50),
+            "p95": percentile(lag.samples, 95),
+            "p99": percentile(lag.samples, 99),
+            "max": max(lag.samples, default=0.0),
+        },
+        "calendar_calls": dict(sorted(calendar.calls.items())),
+        "gemini_calls": gemini.calls,
+    }
+
+def report(summary: dict):
+    print(f"{'command':<16}{'count':>7}{'errors':>8}{'wall s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in summary["commands"].items():
+        print(
+            f"{name:<16}{stats['count']:>7}{stats['errors']:>8}{stats['wall']:>9.2f}"
+            f"{stats['p50'] * 1000:>10.1f}{stats['p95'] * 1000:>10.1f}{stats['p99'] * 1000:>10.1f}"
+        )
+
+    lag = summary["loop_lag"]
+    print(
+        f"\nevent loop lag: p50 {lag['p50'] * 1000:.1f} ms, p95 {lag['p95'] * 1000:.1f} ms, "
+        f"p99 {lag['p99'] * 1000:.1f} ms, max {lag['max'] * 1000:.1f} ms"
+    )
+
+    print(f"\ngemini calls: {summary['gemini_calls']}")
+    print("calendar calls:")
+    for endpoint, count in summary["calendar_calls"].items():
+        print(f"  {endpoint:<40}{count:>6}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the bot's commands against offline fakes.")
+    parser.add_argument("--concurrency", type=int, default=5, help="commands in flight at once")
+    parser.add_argument("--iterations", type=int, default=20, help="/schedule and /sync_calendar calls")
+    parser.add_argument("--uploads", type=int, default=5, help="/new_schedule calls, one distinct image each")
+    parser.add_argument("--attachments", type=int, default=1, choices=range(1, len(UPLOAD_PARAMETERS) + 1),
+                        help="images attached to each /new_schedule call")
+    parser.add_argument("--users", type=int, default=5, help="distinct Google-connected users")
+    parser.add_argument("--employees", type=int, default=20, help="employees on the generated schedule")
+    parser.add_argument("--image-size", type=int, default=1600, help="width of generated images in pixels")
+    parser.add_argument("--calendar-latency", type=float, default=0.05, help="seconds per Calendar HTTP call")
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0, help="share of Calendar calls answered 429")
+    parser.add_argument("--gemini-latency", type=float, default=1.0, help="seconds per Gemini call")
+    parser.add_argument("--backoff-base", type=float, default=0.05, help="first retry delay after a 429")
+    parser.add_argument("--no-rate-limit", action="store_true", help="disable the client-side Calendar rate limit")
+    parser.add_argument("--verbose", action="store_true", help="show the bot's info-level logs")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    report(asyncio.run(run(args)))
+
+if __name__ == "__main__":
+    main()
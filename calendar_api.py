@@ -1,144 +1,450 @@
+import asyncio
 import datetime
+import functools
+import logging
 import os
-from typing import Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
 from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from google.auth.transport.requests import Request
+from googleapiclient.errors import HttpError
 import pytz
 
+from credential_store import CredentialStore
+from metrics import metrics
+from utils.rate_limit import TokenBucket
+from utils.resilience import CircuitBreaker, Deadline, backoff_delay
+
+# The OAuth flow, discovery client and httplib2 transports are imported on first use;
+# together they add a few hundred milliseconds to startup
+if TYPE_CHECKING:
+    from google_auth_oauthlib.flow import Flow
+
+logger = logging.getLogger(__name__)
+
 SCOPES = ["https://www.googleapis.com/auth/calendar"]
+CLIENT_SECRET_PATH = "credentials.json"
+
+# Where Google sends users after consent; they paste the resulting URL (or its code) back to the bot.
+# OAUTH_REDIRECT_URI overrides it, read when each flow starts
+DEFAULT_OAUTH_REDIRECT_URI = "http://localhost:1"
+
+# Google recommends keeping batch requests at or below 50 calls
+MAX_BATCH_SIZE = 50
+
+# Calendar API quota is per user per second; each user's bucket stays a little under it
+# across all of their commands, so one user's bulk sync never slows anyone else down
+RATE_LIMIT_PER_SECOND = 8
+_rate_limiters: Dict[int, TokenBucket] = {}
+
+# Exponential backoff for 403/429 rate-limit responses, 5xx errors and timeouts
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 32.0
+
+# Socket timeout for each HTTP request, and the total time one API call may take
+# including retries, so a command can always answer within Discord's followup window
+REQUEST_TIMEOUT_SECONDS = 10
+CALL_DEADLINE_SECONDS = 20.0
+CALL_DEADLINES = {
+    "calendar.calendarList.list": 10.0,
+    "calendar.calendars.get": 10.0,
+    "calendar.calendars.insert": 15.0,
+    "batch": 45.0,
+}
+
+# Opens after consecutive 5xx/timeouts, so commands fail fast while Google is down
+calendar_breaker = CircuitBreaker("google_calendar", failure_threshold=5, reset_timeout=30.0)
+
+# Blocking Google HTTP calls run here so they never hold the discord.py event loop
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="google-calendar")
+
+# Shared per-process state: one discovery client and the per-user credential store
+_state_lock = threading.Lock()
+_service = None
+credential_store = CredentialStore(scopes=SCOPES)
+
+# Per-user calendar list cache: {user_id: {"items": {id: entry}, "sync_token": str, "fetched_at": float}}
+CALENDAR_LIST_TTL_SECONDS = 300
+_calendar_lists: Dict[int, dict] = {}
+_calendar_list_locks: Dict[int, asyncio.Lock] = {}
+
+# Authorization requests waiting for the user to paste back their code, with when they started;
+# abandoned ones are dropped after PENDING_FLOW_TTL_SECONDS
+PENDING_FLOW_TTL_SECONDS = 600
+_pending_flows: Dict[int, Tuple["Flow", float]] = {}
+
+# Factory for the underlying HTTP transport (swapped for an in-process fake by the benchmarks);
+# None means httplib2.Http
+transport_factory = None
+
+# httplib2.Http is not thread-safe, so each executor thread keeps its own authorized transports
+_thread_local = threading.local()
+
+class NotConnectedError(Exception):
+    """Raised when a Discord user hasn't linked a Google account yet."""
+
+def start_authorization(user_id: int) -> str:
+    """Begin linking a user's Google account; returns the URL they should open."""
+    from google_auth_oauthlib.flow import Flow
+
+    redirect_uri = os.getenv("OAUTH_REDIRECT_URI", DEFAULT_OAUTH_REDIRECT_URI)
+    flow = Flow.from_client_secrets_file(CLIENT_SECRET_PATH, SCOPES, redirect_uri=redirect_uri)
+    auth_url, _ = flow.authorization_url(access_type="offline", prompt="consent")
+    _expire_pending_flows()
+    _pending_flows[user_id] = (flow, time.monotonic())
+    return auth_url
+
+def _expire_pending_flows():
+    cutoff = time.monotonic() - PENDING_FLOW_TTL_SECONDS
+    for user_id in [user_id for user_id, (_, started) in _pending_flows.items() if started < cutoff]:
+        del _pending_flows[user_id]
+
+async def finish_authorization(user_id: int, code: str):
+    """Exchange the code (or the full redirect URL) from the consent screen and store the credentials."""
+    _expire_pending_flows()
+    pending = _pending_flows.get(user_id)
+    if pending is None:
+        raise NotConnectedError("No authorization in progress (or it expired). Run /connect_to_google first.")
+    flow, _ = pending
+
+    if code.startswith("http"):
+        code = parse_qs(urlparse(code).query).get("code", [""])[0]
 
-def get_credentials(force_refresh: bool = False):
+    await asyncio.to_thread(flow.fetch_token, code=code)
+    _pending_flows.pop(user_id, None)
+    await credential_store.save(user_id, flow.credentials)
+    invalidate_calendar_list(user_id, forget=True)
+
+def _new_transport():
+    if transport_factory is not None:
+        return transport_factory()
+    import httplib2
+    return httplib2.Http()
+
+def _get_service():
+    """Build the Calendar discovery client once per process; requests pass their own transport."""
+    global _service
+
+    with _state_lock:
+        if _service is None:
+            from googleapiclient.discovery import build
+            _service = build("calendar", "v3", http=_new_transport(), cache_discovery=False)
+        return _service
+
+def _authorized_http(user_id: int, creds: Credentials):
+    """Return this thread's transport for a user, rebuilt if their credentials object changed."""
+    transports = getattr(_thread_local, "transports", None)
+    if transports is None:
+        transports = _thread_local.transports = {}
+
+    http = transports.get(user_id)
+    if http is None or http.credentials is not creds:
+        import google_auth_httplib2
+
+        transport = _new_transport()
+        transport.timeout = REQUEST_TIMEOUT_SECONDS
+        http = google_auth_httplib2.AuthorizedHttp(creds, http=transport)
+        transports[user_id] = http
+    return http
+
+def _is_rate_limited(error: Exception) -> bool:
+    """True for Google's 429 and 403 rateLimitExceeded/userRateLimitExceeded responses."""
+    if not isinstance(error, HttpError):
+        return False
+    if error.resp.status == 429:
+        return True
+    return error.resp.status == 403 and b"ratelimitexceeded" in (error.content or b"").lower()
+
+def _is_server_error(error: Exception) -> bool:
+    """True for 5xx responses and transport failures: signs that Google itself is struggling."""
+    import httplib2  # already loaded by the request that failed
+
+    if isinstance(error, HttpError):
+        return error.resp.status >= 500
+    return isinstance(error, (TimeoutError, ConnectionError, httplib2.HttpLib2Error))
+
+def _is_retryable(error: Exception) -> bool:
+    return _is_rate_limited(error) or _is_server_error(error)
+
+def _backoff_delay(attempt: int) -> float:
+    return backoff_delay(attempt, BACKOFF_BASE_SECONDS, BACKOFF_MAX_SECONDS)
+
+def _rate_limiter(user_id: int) -> TokenBucket:
+    bucket = _rate_limiters.get(user_id)
+    if bucket is None:
+        bucket = _rate_limiters[user_id] = TokenBucket(rate=RATE_LIMIT_PER_SECOND, capacity=MAX_BATCH_SIZE)
+    return bucket
+
+def _execute(auth, request):
     """
-    Authenticate with Google and return creds object.
-    Only for MVP -> one local user (you).
+    Execute one prepared API request on the calling thread's transport.
+    Server errors count against the circuit breaker; retrying is left to
+    _run, so executor threads never sleep through a backoff.
     """
-    token_path = "tokens/token.json"
-    client_secret_path = "credentials.json"
-    creds = None
+    method = getattr(request, "methodId", None) or "batch"
+    calendar_breaker.before_call()
+    try:
+        with metrics.timer("google_request", method=method):
+            response = request.execute(http=_authorized_http(*auth))
+    except Exception as e:
+        if _is_server_error(e):
+            calendar_breaker.record_failure()
+        else:
+            calendar_breaker.record_success()
+        raise
+    calendar_breaker.record_success()
+    return response
 
-    os.makedirs(os.path.dirname(token_path), exist_ok=True)
+async def _run(user_id: int, func, *args, cost: int = 1, method: str = ""):
+    """
+    Run a blocking calendar call for a user in the bounded executor once the
+    rate limiter allows it. `func` receives the (user_id, credentials) pair
+    to pass to _execute, followed by `args`. Rate limits, 5xx errors and
+    timeouts are retried here with backoff until `method`'s deadline; the
+    backoff awaits on the event loop instead of holding an executor thread.
+    """
+    creds = await credential_store.get(user_id)
+    if creds is None:
+        raise NotConnectedError("Google account not connected. Run /connect_to_google first.")
 
-    if os.path.exists(token_path):
+    deadline = Deadline(CALL_DEADLINES.get(method, CALL_DEADLINE_SECONDS))
+    loop = asyncio.get_running_loop()
+    for attempt in range(MAX_RETRIES + 1):
+        # Fail before queueing on the rate limiter while Google is known to be down
+        calendar_breaker.before_call()
+        await _rate_limiter(user_id).acquire(cost)
         try:
-            # Check if file is empty or just "{}"
-            with open(token_path, "r") as f:
-                content = f.read().strip()
-                if not content or content == "{}":
-                    raise ValueError("Token file is empty or blank JSON.")
-            creds = Credentials.from_authorized_user_file(token_path, SCOPES)
+            return await loop.run_in_executor(_executor, functools.partial(func, (user_id, creds), *args))
         except Exception as e:
-            print(f"Invalid or empty token file — regenerating ({e})")
-            creds = None
-    else:
-        print("Token file not found — creating a new one.")
-    
-    if force_refresh:
-        print("🔄 Forcing credentials refresh...")
-        flow = InstalledAppFlow.from_client_secrets_file(client_secret_path, SCOPES)
-        creds = flow.run_local_server(port=0)
-        with open(token_path, "w") as token:
-            token.write(creds.to_json())
-        return creds
-
-    # If there are no valid creds, force browser login
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            print("Refreshing expired credentials...")
-            creds.refresh(Request())  # auto refresh
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                client_secret_path, SCOPES
-            )
-            creds = flow.run_local_server(port=0)  # opens browser
-        # Save for next time
-        with open(token_path, "w") as token:
-            token.write(creds.to_json())
-
-    return creds
+            delay = _backoff_delay(attempt)
+            if attempt == MAX_RETRIES or not _is_retryable(e) or not deadline.allows(delay):
+                raise
+            metrics.inc("google_retries", method=method or "other")
+            status = e.resp.status if isinstance(e, HttpError) else type(e).__name__
+            logger.warning("Google request failed: method=%s status=%s retry_in=%.1fs", method, status, delay)
+            await asyncio.sleep(delay)
 
-def test_calendar_connection() -> bool:
+async def test_calendar_connection(user_id: int) -> bool:
     """
     Simple test to validate we can call the Google Calendar API.
     Returns True if connection is valid, False otherwise.
+    Reuses the cached calendar list, so it is free right after another call.
     """
     try:
-        creds = get_credentials()
-        service = build("calendar", "v3", credentials=creds)
-        calendars = service.calendarList().list().execute()
-
-        print("Connection successful.")
-        print("Calendars found:", [cal["summary"] for cal in calendars.get("items", [])])
-        return True
-
+        await get_calendar_list(user_id)
     except Exception as e:
-        print("Failed to connect to Google Calendar API.")
-        print(f"Error: {e}")
+        logger.warning("Calendar connection test failed: user=%s error=%s", user_id, e)
         return False
 
-def create_new_calendar(title: Optional[str] = "Work Schedule"):
-    creds = get_credentials()
-    service = build("calendar", "v3", credentials=creds)
+    return True
 
+async def create_new_calendar(user_id: int, title: Optional[str] = "Work Schedule"):
     calendar = {
             'summary' : title,
             'timeZone' : 'America/New_York'
         }
-    
-    new_calendar = service.calendars().insert(body=calendar).execute()
+
+    def _blocking(auth):
+        service = _get_service()
+        return _execute(auth, service.calendars().insert(body=calendar))
+
+    new_calendar = await _run(user_id, _blocking, method="calendar.calendars.insert")
     calendar_id = new_calendar["id"]
-    print(f"Created calendar: {calendar_id}")
+    logger.info("Created calendar: user=%s calendar=%s", user_id, calendar_id)
+
+    # The next lookup revalidates with the sync token and picks up the new calendar
+    invalidate_calendar_list(user_id)
 
     return new_calendar
 
-def get_primary_calendar():
-    creds = get_credentials()
-    service = build("calendar", "v3", credentials=creds)
+async def get_primary_calendar(user_id: int):
+    calendars = await get_calendar_list(user_id)
+    for calendar in calendars:
+        if calendar.get("primary"):
+            return calendar
+
+    def _blocking(auth):
+        service = _get_service()
+        return _execute(auth, service.calendars().get(calendarId="primary"))
 
-    return service.calendars().get(calendarId="primary").execute()
+    return await _run(user_id, _blocking, method="calendar.calendars.get")
 
-def get_calendar_list():
-    creds = get_credentials()
-    service = build("calendar", "v3", credentials=creds)
+def invalidate_calendar_list(user_id: int, forget: bool = False):
+    """Mark a user's cached calendar list stale, or drop it (and its sync token) entirely."""
+    if forget:
+        _calendar_lists.pop(user_id, None)
+    elif user_id in _calendar_lists:
+        _calendar_lists[user_id]["fetched_at"] = 0.0
+
+def _list_calendars_blocking(auth, sync_token: Optional[str]):
+    """Every calendarList page; with a sync token only the changes since it (deleted entries included)."""
+    service = _get_service()
+    items = []
+    page_token = None
+    while True:
+        if sync_token:
+            request = service.calendarList().list(syncToken=sync_token, showDeleted=True, pageToken=page_token)
+        else:
+            request = service.calendarList().list(pageToken=page_token)
+        result = _execute(auth, request)
+        items.extend(result.get("items", []))
+        page_token = result.get("nextPageToken")
+        if not page_token:
+            return items, result.get("nextSyncToken")
 
-    calendars = None
+async def _refresh_calendar_list(user_id: int) -> dict:
+    cached = _calendar_lists.get(user_id)
+    sync_token = cached["sync_token"] if cached else None
 
     try:
-        calendars = service.calendarList().list().execute()
-        print("Calendars found:", [cal["summary"] for cal in calendars.get("items", [])])
-    
-    except Exception as e:
-        print("Failed to connect to Google Calendar API.")
-        print(f"Error: {e}")
-        return calendars
-
-    return calendars.get("items", [])
-
-def add_event_to_new_calendar(user_id: int, description: str, start_time: datetime, end_time: datetime, calendar_id: str):
-    
-    creds = get_credentials()
-    service = build("calendar", "v3", credentials=creds)
-    
-    shift = {
+        items, next_sync_token = await _run(user_id, _list_calendars_blocking, sync_token,
+                                            method="calendar.calendarList.list")
+    except HttpError as e:
+        if e.resp.status != 410 or not sync_token:
+            raise
+        # Sync token expired: fall back to a full listing
+        cached, sync_token = None, None
+        items, next_sync_token = await _run(user_id, _list_calendars_blocking, None,
+                                            method="calendar.calendarList.list")
+
+    calendars = dict(cached["items"]) if sync_token else {}
+    for item in items:
+        if item.get("deleted"):
+            calendars.pop(item["id"], None)
+        else:
+            calendars[item["id"]] = item
+
+    entry = {"items": calendars, "sync_token": next_sync_token, "fetched_at": time.monotonic()}
+    _calendar_lists[user_id] = entry
+    return entry
+
+async def get_calendar_list(user_id: int):
+    """
+    All of a user's calendars, served from a per-user cache for
+    CALENDAR_LIST_TTL_SECONDS and then revalidated with a sync token.
+    Raises if the list can't be fetched (NotConnectedError, CircuitOpenError, HttpError...).
+    """
+    cached = _calendar_lists.get(user_id)
+    if cached and time.monotonic() - cached["fetched_at"] < CALENDAR_LIST_TTL_SECONDS:
+        metrics.inc("calendar_list_cache", result="hit")
+        return list(cached["items"].values())
+
+    lock = _calendar_list_locks.setdefault(user_id, asyncio.Lock())
+    async with lock:
+        # Another command may have refreshed it while we waited
+        cached = _calendar_lists.get(user_id)
+        if not cached or time.monotonic() - cached["fetched_at"] >= CALENDAR_LIST_TTL_SECONDS:
+            metrics.inc("calendar_list_cache", result="miss")
+            cached = await _refresh_calendar_list(user_id)
+        else:
+            metrics.inc("calendar_list_cache", result="hit")
+        return list(cached["items"].values())
+
+def build_shift_event(description: str, start_time: datetime, end_time: datetime,
+                      private_properties: Optional[Dict[str, str]] = None) -> dict:
+    """Build the event body used for every synced work shift."""
+    event = {
         "summary": "Work Shift",
         "description": description,
         "start": {"dateTime": start_time.isoformat(), "timeZone": "America/New_York"},
         "end": {"dateTime": end_time.isoformat(), "timeZone": "America/New_York"},
     }
+    if private_properties:
+        event["extendedProperties"] = {"private": private_properties}
+    return event
+
+async def add_event_to_new_calendar(user_id: int, description: str, start_time: datetime, end_time: datetime, calendar_id: str):
+    shift = build_shift_event(description, start_time, end_time)
 
     # calendar_id = 'primary' if calendar is None else calendar[id]
-    
-    event = (
-        service.events().insert(calendarId=calendar_id, body=shift).execute()
-    )   
 
-    return event
+    def _blocking(auth):
+        service = _get_service()
+        return _execute(auth, service.events().insert(calendarId=calendar_id, body=shift))
+
+    return await _run(user_id, _blocking, method="calendar.events.insert")
+
+async def execute_event_batch(user_id: int, calendar_id: str, operations: List[tuple]) -> List[Tuple[Optional[dict], Optional[Exception]]]:
+    """
+    Run event writes using Google API batch requests. Each operation is one of
+    ("insert", body), ("patch", event_id, body) or ("delete", event_id).
+    Returns one (response, error) pair per operation, in the same order;
+    a successful delete has an empty response and no error.
+    """
+    outcomes: List[Tuple[Optional[dict], Optional[Exception]]] = [(None, None)] * len(operations)
+    if not operations:
+        return outcomes
+
+    pending = list(range(len(operations)))
+
+    def _callback(request_id, response, exception):
+        outcomes[int(request_id)] = (response, exception)
+
+    def _request(service, operation):
+        kind = operation[0]
+        if kind == "insert":
+            return service.events().insert(calendarId=calendar_id, body=operation[1])
+        if kind == "patch":
+            return service.events().patch(calendarId=calendar_id, eventId=operation[1], body=operation[2])
+        if kind == "delete":
+            return service.events().delete(calendarId=calendar_id, eventId=operation[1])
+        raise ValueError(f"Unknown event operation: {kind}")
+
+    def _blocking(auth, indices: List[int]):
+        service = _get_service()
+        batch = service.new_batch_http_request(callback=_callback)
+        for index in indices:
+            batch.add(_request(service, operations[index]), request_id=str(index))
+        _execute(auth, batch)
 
-def get_events_between( calendar_id: str, time_min: datetime, time_max: datetime, tz_name: str = "America/New_York"):
+    # Individual batch entries can be rate limited or fail server-side; retry just those with backoff
+    for attempt in range(MAX_RETRIES + 1):
+        # One _run per batch request, so a retried batch never resends entries that already went through
+        for offset in range(0, len(pending), MAX_BATCH_SIZE):
+            chunk = pending[offset:offset + MAX_BATCH_SIZE]
+            await _run(user_id, _blocking, chunk, cost=len(chunk), method="batch")
+        pending = [i for i in pending if _is_retryable(outcomes[i][1])]
+        if not pending or attempt == MAX_RETRIES:
+            break
+        metrics.inc("google_retries", amount=len(pending), method="batch_entry")
+        await asyncio.sleep(_backoff_delay(attempt))
+
+    return outcomes
+
+async def add_events_batch(user_id: int, calendar_id: str, events: List[dict]) -> List[Tuple[Optional[dict], Optional[Exception]]]:
+    """
+    Insert several events using Google API batch requests.
+    Returns one (event, error) pair per input event, in the same order.
+    """
+    return await execute_event_batch(user_id, calendar_id, [("insert", body) for body in events])
+
+async def list_events_by_properties(user_id: int, calendar_id: str, private_properties: Dict[str, str]) -> List[dict]:
+    """Return every event whose private extended properties match all of `private_properties`."""
+    def _blocking(auth):
+        service = _get_service()
+        items = []
+        page_token = None
+        while True:
+            events_result = _execute(auth, service.events()
+                .list(
+                    calendarId=calendar_id,
+                    privateExtendedProperty=[f"{key}={value}" for key, value in private_properties.items()],
+                    pageToken=page_token,
+                )
+            )
+            items.extend(events_result.get("items", []))
+            page_token = events_result.get("nextPageToken")
+            if not page_token:
+                return items
+
+    return await _run(user_id, _blocking, method="calendar.events.list")
+
+async def get_events_between(user_id: int, calendar_id: str, time_min: datetime, time_max: datetime, tz_name: str = "America/New_York"):
     """Return events between two datetimes (inclusive) from a calendar."""
-    creds = get_credentials()
-    service = build("calendar", "v3", credentials=creds)
     tz = pytz.timezone(tz_name)
 
     # Ensure both datetimes are localized
@@ -147,16 +453,25 @@ def get_events_between( calendar_id: str, time_min: datetime, time_max: datetime
     if time_max.tzinfo is None:
         time_max = tz.localize(time_max)
 
-    events_result = (service.events()
-        .list(
-            calendarId=calendar_id,
-            timeMin=time_min.isoformat(),
-            timeMax=time_max.isoformat(),
-            timeZone="UTC",
-            singleEvents=True,
-            orderBy="startTime",
-        )
-        .execute()
-    )
-
-    return events_result.get("items", [])
\ No newline at end of file
+    def _blocking(auth):
+        service = _get_service()
+        items = []
+        page_token = None
+        while True:
+            events_result = _execute(auth, service.events()
+                .list(
+                    calendarId=calendar_id,
+                    timeMin=time_min.isoformat(),
+                    timeMax=time_max.isoformat(),
+                    timeZone="UTC",
+                    singleEvents=True,
+                    orderBy="startTime",
+                    pageToken=page_token,
+                )
+            )
+            items.extend(events_result.get("items", []))
+            page_token = events_result.get("nextPageToken")
+            if not page_token:
+                return items
+
+    return await _run(user_id, _blocking, method="calendar.events.list")
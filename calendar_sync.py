@@ -0,0 +1,222 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import pytz
+
+from calendar_api import build_shift_event, execute_event_batch, get_events_between, list_events_by_properties
+from schedule_store import normalize_name
+from shifts import DAYS
+
+logger = logging.getLogger(__name__)
+
+# Padding around the week window so events touching the edges are still found
+WINDOW_PADDING = timedelta(minutes=10)
+
+# Private extended properties used to find the events this bot created
+WEEK_PROPERTY = "schedbot_week"
+EMPLOYEE_PROPERTY = "schedbot_employee"
+KEY_PROPERTY = "schedbot_key"
+
+# Employees synced in parallel by sync_all_employees
+MAX_CONCURRENT_SYNCS = 4
+
+def _event_key(description: str, start: datetime, end: datetime) -> tuple:
+    """Duplicate-detection key: normalized description plus UTC start/end to the minute."""
+    return (
+        description.strip().casefold(),
+        start.astimezone(pytz.UTC).replace(second=0, microsecond=0),
+        end.astimezone(pytz.UTC).replace(second=0, microsecond=0),
+    )
+
+def _shift_properties(week, employee_name: str, day: str, index: int) -> Dict[str, str]:
+    """Private extended properties that tie an event to one shift slot of a stored week."""
+    week_id = f"{week.guild_id}:{week.week_key}"
+    employee = normalize_name(employee_name)
+    return {
+        WEEK_PROPERTY: week_id,
+        EMPLOYEE_PROPERTY: employee,
+        KEY_PROPERTY: f"{week_id}:{employee}:{day}:{index}",
+    }
+
+def _event_times(ev: dict) -> Optional[Tuple[datetime, datetime]]:
+    ev_start_str = ev.get("start", {}).get("dateTime")
+    ev_end_str = ev.get("end", {}).get("dateTime")
+    if not ev_start_str or not ev_end_str:
+        return None
+    return (
+        datetime.fromisoformat(ev_start_str.replace("Z", "+00:00")),
+        datetime.fromisoformat(ev_end_str.replace("Z", "+00:00")),
+    )
+
+async def _find_legacy_events(user_id: int, calendar_id: str, inserts: List[tuple]) -> Dict[tuple, dict]:
+    """Untagged events (created before shift keys existed) that match planned inserts."""
+    window_min = min(start for _, _, start, _, _ in inserts) - WINDOW_PADDING
+    window_max = max(end for _, _, _, end, _ in inserts) + WINDOW_PADDING
+    events = await get_events_between(
+        user_id,
+        calendar_id,
+        window_min.astimezone(pytz.UTC),
+        window_max.astimezone(pytz.UTC),
+        tz_name="UTC",
+    )
+
+    legacy = {}
+    for ev in events:
+        times = _event_times(ev)
+        if times is None or KEY_PROPERTY in ev.get("extendedProperties", {}).get("private", {}):
+            continue
+        legacy.setdefault(_event_key(ev.get("description", ""), *times), ev)
+    return legacy
+
+async def sync_employee_schedule(user_id: int, week, employee_name: str, calendar_id: str) -> List[str]:
+    """
+    Reconcile one employee's week of parsed shifts with a user's calendar.
+    Events are tagged with a stable per-shift key, so a resync only inserts
+    new shifts, patches moved ones and deletes shifts that were removed;
+    the writes go out in a single batch request.
+    Returns one outcome line per shift, in day order.
+    """
+    shifts = week.shifts.get(employee_name, {})
+    week_start = week.week_start
+    description = f"{employee_name} shift"
+    results = {}
+    desired = {}  # key -> (slot, label, start_time, end_time, properties)
+
+    for day in DAYS:
+        day_shifts = shifts.get(day, ())
+        for index, shift in enumerate(day_shifts):
+            slot = (DAYS.index(day), index)
+            if not shift.is_timed:
+                results[slot] = f"⏩ {day}: {shift.note} — nothing to sync"
+                continue
+            label = day if len(day_shifts) == 1 else f"{day} ({shift.format()})"
+            start_time, end_time = shift.datetimes(week_start, day)
+            properties = _shift_properties(week, employee_name, day, index)
+            desired[properties[KEY_PROPERTY]] = (slot, label, start_time, end_time, properties)
+
+    scope = _shift_properties(week, employee_name, "", 0)
+    del scope[KEY_PROPERTY]
+
+    try:
+        tagged = await list_events_by_properties(user_id, calendar_id, scope)
+    except Exception as e:
+        logger.warning("Error fetching existing events: user=%s employee=%s error=%s", user_id, employee_name, e)
+        for slot, label, _, _, _ in desired.values():
+            results[slot] = f"⚠️ Could not sync {label}"
+        return [results[slot] for slot in sorted(results)]
+
+    # Diff the calendar against the schedule
+    actions = []  # (slot, label, kind, operation)
+    existing = {}
+    for ev in tagged:
+        key = ev.get("extendedProperties", {}).get("private", {}).get(KEY_PROPERTY)
+        if key in desired and key not in existing:
+            existing[key] = ev
+        else:
+            # Shift removed from the schedule, or a duplicate of one already matched
+            actions.append((None, None, "delete", ("delete", ev["id"])))
+
+    inserts = []
+    for key, (slot, label, start_time, end_time, properties) in desired.items():
+        ev = existing.get(key)
+        if ev is None:
+            inserts.append((slot, label, start_time, end_time, properties))
+        elif (
+            _event_times(ev) is not None
+            and _event_key(ev.get("description", ""), *_event_times(ev)) == _event_key(description, start_time, end_time)
+        ):
+            results[slot] = f"⏩ {label}: skipped — already up to date"
+        else:
+            body = build_shift_event(description, start_time, end_time)
+            actions.append((slot, label, "update", ("patch", ev["id"], body)))
+
+    # Adopt matching untagged events instead of creating duplicates of them
+    legacy = {}
+    if inserts:
+        try:
+            legacy = await _find_legacy_events(user_id, calendar_id, inserts)
+        except Exception as e:
+            logger.warning("Error fetching legacy events: user=%s employee=%s error=%s", user_id, employee_name, e)
+
+    for slot, label, start_time, end_time, properties in inserts:
+        ev = legacy.pop(_event_key(description, start_time, end_time), None)
+        if ev is not None:
+            body = {"extendedProperties": {"private": properties}}
+            actions.append((slot, label, "adopt", ("patch", ev["id"], body)))
+        else:
+            body = build_shift_event(description, start_time, end_time, properties)
+            actions.append((slot, label, "insert", ("insert", body)))
+
+    try:
+        outcomes = await execute_event_batch(user_id, calendar_id, [operation for _, _, _, operation in actions])
+    except Exception as e:
+        logger.warning("Error writing events: user=%s employee=%s error=%s", user_id, employee_name, e)
+        outcomes = [(None, e)] * len(actions)
+
+    removed = failed_removals = 0
+    for (slot, label, kind, _), (event, error) in zip(actions, outcomes):
+        if kind == "delete":
+            if error is None:
+                removed += 1
+            else:
+                failed_removals += 1
+        elif error is not None or event is None:
+            results[slot] = f"⚠️ Could not sync {label}"
+        elif kind == "adopt":
+            results[slot] = f"⏩ {label}: skipped — already created"
+        else:
+            link = event.get("htmlLink", "(no link)")
+            verb = "updated" if kind == "update" else "synced"
+            icon = "🔁" if kind == "update" else "✅"
+            results[slot] = f"{icon} {label}: {verb} → {link}"
+
+    lines = [results[slot] for slot in sorted(results)]
+    if removed:
+        lines.append(f"🗑️ Removed {removed} outdated shift(s)")
+    if failed_removals:
+        lines.append(f"⚠️ Could not remove {failed_removals} outdated shift(s)")
+    return lines
+
+async def sync_all_employees(user_id: int, week, calendar_id: str, concurrency: int = MAX_CONCURRENT_SYNCS,
+                             on_progress=None) -> Dict[str, List[str]]:
+    """
+    Sync every employee of a stored week through a bounded pool of workers.
+    Calendar calls share the global rate limiter in calendar_api, so the pool
+    size only bounds in-flight work. `on_progress(done, total, name, lines)`
+    is awaited after each employee finishes; its errors are logged and ignored.
+    Returns the outcome lines per employee.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    for name in week.employees:
+        queue.put_nowait(name)
+
+    total = queue.qsize()
+    results: Dict[str, List[str]] = {}
+
+    async def _worker():
+        while True:
+            try:
+                name = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            try:
+                lines = await sync_employee_schedule(user_id, week, name, calendar_id)
+            except Exception as e:
+                logger.warning("Error syncing employee: user=%s employee=%s error=%s", user_id, name, e)
+                lines = [f"⚠️ Could not sync {name}"]
+
+            results[name] = lines
+            if on_progress:
+                # A failed progress update (e.g. an expired interaction token) must not stop the sync
+                try:
+                    await on_progress(len(results), total, name, lines)
+                except Exception as e:
+                    logger.warning("Progress update failed: user=%s employee=%s error=%s", user_id, name, e)
+
+    await asyncio.gather(*(_worker() for _ in range(max(1, min(concurrency, total)))))
+
+    # Report in roster order regardless of completion order
+    return {name: results[name] for name in week.employees}
@@ -0,0 +1,73 @@
+from datetime import datetime
+from typing import Optional
+from discord import app_commands, Interaction
+
+from calendar_api import test_calendar_connection
+from utils.helpers import employee_autocomplete, employee_not_found_message, find_employee
+
+def setup_auto_sync_command(bot, guild_id):
+    @bot.tree.command(name="auto_sync", description="Keep an employee's shifts synced to your calendar automatically", guild=guild_id)
+    @app_commands.describe(
+        employee_name="The employee to follow (leave out to see your current setting)",
+        use_primary="Sync to your primary calendar instead of \"Work Schedule\"",
+    )
+    async def auto_sync_command(interaction: Interaction, employee_name: Optional[str] = None,
+                                use_primary: bool = False):
+        user_id = interaction.user.id
+
+        if employee_name is None:
+            status = await bot.auto_sync.subscription(user_id, interaction.guild_id)
+            if status is None:
+                await interaction.response.send_message(
+                    "🔕 Automatic sync is off. Use `/auto_sync <employee_name>` to turn it on.", ephemeral=True
+                )
+                return
+
+            calendar = "primary calendar" if status["use_primary"] else "\"Work Schedule\" calendar"
+            lines = [f"🔄 Syncing **{status['employee']}** to your {calendar}"]
+            if status["last_synced_at"]:
+                lines.append(f"Last synced: {datetime.fromtimestamp(status['last_synced_at']):%m/%d/%Y %I:%M %p}")
+            if status["pending"]:
+                lines.append(f"Pending weeks: {status['pending']}")
+            if status["last_error"]:
+                lines.append(f"⚠️ Last attempt failed: {status['last_error']}")
+            await interaction.response.send_message("\n".join(lines), ephemeral=True)
+            return
+
+        week = await bot.store.get_week(interaction.guild_id)
+        if week is None or not week.employees:
+            await interaction.response.send_message(
+                "❌ No schedule data loaded. Upload a schedule first!", ephemeral=True
+            )
+            return
+
+        employee = find_employee(week, employee_name)
+        if not employee:
+            await interaction.response.send_message(employee_not_found_message(week, employee_name), ephemeral=True)
+            return
+
+        # The connection check can outlast the 3 s window for a first response, so defer first
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        if not await test_calendar_connection(user_id):
+            await interaction.followup.send(
+                "❌ Failed to connect to Google Calendar. Use `/connect_to_google` to link your account.",
+                ephemeral=True,
+            )
+            return
+
+        # Subscribing also queues the latest week, so the calendar is current straight away
+        await bot.auto_sync.subscribe(user_id, interaction.guild_id, employee["name"], use_primary, week.week_key)
+        await interaction.followup.send(
+            f"🔄 **{employee['name']}**'s shifts will now sync to your calendar whenever a schedule changes.\n"
+            f"Use `/auto_sync_stop` to turn this off.",
+            ephemeral=True,
+        )
+
+    auto_sync_command.autocomplete("employee_name")(employee_autocomplete(bot))
+
+    @bot.tree.command(name="auto_sync_stop", description="Stop syncing shifts to your calendar automatically", guild=guild_id)
+    async def auto_sync_stop_command(interaction: Interaction):
+        if await bot.auto_sync.unsubscribe(interaction.user.id, interaction.guild_id):
+            await interaction.response.send_message("🔕 Automatic sync turned off.", ephemeral=True)
+        else:
+            await interaction.response.send_message("❌ Automatic sync wasn't on.", ephemeral=True)
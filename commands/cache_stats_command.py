@@ -0,0 +1,12 @@
+from discord import Interaction
+
+def setup_cache_stats_command(bot, guild_id):
+    @bot.tree.command(name="cache_stats", description="Show schedule extraction cache statistics", guild=guild_id)
+    async def cache_stats_command(interaction: Interaction):
+        stats = await bot.processor.cache.stats()
+        await interaction.response.send_message(
+            f"🗄️ **Extraction Cache**\n"
+            f"Hit rate: {stats['hit_rate']:.0%} ({stats['hits']} hits / {stats['misses']} misses)\n"
+            f"Entries: {stats['entries']} ({stats['bytes'] / 1024:.1f} KiB)",
+            ephemeral=True,
+        )
@@ -1,18 +1,46 @@
+import logging
+from typing import Optional
+from discord import app_commands
 import discord
-from calendar_api import test_calendar_connection
+from calendar_api import credential_store, finish_authorization, start_authorization, test_calendar_connection
 
+logger = logging.getLogger(__name__)
 
 def setup_connect_google_command(bot, guild_id):
     @bot.tree.command(name="connect_to_google", description="Connect bot to Google Calendar", guild=guild_id)
-    async def connectToGoogleCommand(interaction: discord.Interaction):
-        """Connect only *your* account to Google Calendar."""
-        await interaction.response.send_message("🔄 Connecting to Google Calendar...")
+    @app_commands.describe(code="The code (or whole URL) you were redirected to after approving access")
+    async def connectToGoogleCommand(interaction: discord.Interaction, code: Optional[str] = None):
+        """Connect *your* Google account to the bot."""
+        user_id = interaction.user.id
 
-        is_connected = test_calendar_connection()
+        if code is None:
+            auth_url = start_authorization(user_id)
+            await interaction.response.send_message(
+                f"🔗 [Approve Google Calendar access]({auth_url}), then run "
+                f"`/connect_to_google code:<code>` with the code (or the whole URL) you are redirected to.",
+                ephemeral=True,
+            )
+            return
+
+        await interaction.response.send_message("🔄 Connecting to Google Calendar...", ephemeral=True)
+
+        try:
+            await finish_authorization(user_id, code.strip())
+        except Exception as e:
+            logger.warning("Google authorization failed: user=%s error=%s", user_id, e)
+            await interaction.followup.send(
+                "❌ Could not complete the Google authorization. Run `/connect_to_google` to start again.",
+                ephemeral=True,
+            )
+            return
+
+        is_connected = await test_calendar_connection(user_id)
 
         if is_connected:
-            await interaction.followup.send("✅ Successfully connected to Google Calendar!")
+            await interaction.followup.send("✅ Successfully connected to Google Calendar!", ephemeral=True)
         else:
+            await credential_store.delete(user_id)
             await interaction.followup.send(
-                "❌ Failed to connect to Google Calendar. Check logs for error details."
-        )
\ No newline at end of file
+                "❌ Failed to connect to Google Calendar. Check logs for error details.",
+                ephemeral=True,
+        )
@@ -0,0 +1,97 @@
+from typing import Optional
+from discord import app_commands, Interaction
+
+from shifts import DAYS, format_minutes, parse_time_of_day
+from utils.coverage_index import MINUTES_PER_DAY, SLOT_MINUTES
+
+# Heatmap shades from nobody on shift up to the week's peak
+SHADES = " ░▒▓█"
+
+# Keep replies well under Discord's 2000 character limit
+MAX_LINES = 25
+
+def _span(shift, day: str) -> str:
+    text = f"{format_minutes(shift.start % MINUTES_PER_DAY)} - {format_minutes(shift.end % MINUTES_PER_DAY)}"
+    started = DAYS[shift.start // MINUTES_PER_DAY]
+    if started != day:
+        text += f" (from {started})"
+    return text + (f" ({shift.note})" if shift.note else "")
+
+def _heatmap(coverage) -> str:
+    """One row per day, one cell per hour, shaded by the fewest people on shift in that hour."""
+    hourly = coverage.staffing.reshape(len(DAYS), 24, 60 // SLOT_MINUTES).min(axis=2)
+    peak = max(int(coverage.staffing.max()), 1)
+    header = "".join(label.ljust(6) for label in ("12a", "6a", "12p", "6p"))
+    rows = [f"     {header}"]
+    for index, day in enumerate(DAYS):
+        cells = "".join(SHADES[-(-int(count) * (len(SHADES) - 1) // peak)] for count in hourly[index])
+        rows.append(f"{day[:3]}  {cells}  peak {int(coverage.staffing[index].max())}")
+    return "```\n" + "\n".join(rows) + f"\n```█ = {peak} on shift"
+
+def setup_coverage_command(bot, guild_id):
+    @bot.tree.command(name="whos_working", description="Show who is on shift on a day, or at a time", guild=guild_id)
+    @app_commands.describe(
+        day="Day of the week",
+        time="Time of day, e.g. 3pm or 15:30 (leave out for the whole day)",
+        week="Week start date (MM/DD/YYYY), defaults to the latest upload",
+    )
+    @app_commands.choices(day=[app_commands.Choice(name=day, value=day) for day in DAYS])
+    async def whos_working_command(interaction: Interaction, day: str, time: Optional[str] = None,
+                                   week: Optional[str] = None):
+        stored_week = await bot.store.get_week(interaction.guild_id, week)
+        if not stored_week or not stored_week.employees:
+            await interaction.response.send_message("❌ No schedule data loaded.")
+            return
+
+        coverage = stored_week.coverage
+        if time is None:
+            on_shift = coverage.working_on(day)
+            title = f"**Working {day}**"
+        else:
+            minute = parse_time_of_day(time)
+            if minute is None:
+                await interaction.response.send_message(f"❌ Couldn't read the time '{time}'. Try 3pm or 15:30.", ephemeral=True)
+                return
+            on_shift = coverage.working_at(day, minute)
+            title = f"**Working {day} at {format_minutes(minute)}**"
+
+        lines = [f"👤 **{shift.name}**: {_span(shift, day)}" for shift in on_shift[:MAX_LINES]]
+        if len(on_shift) > MAX_LINES:
+            lines.append(f"…and {len(on_shift) - MAX_LINES} more")
+        if not lines:
+            lines.append("Nobody is scheduled.")
+
+        notes = coverage.day_notes[day]
+        if notes:
+            lines.append("🏖️ " + ", ".join(f"{name} ({note})" for name, note in notes[:MAX_LINES]))
+
+        await interaction.response.send_message(f"{title} — {len(on_shift)} on shift\n" + "\n".join(lines))
+
+    @bot.tree.command(name="coverage", description="Show staffing through the week and where it runs short", guild=guild_id)
+    @app_commands.describe(
+        min_staff="Flag times with fewer people than this on shift",
+        week="Week start date (MM/DD/YYYY), defaults to the latest upload",
+    )
+    async def coverage_command(interaction: Interaction, min_staff: Optional[app_commands.Range[int, 1, 100]] = None,
+                               week: Optional[str] = None):
+        stored_week = await bot.store.get_week(interaction.guild_id, week)
+        if not stored_week or not stored_week.employees:
+            await interaction.response.send_message("❌ No schedule data loaded.")
+            return
+
+        coverage = stored_week.coverage
+        message = f"📊 **Coverage** {stored_week.week['From']} to {stored_week.week['To']}\n{_heatmap(coverage)}"
+
+        if min_staff is not None:
+            lines = [
+                f"⚠️ {day[:3]} {format_minutes(start)} - {format_minutes(end % MINUTES_PER_DAY)}: {fewest} on shift"
+                for day, stretches in coverage.understaffed(min_staff).items()
+                for start, end, fewest in stretches
+            ]
+            if not lines:
+                lines = [f"✅ At least {min_staff} on shift whenever anyone is working."]
+            elif len(lines) > MAX_LINES:
+                lines = lines[:MAX_LINES] + [f"…and {len(lines) - MAX_LINES} more"]
+            message += f"\n**Under {min_staff} on shift**\n" + "\n".join(lines)
+
+        await interaction.response.send_message(message)
@@ -0,0 +1,62 @@
+import asyncio
+import io
+from typing import Optional
+from discord import app_commands, Interaction
+import discord
+
+from schedule_export import render
+from utils.helpers import employee_autocomplete
+
+def setup_export_command(bot, guild_id):
+    @bot.tree.command(name="export", description="Download schedules as a calendar file, CSV or JSON", guild=guild_id)
+    @app_commands.describe(
+        format="File format",
+        employee="Only this employee's shifts (defaults to everyone)",
+        from_week="First week start date (MM/DD/YYYY), defaults to the latest upload",
+        to_week="Last week start date (MM/DD/YYYY), defaults to from_week or the latest upload",
+    )
+    @app_commands.choices(format=[
+        app_commands.Choice(name="Calendar (.ics)", value="ics"),
+        app_commands.Choice(name="Spreadsheet (.csv)", value="csv"),
+        app_commands.Choice(name="JSON", value="json"),
+    ])
+    async def export_command(interaction: Interaction, format: str, employee: Optional[str] = None,
+                             from_week: Optional[str] = None, to_week: Optional[str] = None):
+        if from_week is None and to_week is None:
+            latest = await bot.store.get_week(interaction.guild_id)
+            weeks = [latest] if latest else []
+        else:
+            weeks = await bot.store.weeks_between(interaction.guild_id, from_week, to_week or from_week)
+
+        if not weeks:
+            await interaction.response.send_message("❌ No schedule data for those weeks.", ephemeral=True)
+            return
+
+        # Match the employee against the newest week that knows them
+        if employee is not None:
+            resolved = None
+            for week in reversed(weeks):
+                resolved = week.name_index.resolve(employee)
+                if resolved:
+                    break
+            if resolved is None:
+                await interaction.response.send_message(f"❌ Employee '{employee}' not found!", ephemeral=True)
+                return
+            employee = resolved
+
+        await interaction.response.defer(ephemeral=True)
+        body = await asyncio.to_thread(render, format, weeks, employee)
+
+        label = employee.replace(" ", "_") if employee else "schedule"
+        span = weeks[0].week_key if len(weeks) == 1 else f"{weeks[0].week_key}_to_{weeks[-1].week_key}"
+        message = f"📤 {employee or 'All employees'}, {len(weeks)} week(s)"
+        if bot.feed_server is not None:
+            message += f"\n🔗 Subscribe instead: <{bot.feed_server.feed_url(interaction.guild_id or 0, employee, format)}>"
+
+        await interaction.followup.send(
+            message,
+            file=discord.File(io.BytesIO(body), filename=f"{label}_{span}.{format}"),
+            ephemeral=True,
+        )
+
+    export_command.autocomplete("employee")(employee_autocomplete(bot))
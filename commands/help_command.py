@@ -6,8 +6,24 @@ def setup_help_command(bot, guild_id):
         help_text = """
         📋 **Schedule Bot Commands**
         `/help` - Show help
-        `/new_schedule`
-        `/schedule <employee_name>`
-        `/sync_calendar <employee_name>`
+        `/new_schedule <schedule> [page_2] [page_3] [page_4]`
+        `/schedule <employee_name> [week]`
+        `/roster [week]`
+        `/weeks`
+        `/whos_working <day> [time] [week]`
+        `/coverage [min_staff] [week]`
+        `/hours <employee> [weeks]`
+        `/report [from_week] [to_week]`
+        `/sync_calendar <employee_name> [week]`
+        `/sync_all [week]`
+        `/auto_sync [employee_name] [use_primary]`
+        `/auto_sync_stop`
+        `/remind_me <employee_name> [minutes_before]`
+        `/remind_stop`
+        `/export <format> [employee] [from_week] [to_week]`
+        `/cache_stats`
+        `/jobs`
+        `/cancel_job <job_id>`
+        `/stats`
         """
         await interaction.response.send_message(help_text)
\ No newline at end of file
@@ -0,0 +1,86 @@
+import csv
+import io
+from typing import Optional
+
+import discord
+from discord import app_commands, Interaction
+
+from hours_rollup import ROLLING_WEEKS, format_hours, overtime_weekly_minutes
+from shifts import DAYS
+from utils.helpers import employee_autocomplete
+
+# Rows shown in the /report message; the attached CSV has everyone
+REPORT_ROWS = 20
+
+def _days_off(pto_days: int, sick_days: int) -> str:
+    parts = []
+    if pto_days:
+        parts.append(f"PTO {pto_days}")
+    if sick_days:
+        parts.append(f"sick {sick_days}")
+    return ", ".join(parts)
+
+def setup_hours_command(bot, guild_id):
+    @bot.tree.command(name="hours", description="Show an employee's weekly hours, rolling totals and days off", guild=guild_id)
+    @app_commands.describe(
+        employee="The employee's name",
+        weeks="How many recent weeks to show",
+    )
+    async def hours_command(interaction: Interaction, employee: str, weeks: app_commands.Range[int, 1, 12] = 4):
+        # Prefer the latest roster's spelling; former employees are matched by name as typed
+        latest = await bot.store.get_week(interaction.guild_id)
+        name = (latest.name_index.resolve(employee) if latest else None) or employee
+
+        history = await bot.store.employee_hours(interaction.guild_id, name, weeks)
+        if not history:
+            await interaction.response.send_message(f"❌ No hours recorded for '{employee}'.")
+            return
+
+        lines = [f"⏱️ **{history[0].name}** — last {len(history)} week(s)"]
+        for row in history:
+            days = " ".join(f"{day[:2]} {format_hours(minutes)}" for day, minutes in zip(DAYS, row.daily) if minutes)
+            flags = [f"{ROLLING_WEEKS}-wk {format_hours(row.rolling)}"]
+            if row.overtime:
+                flags.append(f"⚠️ overtime (+{format_hours(row.total - overtime_weekly_minutes())})")
+            if row.pto_days or row.sick_days:
+                flags.append(_days_off(row.pto_days, row.sick_days))
+            lines.append(f"**{row.week_from}**: {format_hours(row.total)} · " + " · ".join(flags))
+            if days:
+                lines.append(f"    {days}")
+
+        await interaction.response.send_message("\n".join(lines))
+
+    hours_command.autocomplete("employee")(employee_autocomplete(bot))
+
+    @bot.tree.command(name="report", description="Hours, overtime and days off per employee across weeks", guild=guild_id)
+    @app_commands.describe(
+        from_week=f"First week start date (MM/DD/YYYY), defaults to {ROLLING_WEEKS} weeks before to_week",
+        to_week="Last week start date (MM/DD/YYYY), defaults to the latest upload",
+    )
+    async def report_command(interaction: Interaction, from_week: Optional[str] = None, to_week: Optional[str] = None):
+        weeks, summaries = await bot.store.hours_report(interaction.guild_id, from_week, to_week)
+        if not summaries:
+            await interaction.response.send_message("❌ No schedule data for those weeks.")
+            return
+
+        rows = [
+            f"{summary.name[:20]:<20} {format_hours(summary.total):>7} {format_hours(summary.total // summary.weeks):>7}"
+            f" {summary.overtime_weeks:>3} {_days_off(summary.pto_days, summary.sick_days)}"
+            for summary in summaries[:REPORT_ROWS]
+        ]
+        table = "\n".join([f"{'Employee':<20} {'Total':>7} {'Avg/wk':>7} {'OT':>3} Days off", *rows])
+        more = f"\n…and {len(summaries) - REPORT_ROWS} more in the attached CSV" if len(summaries) > REPORT_ROWS else ""
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["employee", "weeks", "hours", "avg_weekly_hours", f"peak_{ROLLING_WEEKS}wk_hours",
+                         "overtime_weeks", "pto_days", "sick_days"])
+        for summary in summaries:
+            writer.writerow([summary.name, summary.weeks, f"{summary.total / 60:g}",
+                             f"{summary.total / 60 / summary.weeks:.2f}", f"{summary.peak_rolling / 60:g}",
+                             summary.overtime_weeks, summary.pto_days, summary.sick_days])
+
+        await interaction.response.send_message(
+            f"📊 **Hours report** {weeks[0]} to {weeks[-1]} ({len(weeks)} week(s))\n```\n{table}\n```{more}",
+            file=discord.File(io.BytesIO(buffer.getvalue().encode("utf-8")), filename=f"hours_{weeks[0]}_to_{weeks[-1]}.csv"),
+        )
@@ -0,0 +1,54 @@
+import time
+from discord import app_commands, Interaction
+
+from processing_queue import JobStatus
+
+STATUS_ICONS = {
+    JobStatus.QUEUED: "🕒",
+    JobStatus.RUNNING: "⚙️",
+    JobStatus.DONE: "✅",
+    JobStatus.FAILED: "❌",
+    JobStatus.CANCELLED: "🛑",
+}
+
+def _describe_job(bot, job) -> str:
+    icon = STATUS_ICONS[job.status]
+    if job.status == JobStatus.QUEUED:
+        detail = f"position {bot.job_queue.position(job)}"
+    elif job.status == JobStatus.RUNNING:
+        detail = f"running for {time.time() - job.started_at:.0f}s"
+    else:
+        detail = f"{job.status.value} in {job.finished_at - job.created_at:.0f}s"
+    return f"{icon} **#{job.id}** by <@{job.user_id}> — {detail}"
+
+def setup_jobs_command(bot, guild_id):
+    @bot.tree.command(name="jobs", description="Show schedule processing jobs for this server", guild=guild_id)
+    async def jobs_command(interaction: Interaction):
+        jobs = bot.job_queue.jobs(interaction.guild_id)[:15]
+        if not jobs:
+            await interaction.response.send_message("📭 No schedule processing jobs.", ephemeral=True)
+            return
+
+        lines = [_describe_job(bot, job) for job in jobs]
+        await interaction.response.send_message("📋 **Schedule Jobs**\n" + "\n".join(lines), ephemeral=True)
+
+    @bot.tree.command(name="cancel_job", description="Cancel a queued or running schedule job you started", guild=guild_id)
+    @app_commands.describe(job_id="The job number shown by /jobs")
+    async def cancel_job_command(interaction: Interaction, job_id: int):
+        job = bot.job_queue.get(job_id)
+        if job is None or job.guild_id != interaction.guild_id:
+            await interaction.response.send_message(f"❌ Job #{job_id} not found.", ephemeral=True)
+            return
+
+        # Only the uploader or someone who manages the server may cancel a job
+        if job.user_id != interaction.user.id and not interaction.permissions.manage_guild:
+            await interaction.response.send_message(
+                f"❌ Job #{job_id} was started by <@{job.user_id}>; only they or a server manager can cancel it.",
+                ephemeral=True,
+            )
+            return
+
+        if bot.job_queue.cancel(job_id):
+            await interaction.response.send_message(f"🛑 Cancelling job #{job_id}.", ephemeral=True)
+        else:
+            await interaction.response.send_message(f"❌ Job #{job_id} has already finished.", ephemeral=True)
@@ -1,15 +1,29 @@
+from typing import Optional
 from discord import app_commands
 import discord
 
+def _is_schedule_file(attachment: discord.Attachment) -> bool:
+    content_type = attachment.content_type or ""
+    return content_type.startswith("image/") or content_type == "application/pdf"
+
 def setup_new_schedule_command(bot, guild_id):
     @bot.tree.command(name="new_schedule", description="upload a new schedule", guild=guild_id)
-    @app_commands.describe(schedule="Image of Schedule Document")
-    async def newScheduleCommand(interaction: discord.Interaction, schedule: discord.Attachment):
+    @app_commands.describe(
+        schedule="Image or PDF of Schedule Document",
+        page_2="Another page or photo of the same week",
+        page_3="Another page or photo of the same week",
+        page_4="Another page or photo of the same week",
+    )
+    async def newScheduleCommand(interaction: discord.Interaction, schedule: discord.Attachment,
+                                 page_2: Optional[discord.Attachment] = None,
+                                 page_3: Optional[discord.Attachment] = None,
+                                 page_4: Optional[discord.Attachment] = None):
         """Handle Upload Schedules"""
+        attachments = [attachment for attachment in (schedule, page_2, page_3, page_4) if attachment is not None]
 
-        if not schedule.content_type.startswith('image/'):
-            await interaction.response.send_message("Please attach a valid schedule image file.", ephemeral=True)
+        if not all(_is_schedule_file(attachment) for attachment in attachments):
+            await interaction.response.send_message("Please attach valid schedule images or PDFs.", ephemeral=True)
             return
         
-        await bot._process_image_attachment(scheduleImage=schedule, interaction=interaction)
-        return
\ No newline at end of file
+        await bot._process_schedule_attachments(attachments=attachments, interaction=interaction)
+        return
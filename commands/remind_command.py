@@ -0,0 +1,43 @@
+from discord import app_commands, Interaction
+
+from shift_reminders import DEFAULT_LEAD_MINUTES
+from utils.helpers import employee_autocomplete, employee_not_found_message, find_employee
+
+def setup_remind_command(bot, guild_id):
+    @bot.tree.command(name="remind_me", description="Get a DM before each of an employee's shifts", guild=guild_id)
+    @app_commands.describe(
+        employee_name="The employee to follow",
+        minutes_before="How long before the shift starts to remind you",
+    )
+    async def remind_me_command(interaction: Interaction, employee_name: str,
+                                minutes_before: app_commands.Range[int, 0, 24 * 60] = DEFAULT_LEAD_MINUTES):
+        week = await bot.store.get_week(interaction.guild_id)
+        if week is None or not week.employees:
+            await interaction.response.send_message(
+                "❌ No schedule data loaded. Upload a schedule first!", ephemeral=True
+            )
+            return
+
+        employee = find_employee(week, employee_name)
+        if not employee:
+            await interaction.response.send_message(employee_not_found_message(week, employee_name), ephemeral=True)
+            return
+
+        upcoming = await bot.reminders.subscribe(
+            interaction.user.id, interaction.guild_id, employee["name"], minutes_before
+        )
+        await interaction.response.send_message(
+            f"⏰ You'll get a DM {minutes_before} minutes before each of **{employee['name']}**'s shifts "
+            f"({upcoming} coming up in the loaded schedules). New uploads are picked up automatically.\n"
+            f"Use `/remind_stop` to turn this off.",
+            ephemeral=True,
+        )
+
+    remind_me_command.autocomplete("employee_name")(employee_autocomplete(bot))
+
+    @bot.tree.command(name="remind_stop", description="Stop shift reminder DMs", guild=guild_id)
+    async def remind_stop_command(interaction: Interaction):
+        if await bot.reminders.unsubscribe(interaction.user.id, interaction.guild_id):
+            await interaction.response.send_message("🔕 Shift reminders turned off.", ephemeral=True)
+        else:
+            await interaction.response.send_message("❌ Shift reminders weren't on.", ephemeral=True)
@@ -1,18 +1,40 @@
+from typing import Optional
 from discord import app_commands, Interaction
-from utils.helpers import find_employee, format_employee_schedule
+
+from discord_view import RosterView
+from utils.helpers import employee_autocomplete, employee_not_found_message, find_employee
 
 def setup_schedule_command(bot, guild_id):
     @bot.tree.command(name="schedule", description="Show schedule for an employee", guild=guild_id)
-    @app_commands.describe(employee="The employee's name")
-    async def schedule_command(interaction: Interaction, employee: str):
-        if not bot.schedules:
+    @app_commands.describe(
+        employee="The employee's name",
+        week="Week start date (MM/DD/YYYY), defaults to the latest upload",
+    )
+    async def schedule_command(interaction: Interaction, employee: str, week: Optional[str] = None):
+        stored_week = await bot.store.get_week(interaction.guild_id, week)
+        if not stored_week or not stored_week.employees:
             await interaction.response.send_message("❌ No schedule data loaded.")
             return
         
-        employee_schedule = find_employee(bot, employee)
+        employee_schedule = find_employee(stored_week, employee)
         if not employee_schedule:
-            await interaction.response.send_message(f"❌ Employee '{employee}' not found.")
+            await interaction.response.send_message(employee_not_found_message(stored_week, employee))
             return
         
-        schedule_text = format_employee_schedule(bot, employee_schedule["name"], employee_schedule["schedule"])
-        await interaction.response.send_message(schedule_text)
\ No newline at end of file
+        await interaction.response.send_message(embed=stored_week.roster.employees[employee_schedule["name"]])
+
+    schedule_command.autocomplete("employee")(employee_autocomplete(bot))
+
+    @bot.tree.command(name="roster", description="Show everyone's schedule for a week", guild=guild_id)
+    @app_commands.describe(week="Week start date (MM/DD/YYYY), defaults to the latest upload")
+    async def roster_command(interaction: Interaction, week: Optional[str] = None):
+        stored_week = await bot.store.get_week(interaction.guild_id, week)
+        if not stored_week or not stored_week.employees:
+            await interaction.response.send_message("❌ No schedule data loaded.")
+            return
+
+        pages = stored_week.roster.pages
+        if len(pages) == 1:
+            await interaction.response.send_message(embed=pages[0])
+        else:
+            await interaction.response.send_message(embed=pages[0], view=RosterView(pages))
@@ -0,0 +1,51 @@
+import io
+
+import discord
+from discord import app_commands, Interaction
+
+from metrics import metrics
+
+def _latency_lines(name: str, label: str) -> list:
+    lines = []
+    for labels, histogram in sorted(metrics.histograms(name), key=lambda entry: -entry[1].count):
+        lines.append(
+            f"`{labels.get(label, name)}` ×{histogram.count} — "
+            f"p50 {histogram.quantile(0.5) * 1000:.0f} ms, p95 {histogram.quantile(0.95) * 1000:.0f} ms"
+        )
+    return lines
+
+def setup_stats_command(bot, guild_id):
+    @bot.tree.command(name="stats", description="Show bot latency and API call statistics", guild=guild_id)
+    @app_commands.default_permissions(administrator=True)
+    async def stats_command(interaction: Interaction):
+        lag = next((histogram for _, histogram in metrics.histograms("event_loop_lag")), None)
+        lag_text = (
+            f"p50 {lag.quantile(0.5) * 1000:.0f} ms, p99 {lag.quantile(0.99) * 1000:.0f} ms, "
+            f"max {lag.max * 1000:.0f} ms"
+            if lag else "no samples yet"
+        )
+
+        cache_hits = metrics.counter("extraction_cache", result="hit")
+        cache_lookups = cache_hits + metrics.counter("extraction_cache", result="miss")
+        list_hits = metrics.counter("calendar_list_cache", result="hit")
+        list_lookups = list_hits + metrics.counter("calendar_list_cache", result="miss")
+
+        sections = [
+            "📈 **Bot Stats**",
+            f"Event loop lag: {lag_text}",
+            "**Commands**", *(_latency_lines("command", "command") or ["none yet"]),
+            "**External calls**",
+            *_latency_lines("gemini_request", "model"),
+            *_latency_lines("attachment_download", "attachment_download"),
+            *_latency_lines("google_request", "method"),
+            f"Google retries: {metrics.total('google_retries'):g}",
+            "Pages extracted by: " + (", ".join(
+                f"{labels['backend']} {value:g}" for labels, value in metrics.counters("extraction_backend")
+            ) or "none yet"),
+            f"Extraction cache: {cache_hits:g}/{cache_lookups:g} hits",
+            f"Calendar list cache: {list_hits:g}/{list_lookups:g} hits",
+        ]
+
+        # Full Prometheus exposition attached for anything the summary leaves out
+        exposition = discord.File(io.BytesIO(metrics.render_prometheus().encode("utf-8")), filename="metrics.txt")
+        await interaction.response.send_message("\n".join(sections)[:2000], file=exposition, ephemeral=True)
@@ -0,0 +1,111 @@
+import logging
+from typing import Optional
+import time
+from discord import app_commands
+import discord
+
+from calendar_api import test_calendar_connection
+from calendar_sync import sync_all_employees
+from discord_view import ConfirmView
+from utils.helpers import resolve_sync_calendar
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between progress edits, to stay clear of Discord's edit rate limit
+PROGRESS_EDIT_INTERVAL = 2.0
+
+def _summarize(results: dict) -> str:
+    """Build the final /sync_all report, listing only employees that had problems."""
+    created = sum(line.startswith("✅") for lines in results.values() for line in lines)
+    updated = sum(line.startswith("🔁") for lines in results.values() for line in lines)
+    skipped = sum(line.startswith("⏩") for lines in results.values() for line in lines)
+    problems = [
+        f"**{name}:** " + "; ".join(line for line in lines if line.startswith("⚠️"))
+        for name, lines in results.items()
+        if any(line.startswith("⚠️") for line in lines)
+    ]
+
+    summary = (
+        f"✅ Synced {len(results)} employees — {created} events created, {updated} updated, {skipped} skipped"
+    )
+    if problems:
+        summary += "\n⚠️ Issues:\n" + "\n".join(problems)
+
+    # Stay inside Discord's 2000 character message limit
+    return summary if len(summary) <= 2000 else summary[:1997] + "..."
+
+async def _deliver_summary(interaction: discord.Interaction, summary: str):
+    """Send the report by DM, or to the channel if the user doesn't accept DMs."""
+    try:
+        await interaction.user.send(summary)
+        return
+    except discord.HTTPException as e:
+        logger.warning("Could not DM sync summary: user=%s error=%s", interaction.user.id, e)
+    try:
+        await interaction.channel.send(f"{interaction.user.mention} {summary}"[:2000])
+    except (AttributeError, discord.HTTPException) as e:
+        logger.warning("Could not post sync summary: user=%s error=%s", interaction.user.id, e)
+
+def setup_sync_all_command(bot, guild_id):
+    @bot.tree.command(name="sync_all", description="Sync every employee's schedule to your calendar", guild=guild_id)
+    @app_commands.describe(week="Week start date (MM/DD/YYYY), defaults to the latest upload")
+    async def syncAllCommand(interaction: discord.Interaction, week: Optional[str] = None):
+        """Sync the whole loaded roster to the user's Google Calendar"""
+        stored_week = await bot.store.get_week(interaction.guild_id, week)
+        if not stored_week or not stored_week.employees:
+            await interaction.response.send_message(
+                "❌ No schedule data loaded. Upload a schedule first!",
+                ephemeral=True,
+            )
+            return
+
+        user_id = interaction.user.id
+
+        # One connection check for the whole roster; it can outlast the 3 s window, so defer first
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        if not await test_calendar_connection(user_id):
+            await interaction.followup.send(
+                "❌ Failed to connect to Google Calendar. Use `/connect_to_google` to link your account.",
+                ephemeral=True,
+            )
+            return
+
+        view = ConfirmView()
+        await interaction.followup.send(
+            "Would you like to use your **primary calendar**?",
+            view=view,
+            ephemeral=True,
+        )
+
+        await view.wait()  # Wait for user to click
+
+        calendar_id, calendar_name = await resolve_sync_calendar(user_id, view.value)
+
+        total = len(stored_week.employees)
+        progress_message = await interaction.followup.send(
+            f"⏳ Syncing {total} employees using {calendar_name} ... (0/{total})",
+            ephemeral=True,
+            wait=True,
+        )
+        last_edit = time.monotonic()
+
+        async def on_progress(done, total, name, lines):
+            nonlocal last_edit
+            now = time.monotonic()
+            if done < total and now - last_edit < PROGRESS_EDIT_INTERVAL:
+                return
+            last_edit = now
+            await progress_message.edit(
+                content=f"⏳ Syncing {total} employees using {calendar_name} ... ({done}/{total}, last: {name})"
+            )
+
+        results = await sync_all_employees(user_id, stored_week, calendar_id, on_progress=on_progress)
+
+        summary = _summarize(results)
+        logger.info("Sync all finished: user=%s week=%s\n%s", user_id, stored_week.week["From"], summary)
+        try:
+            await progress_message.edit(content=summary)
+        except discord.HTTPException as e:
+            # The interaction token expires after 15 minutes; a long roster sync can outlast it
+            logger.warning("Could not edit sync summary: user=%s error=%s", user_id, e)
+            await _deliver_summary(interaction, summary)
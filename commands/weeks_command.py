@@ -0,0 +1,12 @@
+from discord import Interaction
+
+def setup_weeks_command(bot, guild_id):
+    @bot.tree.command(name="weeks", description="List stored schedule weeks", guild=guild_id)
+    async def weeks_command(interaction: Interaction):
+        weeks = await bot.store.list_weeks(interaction.guild_id)
+        if not weeks:
+            await interaction.response.send_message("❌ No schedule data loaded.")
+            return
+
+        lines = [f"📅 {from_date} to {to_date}" for _, from_date, to_date in weeks[:25]]
+        await interaction.response.send_message("**Stored Weeks**\n" + "\n".join(lines))
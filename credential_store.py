@@ -0,0 +1,211 @@
+import asyncio
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from cryptography.fernet import Fernet
+from google.oauth2.credentials import Credentials
+
+from utils.shared_db import SHARED_STATE_POLL_SECONDS, connect_shared, data_version
+
+logger = logging.getLogger(__name__)
+
+CREDENTIAL_STORE_PATH = "tokens/credentials.sqlite3"
+KEY_PATH = "tokens/.credential_key"
+
+# Refresh tokens this long before they expire, so commands never wait on a refresh
+REFRESH_MARGIN = datetime.timedelta(minutes=10)
+REFRESH_CHECK_SECONDS = 60
+
+def _load_cipher() -> Fernet:
+    """Fernet cipher from TOKEN_ENCRYPTION_KEY, falling back to a generated local key file."""
+    key = os.getenv("TOKEN_ENCRYPTION_KEY")
+    if key:
+        return Fernet(key.encode("utf-8"))
+
+    os.makedirs(os.path.dirname(KEY_PATH), exist_ok=True)
+    if not os.path.exists(KEY_PATH):
+        logger.warning("TOKEN_ENCRYPTION_KEY not set — generating a local key file.")
+        descriptor = os.open(KEY_PATH, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(descriptor, "wb") as f:
+            f.write(Fernet.generate_key())
+    with open(KEY_PATH, "rb") as f:
+        return Fernet(f.read().strip())
+
+def _refresh_blocking(creds: Credentials):
+    # google-auth's requests transport pulls in requests; load it with the first refresh, off the event loop
+    from google.auth.transport.requests import Request
+
+    creds.refresh(Request())
+
+class CredentialStore:
+    """
+    Google credentials per Discord user, encrypted at rest in SQLite.
+    Everything is loaded into memory at startup, so commands never touch the
+    filesystem; a background task refreshes tokens before they expire and
+    concurrent refreshes for the same user share one request. Other bot
+    processes' changes (links, refreshes, removals) are picked up by polling.
+    """
+
+    def __init__(self, path: str = CREDENTIAL_STORE_PATH, scopes=None):
+        self.path = path
+        self.scopes = scopes
+        self._credentials: Dict[int, Credentials] = {}
+        self._tokens: Dict[int, bytes] = {}  # encrypted rows as last seen, to spot other processes' changes
+        self._data_version: Optional[int] = None
+        self._refreshing: Dict[int, asyncio.Task] = {}
+        self._refresher: Optional[asyncio.Task] = None
+        self._watcher: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+        self._conn = None
+        self._cipher = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._cipher = _load_cipher()
+            self._conn = connect_shared(self.path)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS user_credentials ("
+                " user_id INTEGER PRIMARY KEY,"
+                " token BLOB NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _load_blocking(self) -> Optional[Tuple[Dict[int, Credentials], List[int]]]:
+        """
+        Credentials that are new or changed since the last load, and users
+        whose rows are gone; None if nothing was committed by anyone else.
+        """
+        with self._lock:
+            conn = self._connect()
+            version = data_version(conn)
+            if version == self._data_version:
+                return None
+            self._data_version = version
+
+            tokens = dict(conn.execute("SELECT user_id, token FROM user_credentials").fetchall())
+            changed = {user_id: token for user_id, token in tokens.items() if self._tokens.get(user_id) != token}
+            removed = [user_id for user_id in self._tokens if user_id not in tokens]
+            self._tokens = tokens
+
+        loaded = {}
+        for user_id, token in changed.items():
+            try:
+                info = json.loads(self._cipher.decrypt(token))
+                loaded[user_id] = Credentials.from_authorized_user_info(info, self.scopes)
+            except Exception as e:
+                logger.warning("Skipping unreadable credentials: user=%s error=%s", user_id, e)
+        return loaded, removed
+
+    def _apply(self, changes: Optional[Tuple[Dict[int, Credentials], List[int]]]) -> int:
+        if changes is None:
+            return 0
+        loaded, removed = changes
+        self._credentials.update(loaded)
+        for user_id in removed:
+            self._credentials.pop(user_id, None)
+        return len(loaded) + len(removed)
+
+    def _save_blocking(self, user_id: int, creds: Credentials):
+        with self._lock:
+            conn = self._connect()
+            token = self._cipher.encrypt(creds.to_json().encode("utf-8"))
+            conn.execute(
+                "INSERT OR REPLACE INTO user_credentials (user_id, token) VALUES (?, ?)",
+                (user_id, token),
+            )
+            conn.commit()
+            self._tokens[user_id] = token
+
+    def _delete_blocking(self, user_id: int):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM user_credentials WHERE user_id = ?", (user_id,))
+            conn.commit()
+            self._tokens.pop(user_id, None)
+
+    async def load(self):
+        """Read every stored credential into memory."""
+        self._apply(await asyncio.to_thread(self._load_blocking))
+        logger.info("Loaded Google credentials: users=%d", len(self._credentials))
+
+    def start(self):
+        if self._refresher is None:
+            self._refresher = asyncio.create_task(self._refresh_loop())
+        if self._watcher is None:
+            self._watcher = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        for task in (self._refresher, self._watcher):
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self._refresher = self._watcher = None
+
+    async def _watch(self):
+        """Pick up accounts linked, refreshed or removed by other bot processes."""
+        while True:
+            await asyncio.sleep(SHARED_STATE_POLL_SECONDS)
+            try:
+                changed = self._apply(await asyncio.to_thread(self._load_blocking))
+            except Exception as e:
+                logger.warning("Credential store poll failed: %s", e)
+                continue
+            if changed:
+                logger.info("Reloaded Google credentials changed elsewhere: users=%d", changed)
+
+    def is_connected(self, user_id: int) -> bool:
+        return user_id in self._credentials
+
+    async def get(self, user_id: int) -> Optional[Credentials]:
+        """In-memory credentials for a user, refreshed first if already expired."""
+        creds = self._credentials.get(user_id)
+        if creds is not None and not creds.valid and creds.refresh_token:
+            await self.refresh(user_id)
+        return creds
+
+    async def save(self, user_id: int, creds: Credentials):
+        self._credentials[user_id] = creds
+        await asyncio.to_thread(self._save_blocking, user_id, creds)
+
+    async def delete(self, user_id: int):
+        self._credentials.pop(user_id, None)
+        await asyncio.to_thread(self._delete_blocking, user_id)
+
+    async def refresh(self, user_id: int):
+        """Refresh a user's token; concurrent callers wait on the same request."""
+        task = self._refreshing.get(user_id)
+        if task is None:
+            task = asyncio.create_task(self._refresh(user_id))
+            self._refreshing[user_id] = task
+            task.add_done_callback(lambda _: self._refreshing.pop(user_id, None))
+        await asyncio.shield(task)
+
+    async def _refresh(self, user_id: int):
+        creds = self._credentials.get(user_id)
+        if creds is None or not creds.refresh_token:
+            return
+        await asyncio.to_thread(_refresh_blocking, creds)
+        await asyncio.to_thread(self._save_blocking, user_id, creds)
+
+    def _expiring(self):
+        # google-auth keeps expiry as a naive UTC datetime
+        deadline = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None) + REFRESH_MARGIN
+        return [
+            user_id for user_id, creds in self._credentials.items()
+            if creds.refresh_token and (creds.expiry is None or creds.expiry <= deadline)
+        ]
+
+    async def _refresh_loop(self):
+        while True:
+            for user_id in self._expiring():
+                try:
+                    await self.refresh(user_id)
+                except Exception as e:
+                    logger.warning("Background token refresh failed: user=%s error=%s", user_id, e)
+            await asyncio.sleep(REFRESH_CHECK_SECONDS)
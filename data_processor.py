@@ -1,92 +1,466 @@
-from google import genai
-import requests
+import aiohttp
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
 import os
-from typing import List, Optional
-from PIL import Image
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, List, Optional, Tuple
 import io
-from pydantic import BaseModel, Field
-
-class Week(BaseModel):
-    from_date: str = Field(alias="from")
-    to_date: str = Field(alias="to")
-
-class Employee(BaseModel):
-    name: str
-    Monday: Optional[str] = None
-    Tuesday: Optional[str] = None
-    Wednesday: Optional[str] = None
-    Thursday: Optional[str] = None
-    Friday: Optional[str] = None
-    Saturday: Optional[str] = None
-    Sunday: Optional[str] = None
-
-class Schedule(BaseModel):
-    week: Week
-    employees: List[Employee]  # Changed from Dict to List
 
-class ScheduleDataProcessor:
-    def __init__(self):
-        self.client = genai.Client(api_key=os.getenv('GEMINI_API_KEY'))
-    
-    async def extract_schedule_with_ai(self, image_url: str) -> Optional[dict]:
-        """Extract schedule using Gemini Vision with structured output."""
-        
-        # Step 1: Download and convert image
-        try:
-            print(f"Downloading image from: {image_url}")
-            response = requests.get(image_url)
-            response.raise_for_status()
-            pil_image = Image.open(io.BytesIO(response.content))
-            print(f"Image ready: {pil_image.format}, Size: {pil_image.size}")
-        except Exception as img_err:
-            print(f"Error processing image: {img_err}")
-            return None
-        
-        # Step 2: Call Gemini API with structured output
-        try:
-            prompt = """
+from metrics import metrics
+from ocr_extractor import default_local_extractor
+from schedule_cache import ExtractionCache
+from schedule_models import Schedule
+from schedule_store import normalize_name
+from shifts import DAYS, parse_week_shifts, shifts_to_json
+from utils.resilience import CircuitBreaker, Deadline, call_with_retries, hedged
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # PDF schedules are optional
+    pdfium = None
+
+if TYPE_CHECKING:
+    from google.genai import types
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+GEMINI_MODEL = "gemini-2.5-flash"
+
+EXTRACTION_PROMPT = """
             Extract the work schedule from this image.
             Include the week date range and each employee's daily work hours.
             Use null for days when employees are not working.
             Include any notes like PTO or sick days in the time slot.
             For each employee, include their name and their schedule for each day of the week.
             """
-            
-            print("Calling Gemini API...")
-            gemini_response = self.client.models.generate_content(
-                model="gemini-2.5-flash",
-                contents=[prompt, pil_image],
+
+# Download limits: reject oversized bodies and anything that isn't a known image format or a PDF
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+DOWNLOAD_TIMEOUT_SECONDS = 30
+IMAGE_MAGIC_BYTES = (
+    b"\x89PNG\r\n\x1a\n",  # PNG
+    b"\xff\xd8\xff",         # JPEG
+    b"GIF87a",
+    b"GIF89a",
+    b"RIFF",                 # WEBP (checked further below)
+)
+PDF_MAGIC_BYTES = b"%PDF-"
+
+# Pages rasterized from one PDF; anything beyond this is ignored
+MAX_PDF_PAGES = 10
+
+# Gemini requests in flight at once, shared by every page of every job
+MAX_CONCURRENT_GEMINI_CALLS = 6
+
+# Each Gemini attempt times out, and 429/5xx retries stop at the page's deadline
+GEMINI_ATTEMPT_TIMEOUT_SECONDS = 60
+GEMINI_DEADLINE_SECONDS = 150
+GEMINI_MAX_RETRIES = 3
+
+# Opens after consecutive Gemini failures so uploads fall back (or fail) fast during an outage
+gemini_breaker = CircuitBreaker("gemini", failure_threshold=5, reset_timeout=60.0)
+
+# Phone photos are downscaled to this bound and re-encoded before upload to Gemini
+MAX_IMAGE_DIMENSION = 2048
+UPLOAD_JPEG_QUALITY = 85
+
+# Bump when the returned dict format changes so cached extractions are ignored
+SCHEMA_VERSION = "2"
+
+def _schema_fingerprint() -> str:
+    """Schema version plus a digest of the Schedule model, so model edits invalidate the cache."""
+    schema = json.dumps(Schedule.model_json_schema(), sort_keys=True)
+    return f"{SCHEMA_VERSION}:{hashlib.sha256(schema.encode('utf-8')).hexdigest()[:16]}"
+
+SCHEMA_FINGERPRINT = _schema_fingerprint()
+
+class ImageDownloadError(Exception):
+    """Raised when an attachment is too large or is not a supported image or PDF."""
+
+def _is_supported_image(header: bytes) -> bool:
+    if header.startswith(b"RIFF"):
+        return header[8:12] == b"WEBP"
+    return header.startswith(IMAGE_MAGIC_BYTES)
+
+def _is_pdf(header: bytes) -> bool:
+    return bytes(header[:len(PDF_MAGIC_BYTES)]) == PDF_MAGIC_BYTES
+
+def _is_supported_attachment(header: bytes) -> bool:
+    return _is_supported_image(header) or _is_pdf(header)
+
+def _is_transient_gemini_error(error: Exception) -> bool:
+    """Rate limits, server errors and dropped connections are worth retrying; bad requests are not."""
+    # Both already loaded by the call that failed
+    import httpx
+    from google.genai import errors as genai_errors
+
+    if isinstance(error, genai_errors.APIError):
+        return error.code == 429 or error.code >= 500
+    return isinstance(error, (ConnectionError, httpx.TransportError))
+
+def _schedule_to_dict(schedule: Schedule) -> dict:
+    """Convert an extracted Schedule to the dict format used across the bot."""
+    employees = {
+        emp.name: {
+            "Monday": emp.Monday,
+            "Tuesday": emp.Tuesday,
+            "Wednesday": emp.Wednesday,
+            "Thursday": emp.Thursday,
+            "Friday": emp.Friday,
+            "Saturday": emp.Saturday,
+            "Sunday": emp.Sunday,
+        }
+        for emp in schedule.employees
+    }
+    return {
+        "Week": {
+            "From": schedule.week.from_date,
+            "To": schedule.week.to_date
+        },
+        "Employees": employees,
+        # Parsed once here so nothing downstream re-parses the time strings
+        "Shifts": shifts_to_json(parse_week_shifts(employees)),
+    }
+
+def merge_extractions(pages: List[dict]) -> dict:
+    """
+    Merge per-page extractions into one week. Employees listed on several
+    pages are matched by normalized name; a day filled in on more than one
+    page keeps every distinct slot, comma-separated like a split shift.
+    """
+    week = next((page["Week"] for page in pages if page["Week"].get("From")), pages[0]["Week"])
+    employees = {}
+    display_names = {}
+
+    for page in pages:
+        for name, schedule in page["Employees"].items():
+            key = normalize_name(name)
+            if key not in display_names:
+                display_names[key] = name
+                employees[name] = dict(schedule)
+                continue
+
+            merged = employees[display_names[key]]
+            for day in DAYS:
+                slot = (schedule.get(day) or "").strip()
+                current = merged.get(day)
+                if not slot:
+                    continue
+                if not current:
+                    merged[day] = slot
+                elif slot.casefold() not in (part.strip().casefold() for part in current.split(",")):
+                    merged[day] = f"{current}, {slot}"
+
+    return {
+        "Week": week,
+        "Employees": employees,
+        "Shifts": shifts_to_json(parse_week_shifts(employees)),
+    }
+
+class _BufferReader(io.RawIOBase):
+    """Read-only seekable file over a buffer, so PIL decodes without copying the whole body."""
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer)
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        n = max(0, min(len(b), len(self._view) - self._pos))
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+class ScheduleDataProcessor:
+    def __init__(self):
+        self.client = None  # built on first use: importing google.genai alone takes about half a second
+        self._client_lock = threading.Lock()
+        self._genai_types = None
+        # Send a duplicate Gemini request when the first hasn't answered after this many seconds;
+        # GEMINI_HEDGE_AFTER_SECONDS unset or 0 disables hedging
+        self.hedge_after = float(os.getenv("GEMINI_HEDGE_AFTER_SECONDS") or 0) or None
+        self.cache = ExtractionCache()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._gemini_slots = asyncio.Semaphore(MAX_CONCURRENT_GEMINI_CALLS)
+        # EXTRACTION_PROCESSES worker processes decode, rasterize and re-encode pages, so CPU-heavy
+        # image work never holds the GIL the gateway heartbeat needs; 0 keeps it in threads.
+        # Spawned rather than forked: the bot process has live threads and sockets
+        processes = int(os.getenv("EXTRACTION_PROCESSES", "0"))
+        self._image_pool = ProcessPoolExecutor(
+            processes, mp_context=multiprocessing.get_context("spawn")
+        ) if processes > 0 else None
+        # Tried before Gemini on every page; None sends everything to Gemini
+        self.local_extractor = default_local_extractor(self._image_pool)
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Pooled HTTP session reused for every attachment download."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=DOWNLOAD_TIMEOUT_SECONDS)
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+        if self._image_pool is not None:
+            self._image_pool.shutdown(wait=False, cancel_futures=True)
+
+    def _load_gemini(self):
+        with self._client_lock:
+            from google.genai import types
+            if self.client is None:
+                from google import genai
+                self.client = genai.Client(api_key=os.getenv('GEMINI_API_KEY'))
+            self._genai_types = types
+
+    async def _gemini_part(self, jpeg: bytes) -> "types.Part":
+        """Wrap a page for Gemini, importing google.genai and building the client off the event loop the first time."""
+        if self._genai_types is None:
+            await asyncio.to_thread(self._load_gemini)
+        return self._genai_types.Part.from_bytes(data=jpeg, mime_type="image/jpeg")
+
+    async def _run_cpu(self, func, *args):
+        """Run CPU-bound image work in the process pool, or a worker thread without one."""
+        if self._image_pool is None:
+            return await asyncio.to_thread(func, *args)
+        return await asyncio.get_running_loop().run_in_executor(self._image_pool, func, *args)
+
+    async def _download_attachment(self, url: str) -> bytearray:
+        """Stream an image or PDF into a size-capped buffer, rejecting anything else as early as possible."""
+        async with self._get_session().get(url) as response:
+            response.raise_for_status()
+
+            content_type = response.headers.get("Content-Type", "")
+            if content_type and not content_type.startswith(("image/", "application/pdf")):
+                raise ImageDownloadError(f"Unsupported content type: {content_type}")
+
+            expected = response.content_length
+            if expected is not None and expected > MAX_IMAGE_BYTES:
+                raise ImageDownloadError(f"Image is too large ({expected} bytes)")
+
+            # Preallocate when the size is known so the body is written in place
+            buffer = bytearray(expected or 0)
+            view = memoryview(buffer)
+            size = 0
+            checked_magic = False
+
+            async for chunk in response.content.iter_chunked(64 * 1024):
+                end = size + len(chunk)
+                if end > MAX_IMAGE_BYTES:
+                    raise ImageDownloadError("Image is too large")
+                if expected is not None and end <= expected:
+                    view[size:end] = chunk
+                else:
+                    view.release()
+                    buffer[size:] = chunk
+                    view = memoryview(buffer)
+                size = end
+
+                if not checked_magic and size >= 12:
+                    if not _is_supported_attachment(bytes(view[:12])):
+                        raise ImageDownloadError("Attachment is not a supported image or PDF")
+                    checked_magic = True
+
+            view.release()
+            del buffer[size:]
+            if not checked_magic and not _is_supported_attachment(bytes(buffer[:12])):
+                raise ImageDownloadError("Attachment is not a supported image or PDF")
+            return buffer
+
+    @staticmethod
+    def _fit(image: "Image.Image") -> "Image.Image":
+        """Downscale to MAX_IMAGE_DIMENSION in RGB (or grayscale) for every extraction backend."""
+        image.thumbnail((MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION))
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        return image
+
+    @staticmethod
+    def _encode_image(image: "Image.Image") -> bytes:
+        """Re-encode a prepared page as JPEG for upload."""
+        encoded = io.BytesIO()
+        image.save(encoded, format="JPEG", quality=UPLOAD_JPEG_QUALITY)
+        return encoded.getvalue()
+
+    @classmethod
+    def _prepare_image(cls, image_bytes) -> "Image.Image":
+        """Decode a photo or screenshot and shrink it to the working size."""
+        # Imported in the CPU worker, so PIL never loads on the event loop
+        from PIL import Image, ImageOps
+
+        with Image.open(_BufferReader(image_bytes)) as pil_image:
+            logger.debug("Preparing image: format=%s size=%s", pil_image.format, pil_image.size)
+
+            # JPEG can decode straight to a reduced scale, skipping most of the full-size work
+            pil_image.draft("RGB", (MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION))
+            return cls._fit(ImageOps.exif_transpose(pil_image))
+
+    @classmethod
+    def _rasterize_pdf(cls, pdf_bytes) -> List["Image.Image"]:
+        """Render each PDF page (up to MAX_PDF_PAGES) straight at the working size."""
+        if pdfium is None:
+            raise ImageDownloadError("PDF schedules need the pypdfium2 package")
+
+        pdf = pdfium.PdfDocument(bytes(pdf_bytes))
+        try:
+            pages = []
+            for index in range(min(len(pdf), MAX_PDF_PAGES)):
+                page = pdf[index]
+                try:
+                    width, height = page.get_size()
+                    bitmap = page.render(scale=MAX_IMAGE_DIMENSION / max(width, height, 1))
+                    pages.append(cls._fit(bitmap.to_pil()))
+                finally:
+                    page.close()
+            logger.debug("Rasterized PDF: pages=%d of %d", len(pages), len(pdf))
+            return pages
+        finally:
+            pdf.close()
+    
+    async def extract_schedule(self, urls: List[str]) -> Optional[dict]:
+        """
+        Extract one week from one or more attachments (images or PDFs).
+        Every page is extracted concurrently and the results are merged,
+        so a multi-page schedule takes about as long as its slowest page.
+        Returns None if any attachment can't be read or extracted.
+        """
+        # Step 1: Download every attachment at once
+        try:
+            with metrics.timer("attachment_download"):
+                downloads = await asyncio.gather(*(self._download_attachment(url) for url in urls))
+        except Exception as download_err:
+            logger.warning("Attachment download failed: urls=%s error=%s", urls, download_err)
+            return None
+
+        # Step 2: Extract each attachment, its pages in parallel
+        results = await asyncio.gather(*(
+            self._extract_attachment(url, data) for url, data in zip(urls, downloads)
+        ))
+        del downloads
+        if any(result is None for result in results):
+            return None
+        return results[0] if len(results) == 1 else merge_extractions(results)
+
+    async def _extract_attachment(self, url: str, data: bytearray) -> Optional[dict]:
+        """Extraction for one downloaded image or PDF, cached by its bytes."""
+        # Reuse a previous extraction of the same file, if any
+        cache_key = ExtractionCache.make_key(data, EXTRACTION_PROMPT, GEMINI_MODEL, SCHEMA_FINGERPRINT)
+        cached = await self.cache.get(cache_key)
+        if cached is not None:
+            metrics.inc("extraction_cache", result="hit")
+            logger.info("Extraction cache hit: key=%s", cache_key[:12])
+            return cached
+        metrics.inc("extraction_cache", result="miss")
+
+        # Decode and shrink the image, or render the PDF pages, off the event loop
+        try:
+            if _is_pdf(data):
+                images = await self._run_cpu(self._rasterize_pdf, data)
+            else:
+                images = [await self._run_cpu(self._prepare_image, data)]
+        except Exception as img_err:
+            logger.warning("Attachment decode failed: url=%s error=%s", url, img_err)
+            return None
+        if not images:
+            logger.warning("Attachment has no pages: url=%s", url)
+            return None
+
+        # Extract every page at once
+        extractions = await asyncio.gather(*(self._extract_page(image) for image in images))
+        if any(extraction is None for extraction in extractions):
+            return None
+
+        pages = [page for page, _ in extractions]
+        result = pages[0] if len(pages) == 1 else merge_extractions(pages)
+        # Low-confidence fallbacks are kept out of the cache so the next upload retries Gemini
+        if all(trusted for _, trusted in extractions):
+            await self.cache.put(cache_key, result)
+        return result
+
+    async def _extract_page(self, image: "Image.Image") -> Optional[Tuple[dict, bool]]:
+        """
+        Try the local backend first and keep its result when it is confident
+        enough; otherwise ask Gemini. If Gemini fails too, a low-confidence
+        local result is still better than nothing. Returns (page, trusted).
+        """
+        local = None
+        if self.local_extractor is not None:
+            local = await self.local_extractor.extract(image)
+            if local is not None and local.confidence >= self.local_extractor.min_confidence:
+                metrics.inc("extraction_backend", backend=local.backend)
+                logger.info("Extracted page locally: backend=%s confidence=%.2f", local.backend, local.confidence)
+                return _schedule_to_dict(local.schedule), True
+
+        jpeg = await self._run_cpu(self._encode_image, image)
+        schedule = await self._call_gemini(await self._gemini_part(jpeg))
+        if schedule is not None:
+            metrics.inc("extraction_backend", backend="gemini")
+            return _schedule_to_dict(schedule), True
+
+        if local is not None and local.schedule.employees:
+            metrics.inc("extraction_backend", backend=f"{local.backend}_fallback")
+            logger.warning("Using low-confidence local extraction: backend=%s confidence=%.2f",
+                           local.backend, local.confidence)
+            return _schedule_to_dict(local.schedule), False
+        return None
+
+    async def _generate(self, image_part: "types.Part"):
+        with metrics.timer("gemini_request", model=GEMINI_MODEL):
+            return await self.client.aio.models.generate_content(
+                model=GEMINI_MODEL,
+                contents=[EXTRACTION_PROMPT, image_part],
                 config={
                     "response_mime_type": "application/json",
                     "response_schema": Schedule,
                 }
             )
+
+    async def _call_gemini(self, image_part: "types.Part") -> Optional[Schedule]:
+        """
+        Extract one page with Gemini, retrying transient errors within
+        GEMINI_DEADLINE_SECONDS and hedging slow requests when enabled.
+        Returns None on failure, or straight away while the circuit is open.
+        """
+        try:
+            # The slot is held across retries; a hedged duplicate runs alongside it
+            async with self._gemini_slots:
+                gemini_response = await call_with_retries(
+                    lambda: hedged(lambda: self._generate(image_part), self.hedge_after, name="gemini"),
+                    name="gemini",
+                    deadline=Deadline(GEMINI_DEADLINE_SECONDS),
+                    attempt_timeout=GEMINI_ATTEMPT_TIMEOUT_SECONDS,
+                    retryable=_is_transient_gemini_error,
+                    breaker=gemini_breaker,
+                    max_retries=GEMINI_MAX_RETRIES,
+                )
             
             # Use the parsed response directly
             schedule: Schedule = gemini_response.parsed
-            employee_count = len(schedule.employees)
-            print(f"Successfully extracted schedule with {employee_count} employees")
-            
-            # Convert to your original dict format for Discord bot compatibility
-            return {
-                "Week": {
-                    "From": schedule.week.from_date,
-                    "To": schedule.week.to_date
-                },
-                "Employees": {
-                    emp.name: {
-                        "Monday": emp.Monday,
-                        "Tuesday": emp.Tuesday,
-                        "Wednesday": emp.Wednesday,
-                        "Thursday": emp.Thursday,
-                        "Friday": emp.Friday,
-                        "Saturday": emp.Saturday,
-                        "Sunday": emp.Sunday,
-                    }
-                    for emp in schedule.employees
-                }
-            }
+            logger.info("Extracted schedule: employees=%d", len(schedule.employees))
+            return schedule
             
         except Exception as gemini_err:
-            print(f"Error calling Gemini API: {gemini_err}")
-            return None
\ No newline at end of file
+            logger.error("Gemini extraction failed: %s", gemini_err)
+            return None
@@ -1,30 +1,179 @@
 import discord
+from discord import app_commands
 from discord.ext import commands
+from auto_sync import AutoSyncScheduler
+from calendar_api import NotConnectedError, credential_store
 from data_processor import ScheduleDataProcessor
+from feed_server import ScheduleFeedServer
+from metrics import LoopLagMonitor, StartupProfile, metrics
+from processing_queue import ScheduleJobQueue
+from schedule_store import ScheduleStore
+from shift_reminders import ShiftReminderService
+from utils.resilience import CircuitOpenError
 import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional
 
-class DiscordBot(commands.Bot):
-    """Discord bot for processing schedule images."""
+logger = logging.getLogger(__name__)
+
+# Schedule images extracted at the same time
+EXTRACTION_WORKERS = 3
+
+# Hash of the command signatures last synced, per target; delete the file to force a sync
+COMMAND_SYNC_STATE_PATH = "data/command_sync.json"
+
+class DiscordBot(commands.AutoShardedBot):
+    """
+    Discord bot for processing schedule images. Runs every shard in one
+    process by default; pass shard_ids/shard_count to run a subset, with
+    other processes sharing the same data/ and tokens/ databases.
+    """
 
     selected_employee = ""
     
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, command_guild: Optional[discord.abc.Snowflake] = None,
+                 startup: Optional[StartupProfile] = None, **kwargs):
         super().__init__(*args, **kwargs)
+        self.command_guild = command_guild  # None syncs slash commands globally
+        self.startup = startup or StartupProfile(metrics)
+        self._startup_reported = False
         self.processor = ScheduleDataProcessor()
-        self.schedules = {}  # Store extracted schedules
-        self.current_week = None  # Store current week info
+        self.job_queue = ScheduleJobQueue(self.processor, workers=EXTRACTION_WORKERS)
+        self.store = ScheduleStore()  # Extracted schedules per guild and week
+        self.feed_server = ScheduleFeedServer.from_env(self.store)  # None unless FEED_PORT/FEED_SECRET are set
+        self.auto_sync = AutoSyncScheduler(self.store)  # Background calendar syncs for opted-in users
+        self.reminders = ShiftReminderService(self)  # DM reminders before followed employees' shifts
+        self.lag_monitor = LoopLagMonitor(metrics)
+        self._command_started: Dict[int, float] = {}  # interaction id -> perf_counter at receipt
+        self.tree.on_error = self._on_app_command_error
     
-    async def on_ready(self):
-        """Called when the bot is ready."""
-        print(f'Logged on as {self.user}!')
+    async def setup_hook(self):
+        """Start background workers once the event loop is running."""
+        self.startup.mark("login")
+        self.lag_monitor.start()
+        self.job_queue.start()
+        self.store.start()
+        await credential_store.load()
+        credential_store.start()
+        self.startup.mark("credentials")
+        self.auto_sync.start()
+        await self.reminders.start()
+        if self.feed_server is not None:
+            await self.feed_server.start()
+        self.startup.mark("background_tasks")
+        await self._sync_commands()
+        self.startup.mark("command_sync")
+
+    async def close(self):
+        """Stop workers and release pooled HTTP connections before shutting down."""
+        await self.lag_monitor.stop()
+        self.auto_sync.stop()
+        await self.reminders.stop()
+        if self.feed_server is not None:
+            await self.feed_server.stop()
+        await self.job_queue.stop()
+        await self.store.stop()
+        await credential_store.stop()
+        await self.processor.close()
+        await super().close()
+
+    def _command_hash(self) -> str:
+        """Hash of every slash command's signature as Discord would receive it."""
+        payload = sorted(
+            (command.to_dict(self.tree) for command in self.tree.get_commands(guild=self.command_guild)),
+            key=lambda command: command["name"],
+        )
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _read_sync_state() -> Dict[str, str]:
+        try:
+            with open(COMMAND_SYNC_STATE_PATH, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _write_sync_state(state: Dict[str, str]):
+        os.makedirs(os.path.dirname(COMMAND_SYNC_STATE_PATH), exist_ok=True)
+        temporary = f"{COMMAND_SYNC_STATE_PATH}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(temporary, COMMAND_SYNC_STATE_PATH)
+
+    async def _sync_commands(self):
+        """
+        Publish slash commands once per deployment: only the process running
+        shard 0 does it, and only when their signatures changed since the
+        last successful sync, so restarts stay clear of Discord's rate limits.
+        """
+        if self.shard_ids is not None and 0 not in self.shard_ids:
+            return
+
+        target = f"guild {self.command_guild.id}" if self.command_guild else "all guilds"
+        key = str(self.command_guild.id) if self.command_guild else "global"
+        digest = self._command_hash()
+        state = self._read_sync_state()
+        if state.get(key) == digest:
+            logger.info("Slash commands unchanged, skipping sync to %s", target)
+            return
 
         try:
-            guild = discord.Object(id=1328907522299658260)
-            synced= await self.tree.sync(guild=guild)
-            print(f"Synced {len(synced)} commands to guild {guild.id}")
+            synced = await self.tree.sync(guild=self.command_guild)
+            logger.info("Synced %d commands to %s", len(synced), target)
+            state[key] = digest
+            self._write_sync_state(state)
 
         except Exception as e:
-            print(f'Error syncing commands: {e}')
+            logger.error("Error syncing commands: %s", e)
+
+    async def on_ready(self):
+        """Called when the bot is ready, and again after gateway reconnects that couldn't resume."""
+        logger.info("Logged on as %s: shards=%s of %s", self.user, self.shard_ids or "all", self.shard_count)
+        if not self._startup_reported:
+            self._startup_reported = True
+            self.startup.mark("gateway")
+            logger.info("Startup profile: %s", self.startup.summary())
+
+    async def on_interaction(self, interaction: discord.Interaction):
+        """Note when each slash command arrives so its latency can be recorded."""
+        if interaction.type == discord.InteractionType.application_command:
+            self._command_started[interaction.id] = time.perf_counter()
+
+    def _record_command(self, interaction: discord.Interaction, status: str):
+        started = self._command_started.pop(interaction.id, None)
+        if started is not None and interaction.command is not None:
+            metrics.observe("command", time.perf_counter() - started,
+                            command=interaction.command.qualified_name, status=status)
+
+    async def on_app_command_completion(self, interaction: discord.Interaction, command):
+        self._record_command(interaction, "ok")
+
+    async def _on_app_command_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        self._record_command(interaction, "error")
+        command = interaction.command.qualified_name if interaction.command else None
+        logger.error("Command failed: command=%s user=%s", command, interaction.user.id, exc_info=error)
+
+        original = getattr(error, "original", error)
+        if isinstance(original, CircuitOpenError):
+            content = "❌ Google Calendar is unavailable right now. Try again in a few minutes."
+        elif isinstance(original, (NotConnectedError, ValueError)):
+            content = f"❌ {original}"
+        else:
+            content = "❌ Something went wrong running that command. Please try again."
+
+        # Commands that deferred are stuck on "thinking…" until something is sent
+        try:
+            if interaction.response.is_done():
+                await interaction.followup.send(content, ephemeral=True)
+            else:
+                await interaction.response.send_message(content, ephemeral=True)
+        except discord.HTTPException as e:
+            logger.warning("Could not report command error: command=%s error=%s", command, e)
 
     async def on_message(self, message: discord.Message):
         """Handle incoming messages."""
@@ -34,28 +183,47 @@ class DiscordBot(commands.Bot):
         
         # # Process image attachments
         # if message.attachments:
-        #     await self._process_image_attachment(message)
+        #     await self._process_schedule_attachments(message.attachments, message)
     
-    async def _process_image_attachment(self, scheduleImage: discord.Attachment, interaction: discord.Interaction):
+    async def _process_schedule_attachments(self, attachments: List[discord.Attachment], interaction: discord.Interaction):
+        """Extract one week from the uploaded images and/or PDFs and save it."""
         await interaction.response.defer()
         
         # Create a task to keep typing indicator alive
         typing_task = asyncio.create_task(self._keep_typing(interaction.channel))
         
         try:
-            # Extract and process schedule data
-            data = await self.processor.extract_schedule_with_ai(scheduleImage.url)
-            print(f"Extracted Data: {data}")
+            # Queue the extraction so bursts of uploads share a bounded pool of workers
+            urls = [attachment.url for attachment in attachments]
+            job = await self.job_queue.submit(interaction.guild_id, interaction.user.id, urls)
+            position = self.job_queue.position(job)
+            status_message = await interaction.followup.send(
+                f'⏳ Schedule queued as job #{job.id} (position {position}). Use `/jobs` to check progress.'
+                if position > 1 else f'⏳ Processing schedule (job #{job.id})...',
+                wait=True,
+            )
+
+            await asyncio.wait([job.future])
+            if job.future.cancelled():
+                typing_task.cancel()
+                await status_message.edit(content=f'🛑 Job #{job.id} was cancelled.')
+                return
+            data = job.future.result()
+
+            logger.debug("Extracted data: job=%s data=%s", job.id, data)
             
             # Stop the typing indicator
             typing_task.cancel()
             
             if not data:
-                await interaction.followup.send('❌ Failed to extract data from image.')
+                await status_message.edit(content='❌ Failed to extract data from the schedule.')
                 return
 
-            self.current_week = data["Week"]
-            self.schedules = data["Employees"]
+            # Diff against the stored copy of this week so only changed employees get re-synced
+            previous = await self.store.get_week(interaction.guild_id, data["Week"]["From"])
+            week = await self.store.save_week(interaction.guild_id, data)
+            await self.auto_sync.schedule_changed(previous, week)
+            await self.reminders.schedule_changed(previous, week)
             
             # Send success message
             week_info = data["Week"]
@@ -63,15 +231,15 @@ class DiscordBot(commands.Bot):
             to_date = week_info.get("To", "Unknown")
             employee_count = len(data["Employees"])
             
-            await interaction.followup.send(
-                f'✅ Loaded schedules for {employee_count} employees from {from_date} to {to_date}\n'
+            await status_message.edit(
+                content=f'✅ Loaded schedules for {employee_count} employees from {from_date} to {to_date}\n'
                 f'Use `/help` to see available commands!'
             )
             
-        except Exception as e:
+        except Exception:
             typing_task.cancel()
-            print(f'Error processing image: {e}')
-            await interaction.followup.send('❌ An error occurred while processing the image.')
+            logger.exception("Error processing schedule: urls=%s", [attachment.url for attachment in attachments])
+            await interaction.followup.send('❌ An error occurred while processing the schedule.')
 
     async def _keep_typing(self, channel):
         """Keep the typing indicator active."""
@@ -87,4 +255,4 @@ class DiscordBot(commands.Bot):
     
     def set_selected_employee(self, employee):
         self.selected_employee = employee
-        print(f'New Selected Employee: {self.selected_employee}')
\ No newline at end of file
+        logger.debug("New selected employee: %s", self.selected_employee)
\ No newline at end of file
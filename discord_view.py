@@ -1,3 +1,5 @@
+from typing import List
+
 import discord
 
 
@@ -22,4 +24,31 @@ class ConfirmView(discord.ui.View):
         await interaction.response.edit_message(
             content="❌ You chose **No**.",
             view=None
-        )
\ No newline at end of file
+        )
+
+
+class RosterView(discord.ui.View):
+    """Previous/next buttons over pre-rendered roster pages; a press only swaps which page is shown."""
+
+    def __init__(self, pages: List[discord.Embed]):
+        super().__init__(timeout=600)
+        self.pages = pages
+        self.index = 0
+        self._update_buttons()
+
+    def _update_buttons(self):
+        self.previous_button.disabled = self.index == 0
+        self.next_button.disabled = self.index >= len(self.pages) - 1
+
+    async def _show(self, interaction: discord.Interaction, index: int):
+        self.index = index
+        self._update_buttons()
+        await interaction.response.edit_message(embed=self.pages[self.index], view=self)
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary, emoji="◀️")
+    async def previous_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.index - 1)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary, emoji="▶️")
+    async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.index + 1)
@@ -0,0 +1,109 @@
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+from collections import OrderedDict
+from typing import Optional, Tuple
+from urllib.parse import urlencode
+
+from aiohttp import web
+
+from metrics import metrics
+from schedule_export import CONTENT_TYPES, render
+from schedule_store import normalize_name
+
+logger = logging.getLogger(__name__)
+
+# Weeks served by a subscription feed, newest first
+FEED_WEEKS = 8
+
+# Rendered feeds kept in memory; each is revalidated against the store revision
+FEED_CACHE_SIZE = 256
+
+# Calendar apps poll; let them reuse a response for this long before revalidating
+FEED_MAX_AGE_SECONDS = 900
+
+class ScheduleFeedServer:
+    """
+    Small HTTP server for schedule subscription feeds (.ics, plus CSV/JSON).
+    URLs carry an HMAC of the guild and employee, so only links the bot has
+    handed out work. Responses carry an ETag and are re-rendered only after
+    the guild's schedules change.
+    """
+
+    def __init__(self, store, secret: str, host: str = "127.0.0.1", port: int = 8080,
+                 base_url: Optional[str] = None):
+        self.store = store
+        self.secret = secret.encode("utf-8")
+        self.host = host
+        self.port = port
+        self.base_url = (base_url or f"http://{host}:{port}").rstrip("/")
+        self._cache: "OrderedDict[tuple, Tuple[int, str, bytes]]" = OrderedDict()
+        self._runner: Optional[web.AppRunner] = None
+
+    @classmethod
+    def from_env(cls, store) -> Optional["ScheduleFeedServer"]:
+        """Server configured by FEED_SECRET/FEED_PORT (and FEED_HOST, FEED_BASE_URL), or None."""
+        secret = os.getenv("FEED_SECRET")
+        port = os.getenv("FEED_PORT")
+        if not secret or not port:
+            return None
+        return cls(store, secret, os.getenv("FEED_HOST", "127.0.0.1"), int(port), os.getenv("FEED_BASE_URL"))
+
+    def _token(self, guild_id: int, employee: Optional[str]) -> str:
+        message = f"{guild_id}:{normalize_name(employee) if employee else '*'}".encode("utf-8")
+        return hmac.new(self.secret, message, hashlib.sha256).hexdigest()[:32]
+
+    def feed_url(self, guild_id: int, employee: Optional[str] = None, fmt: str = "ics") -> str:
+        url = f"{self.base_url}/feeds/{guild_id}/{self._token(guild_id, employee)}.{fmt}"
+        return f"{url}?{urlencode({'employee': employee})}" if employee else url
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get(r"/feeds/{guild_id:\d+}/{token:[0-9a-f]+}.{fmt:ics|csv|json}", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info("Schedule feeds served: url=%s", self.base_url)
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _render(self, guild_id: int, employee: Optional[str], fmt: str) -> Tuple[str, bytes]:
+        key = (guild_id, normalize_name(employee) if employee else None, fmt)
+        revision = self.store.revision(guild_id)
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == revision:
+            self._cache.move_to_end(key)
+            return cached[1], cached[2]
+
+        weeks = await self.store.weeks_between(guild_id, limit=FEED_WEEKS)
+        body = await asyncio.to_thread(render, fmt, weeks, employee)
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+        self._cache[key] = (revision, etag, body)
+        self._cache.move_to_end(key)
+        while len(self._cache) > FEED_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return etag, body
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        guild_id = int(request.match_info["guild_id"])
+        fmt = request.match_info["fmt"]
+        employee = request.query.get("employee") or None
+
+        if not hmac.compare_digest(request.match_info["token"], self._token(guild_id, employee)):
+            metrics.inc("feed_requests", status="forbidden")
+            raise web.HTTPNotFound()
+
+        etag, body = await self._render(guild_id, employee, fmt)
+        headers = {"ETag": etag, "Cache-Control": f"max-age={FEED_MAX_AGE_SECONDS}"}
+        if etag in request.headers.get("If-None-Match", ""):
+            metrics.inc("feed_requests", status="not_modified")
+            return web.Response(status=304, headers=headers)
+
+        metrics.inc("feed_requests", status="ok")
+        return web.Response(body=body, headers={**headers, "Content-Type": CONTENT_TYPES[fmt]})
@@ -0,0 +1,84 @@
+import os
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from shifts import DAYS, Shift
+
+# Weekly hours above this are flagged as overtime, unless OVERTIME_WEEKLY_HOURS says otherwise
+DEFAULT_OVERTIME_WEEKLY_HOURS = 40
+
+# Rolling totals cover this many calendar weeks, ending with the week itself
+ROLLING_WEEKS = 4
+
+# Note keywords counted as time off; a day counts once however it is worded
+PTO_KEYWORDS = ("pto", "vacation", "holiday", "request off", "rto", "personal")
+SICK_KEYWORDS = ("sick", "call out", "called out")
+
+def overtime_weekly_minutes() -> int:
+    """The overtime threshold, read on each use so a value from .env applies."""
+    return int(float(os.getenv("OVERTIME_WEEKLY_HOURS", DEFAULT_OVERTIME_WEEKLY_HOURS)) * 60)
+
+def classify_note(note: Optional[str]) -> Optional[str]:
+    """"sick", "pto" or None for a slot note."""
+    text = (note or "").casefold()
+    if any(keyword in text for keyword in SICK_KEYWORDS):
+        return "sick"
+    if any(keyword in text for keyword in PTO_KEYWORDS):
+        return "pto"
+    return None
+
+class WeekHours(NamedTuple):
+    """One employee's week: minutes per day (Monday first) and days off by kind."""
+    name: str
+    daily: Tuple[int, ...]
+    pto_days: int
+    sick_days: int
+
+    @property
+    def total(self) -> int:
+        return sum(self.daily)
+
+class EmployeeWeek(NamedTuple):
+    """A stored rollup row for one employee and week."""
+    week_key: str
+    week_from: str
+    name: str
+    daily: Tuple[int, ...]
+    total: int
+    rolling: int  # this week plus the ROLLING_WEEKS - 1 before it
+    pto_days: int
+    sick_days: int
+
+    @property
+    def overtime(self) -> bool:
+        return self.total > overtime_weekly_minutes()
+
+class HoursSummary(NamedTuple):
+    """One employee's totals over a range of weeks, straight from the rollups."""
+    name: str
+    weeks: int
+    total: int
+    peak_rolling: int
+    overtime_weeks: int
+    pto_days: int
+    sick_days: int
+
+def week_hours(week_shifts: Dict[str, Dict[str, Tuple[Shift, ...]]]) -> List[WeekHours]:
+    """
+    Roll parsed shifts up into minutes per day. Overnight shifts count
+    towards the day they start on.
+    """
+    rows = []
+    for name, days in week_shifts.items():
+        daily = []
+        off = {"pto": 0, "sick": 0}
+        for day in DAYS:
+            shifts = days.get(day, ())
+            daily.append(sum(shift.duration_minutes for shift in shifts))
+            kinds = {classify_note(shift.note) for shift in shifts} - {None}
+            for kind in kinds:
+                off[kind] += 1
+        rows.append(WeekHours(name, tuple(daily), off["pto"], off["sick"]))
+    return rows
+
+def format_hours(minutes: int) -> str:
+    return f"{minutes / 60:.1f}".rstrip("0").rstrip(".") + "h"
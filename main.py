@@ -1,32 +1,76 @@
+import time
+
+STARTED = time.perf_counter()  # before the imports below, so they count towards the startup profile
+
 import discord
 from dotenv import load_dotenv
 
 import os
+
+# Before the project imports below: some of them read settings when imported
+load_dotenv()
+
+from commands.auto_sync_command import setup_auto_sync_command
+from commands.cache_stats_command import setup_cache_stats_command
 from commands.connect_google_command import setup_connect_google_command
+from commands.coverage_command import setup_coverage_command
+from commands.export_command import setup_export_command
 from commands.help_command import setup_help_command
+from commands.hours_command import setup_hours_command
+from commands.jobs_command import setup_jobs_command
 from commands.new_schedule_command import setup_new_schedule_command
+from commands.remind_command import setup_remind_command
 from commands.schedule_command import setup_schedule_command
+from commands.sync_all_command import setup_sync_all_command
+from commands.stats_command import setup_stats_command
 from commands.sync_calendar_command import setup_sync_calendar_command
+from commands.weeks_command import setup_weeks_command
 from discord_bot import DiscordBot
-
-load_dotenv()
+from metrics import StartupProfile, metrics
 
 def main():
+    startup = StartupProfile(metrics, started=STARTED)
+    startup.mark("imports")
+
     intents = discord.Intents.default()
     intents.message_content = True
 
-    bot = DiscordBot(command_prefix="!", intents=intents)
+    # Commands are registered to a development guild when one is set, otherwise globally
+    dev_guild = os.getenv('DEV_GUILD_ID')
+    GUILD_ID = discord.Object(int(dev_guild)) if dev_guild else None
 
-    GUILD_ID = discord.Object(int(os.getenv('DEV_GUILD_ID')))
+    # SHARD_COUNT alone runs that many shards here; add SHARD_IDS (e.g. "0,1") to split them across processes
+    shard_count = os.getenv('SHARD_COUNT')
+    shard_ids = os.getenv('SHARD_IDS')
+    bot = DiscordBot(
+        command_prefix="!",
+        intents=intents,
+        command_guild=GUILD_ID,
+        startup=startup,
+        shard_count=int(shard_count) if shard_count else None,
+        shard_ids=[int(shard) for shard in shard_ids.split(",")] if shard_ids else None,
+    )
 
     # Register commands
     setup_help_command(bot, GUILD_ID)
     setup_schedule_command(bot, GUILD_ID)
     setup_new_schedule_command(bot, GUILD_ID)
     setup_connect_google_command(bot, GUILD_ID)
+    setup_weeks_command(bot, GUILD_ID)
+    setup_coverage_command(bot, GUILD_ID)
+    setup_hours_command(bot, GUILD_ID)
     setup_sync_calendar_command(bot, GUILD_ID)
+    setup_sync_all_command(bot, GUILD_ID)
+    setup_auto_sync_command(bot, GUILD_ID)
+    setup_remind_command(bot, GUILD_ID)
+    setup_cache_stats_command(bot, GUILD_ID)
+    setup_jobs_command(bot, GUILD_ID)
+    setup_stats_command(bot, GUILD_ID)
+    setup_export_command(bot, GUILD_ID)
+    startup.mark("setup")
     
-    bot.run(os.getenv('DISCORD_TOKEN'))
+    # Send the bot's own module loggers through discord.py's handler too
+    bot.run(os.getenv('DISCORD_TOKEN'), root_logger=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
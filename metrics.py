@@ -0,0 +1,193 @@
+import asyncio
+import bisect
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "schedbot_"
+
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# The lag monitor wakes this often and warns when a wake-up is this late
+LOOP_LAG_INTERVAL_SECONDS = 0.25
+LOOP_LAG_WARNING_SECONDS = 0.25
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _labels(labels: dict) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+class Histogram:
+    """Fixed-bucket latency histogram; quantiles are read off the bucket bounds."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation (the max for +Inf)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.buckets[index], self.max) if index < len(self.buckets) else self.max
+        return self.max
+
+class Metrics:
+    """
+    Process-wide counters and latency histograms, keyed by name and labels.
+    Safe to update from executor threads; rendered in the Prometheus text
+    format for scraping or for the /stats command.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = defaultdict(dict)
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = defaultdict(dict)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters[name]
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms[name]
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Time the block into histogram `name`; failures also count towards `<name>_errors`."""
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.inc(f"{name}_errors", **labels)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_labels(labels), 0)
+
+    def counters(self, name: str) -> List[Tuple[dict, float]]:
+        """(labels, value) for every series of a counter."""
+        with self._lock:
+            return [(dict(key), value) for key, value in self._counters.get(name, {}).items()]
+
+    def total(self, name: str) -> float:
+        """Sum of a counter across all of its label sets."""
+        with self._lock:
+            return sum(self._counters.get(name, {}).values())
+
+    def histograms(self, name: str) -> List[Tuple[dict, Histogram]]:
+        """(labels, histogram) for every series of a histogram."""
+        with self._lock:
+            return [(dict(key), histogram) for key, histogram in self._histograms.get(name, {}).items()]
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                metric = f"{METRIC_PREFIX}{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{metric}{_format_labels(labels)} {value:g}")
+
+            for name, series in sorted(self._histograms.items()):
+                metric = f"{METRIC_PREFIX}{name}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                for labels, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        lines.append(f"{metric}_bucket{_format_labels(labels, ('le', le))} {cumulative}")
+                    lines.append(f"{metric}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+                    lines.append(f"{metric}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop wakes a sleeping task. Anything that
+    blocks the loop (CPU work, blocking I/O) shows up here before Discord
+    starts failing interactions.
+    """
+
+    def __init__(self, registry: "Metrics", interval: float = LOOP_LAG_INTERVAL_SECONDS):
+        self.registry = registry
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - started - self.interval)
+            self.registry.observe("event_loop_lag", lag)
+            if lag >= LOOP_LAG_WARNING_SECONDS:
+                logger.warning("Event loop blocked: lag_ms=%.0f", lag * 1000)
+
+class StartupProfile:
+    """
+    Where startup time goes, phase by phase: each mark closes the phase
+    running since the previous one. Phases are also kept in the `startup`
+    histogram, so /stats and the Prometheus feed show them.
+    """
+
+    def __init__(self, registry: "Metrics", started: Optional[float] = None):
+        self.registry = registry
+        self.started = started if started is not None else time.perf_counter()
+        self._last = self.started
+        self.phases: List[Tuple[str, float]] = []
+
+    def mark(self, phase: str):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self.registry.observe("startup", now - self._last, phase=phase)
+        self._last = now
+
+    def summary(self) -> str:
+        phases = " ".join(f"{phase}={seconds:.3f}s" for phase, seconds in self.phases)
+        return f"total={self._last - self.started:.3f}s {phases}"
+
+metrics = Metrics()
@@ -0,0 +1,244 @@
+import asyncio
+import bisect
+import logging
+import os
+import re
+from concurrent.futures import Executor
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Tuple
+
+from metrics import metrics
+from schedule_models import Employee, Schedule, Week
+from shifts import DAYS, DAY_OFF_NOTES, parse_shift_text
+
+try:
+    import pytesseract
+except ImportError:  # local OCR is optional; everything goes to Gemini without it
+    pytesseract = None
+
+if TYPE_CHECKING:
+    import numpy as np
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Local results at or above this confidence skip Gemini entirely (LOCAL_OCR_MIN_CONFIDENCE overrides it)
+DEFAULT_LOCAL_OCR_MIN_CONFIDENCE = 0.85
+
+# Pixels darker than this count as ink; a row or column this dark across the table is a grid line
+INK_THRESHOLD = 128
+GRID_LINE_FRACTION = 0.5
+MIN_CELL_PIXELS = 8
+
+# Sparse text mode: grid cells are independent words, not paragraphs
+TESSERACT_CONFIG = "--psm 11"
+
+# Slot notes that are understood without any times
+KNOWN_NOTES = DAY_OFF_NOTES | {"pto", "sick", "vacation", "holiday", "training", "request off", "rto"}
+
+_DATE = r"\d{1,2}/\d{1,2}(?:/\d{2,4})?"
+_DATE_RANGE = re.compile(rf"({_DATE})\s*(?:-|–|—|to|through|thru)\s*({_DATE})", re.IGNORECASE)
+
+class PageExtraction(NamedTuple):
+    """One page read by an extraction backend, with how much the backend trusts it (0-1)."""
+    schedule: Schedule
+    confidence: float
+    backend: str
+
+class _Word(NamedTuple):
+    text: str
+    confidence: float
+    x: int
+    y: int
+
+def _line_positions(ink_fraction: "np.ndarray") -> List[int]:
+    """Centers of each run of rows (or columns) that are mostly ink."""
+    import numpy as np
+
+    hits = np.flatnonzero(ink_fraction >= GRID_LINE_FRACTION)
+    if hits.size == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(hits) > 1)
+    starts = np.concatenate(([hits[0]], hits[breaks + 1]))
+    ends = np.concatenate((hits[breaks], [hits[-1]]))
+    positions = []
+    for start, end in zip(starts, ends):
+        center = int(start + end) // 2
+        if not positions or center - positions[-1] >= MIN_CELL_PIXELS:
+            positions.append(center)
+    return positions
+
+def _find_grid(gray: "np.ndarray") -> Optional[Tuple[List[int], List[int]]]:
+    """(row boundaries, column boundaries) of the ruled table, or None if there isn't one."""
+    ink = gray < INK_THRESHOLD
+    rows = _line_positions(ink.mean(axis=1))
+    if len(rows) < 3:
+        return None
+    columns = _line_positions(ink[rows[0]:rows[-1] + 1].mean(axis=0))
+    # A name column plus one per day
+    if len(columns) < len(DAYS) + 2:
+        return None
+    return rows, columns
+
+def _erase_grid(gray: "np.ndarray", rows: List[int], columns: List[int]) -> "np.ndarray":
+    """Copy of the page with the ruling lines whited out, so OCR only sees text."""
+    clean = gray.copy()
+    for row in rows:
+        clean[max(0, row - 2):row + 3, :] = 255
+    for column in columns:
+        clean[:, max(0, column - 2):column + 3] = 255
+    return clean
+
+def _read_words(gray: "np.ndarray") -> List[_Word]:
+    from PIL import Image
+
+    data = pytesseract.image_to_data(Image.fromarray(gray), config=TESSERACT_CONFIG,
+                                     output_type=pytesseract.Output.DICT)
+    words = []
+    for text, confidence, left, top, width, height in zip(
+        data["text"], data["conf"], data["left"], data["top"], data["width"], data["height"]
+    ):
+        confidence = float(confidence)
+        if text.strip() and confidence >= 0:
+            words.append(_Word(text.strip(), confidence / 100, left + width // 2, top + height // 2))
+    return words
+
+def _cell_text(words: List[_Word]) -> str:
+    # Reading order: line by line (words within half a line height), then left to right
+    return " ".join(word.text for word in sorted(words, key=lambda word: (word.y // 12, word.x)))
+
+def _day_columns(header: Dict[int, str]) -> Dict[str, int]:
+    columns = {}
+    for column, text in header.items():
+        for day in DAYS:
+            if text.casefold().startswith(day[:3].casefold()) and day not in columns:
+                columns[day] = column
+    return columns
+
+def _week_range(page_text: str, header: Dict[int, str], day_columns: Dict[str, int]) -> Optional[Tuple[str, str]]:
+    """The page's "from - to" dates, or the dates under the Monday and Sunday headers."""
+    match = _DATE_RANGE.search(page_text)
+    if match:
+        return match.group(1), match.group(2)
+    monday = re.search(_DATE, header.get(day_columns["Monday"], ""))
+    sunday = re.search(_DATE, header.get(day_columns["Sunday"], ""))
+    if monday and sunday:
+        return monday.group(0), sunday.group(0)
+    return None
+
+def _slot_understood(text: str) -> bool:
+    shifts = parse_shift_text(text)
+    if not shifts:
+        return True  # a day-off marker
+    return any(shift.is_timed for shift in shifts) or (shifts[0].note or "").casefold() in KNOWN_NOTES
+
+def read_schedule_grid(image: "Image.Image") -> Optional[PageExtraction]:
+    """
+    Read a ruled schedule grid (a name column, then one column per day)
+    with Tesseract. Confidence is the mean OCR word confidence, scaled by
+    the share of filled cells that parse as shifts or known notes. Returns
+    None for pages that aren't such a grid.
+    """
+    # NumPy and PIL load in the OCR worker, not when the bot starts
+    import numpy as np
+
+    gray = np.asarray(image.convert("L"))
+    grid = _find_grid(gray)
+    if grid is None:
+        return None
+    rows, columns = grid
+
+    cells: Dict[Tuple[int, int], List[_Word]] = {}
+    outside: List[_Word] = []
+    for word in _read_words(_erase_grid(gray, rows, columns)):
+        row = bisect.bisect(rows, word.y) - 1
+        column = bisect.bisect(columns, word.x) - 1
+        if 0 <= row < len(rows) - 1 and 0 <= column < len(columns) - 1:
+            cells.setdefault((row, column), []).append(word)
+        else:
+            outside.append(word)
+
+    # The header is the first row naming every day
+    header_row = day_columns = None
+    for row in range(len(rows) - 1):
+        header = {column: _cell_text(words) for (r, column), words in cells.items() if r == row}
+        found = _day_columns(header)
+        if len(found) == len(DAYS):
+            header_row, day_columns = row, found
+            break
+    if header_row is None:
+        return None
+    name_column = min(day_columns.values()) - 1
+    if name_column < 0:
+        return None
+
+    header = {column: _cell_text(words) for (r, column), words in cells.items() if r == header_row}
+    week = _week_range(_cell_text(outside), header, day_columns)
+
+    employees = []
+    confidences = []
+    filled = understood = 0
+    for row in range(header_row + 1, len(rows) - 1):
+        name = _cell_text(cells.get((row, name_column), []))
+        slots = {day: _cell_text(cells.get((row, column), [])) or None for day, column in day_columns.items()}
+        if not name:
+            if any(slots.values()):
+                filled += 1  # shifts nobody can be matched to
+            continue
+
+        employees.append(Employee(name=name, **slots))
+        for column in [name_column, *day_columns.values()]:
+            confidences.extend(word.confidence for word in cells.get((row, column), []))
+        for slot in slots.values():
+            if slot:
+                filled += 1
+                understood += _slot_understood(slot)
+
+    if not employees or week is None:
+        confidence = 0.0
+    else:
+        confidence = (sum(confidences) / len(confidences)) * (understood / filled if filled else 0.0)
+
+    schedule = Schedule(week=Week(**{"from": week[0] if week else "", "to": week[1] if week else ""}),
+                        employees=employees)
+    return PageExtraction(schedule, confidence, "local_ocr")
+
+class LocalOCRExtractor:
+    """
+    CPU extraction backend for clean, machine-generated grid exports.
+    Runs on `executor` (a worker thread by default, or the processor's
+    process pool); anything it can't read confidently is left for Gemini.
+    """
+    name = "local_ocr"
+
+    def __init__(self, executor: Optional[Executor] = None, min_confidence: Optional[float] = None):
+        self.executor = executor
+        if min_confidence is None:
+            min_confidence = float(os.getenv("LOCAL_OCR_MIN_CONFIDENCE", DEFAULT_LOCAL_OCR_MIN_CONFIDENCE))
+        self.min_confidence = min_confidence
+
+    @staticmethod
+    def available() -> bool:
+        if pytesseract is None:
+            return False
+        try:
+            pytesseract.get_tesseract_version()
+        except Exception:
+            return False
+        return True
+
+    async def extract(self, image: "Image.Image") -> Optional[PageExtraction]:
+        try:
+            with metrics.timer("local_ocr"):
+                return await asyncio.get_running_loop().run_in_executor(self.executor, read_schedule_grid, image)
+        except Exception as e:
+            logger.warning("Local OCR failed: %s", e)
+            return None
+
+def default_local_extractor(executor: Optional[Executor] = None) -> Optional[LocalOCRExtractor]:
+    """The local OCR backend, unless LOCAL_OCR=0 or Tesseract isn't installed."""
+    if os.getenv("LOCAL_OCR", "1") == "0":
+        return None
+    if not LocalOCRExtractor.available():
+        logger.info("Tesseract not available; every schedule goes to Gemini")
+        return None
+    return LocalOCRExtractor(executor)
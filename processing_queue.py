@@ -0,0 +1,151 @@
+import asyncio
+import itertools
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Deque, Dict, List, Optional
+
+from metrics import metrics
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+@dataclass
+class ExtractionJob:
+    id: int
+    guild_id: Optional[int]
+    user_id: int
+    urls: List[str]  # the schedule's attachments, extracted as one week
+    status: JobStatus = JobStatus.QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    future: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+    task: Optional[asyncio.Task] = None
+
+class ScheduleJobQueue:
+    """
+    Queue of schedule extraction jobs served by a fixed pool of workers.
+    Jobs are kept in one FIFO per guild and workers take from the guilds in
+    round-robin order, so one guild's burst can't starve the others.
+    """
+
+    def __init__(self, processor, workers: int = 3, history: int = 50):
+        self.processor = processor
+        self.worker_count = workers
+        self._queues: "OrderedDict[Optional[int], Deque[ExtractionJob]]" = OrderedDict()
+        self._jobs: Dict[int, ExtractionJob] = {}
+        self._finished: Deque[int] = deque()
+        self._history = history
+        self._ids = itertools.count(1)
+        self._available = asyncio.Condition()
+        self._workers: List[asyncio.Task] = []
+
+    def start(self):
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, guild_id: Optional[int], user_id: int, urls: List[str]) -> ExtractionJob:
+        job = ExtractionJob(id=next(self._ids), guild_id=guild_id, user_id=user_id, urls=list(urls))
+        self._jobs[job.id] = job
+        async with self._available:
+            self._queues.setdefault(guild_id, deque()).append(job)
+            self._available.notify()
+        return job
+
+    def _pending_order(self) -> List[ExtractionJob]:
+        """Queued jobs in the order workers will take them (round-robin across guilds)."""
+        order = []
+        queues = [list(q) for q in self._queues.values()]
+        for round_jobs in itertools.zip_longest(*queues):
+            order.extend(job for job in round_jobs if job is not None)
+        return order
+
+    def position(self, job: ExtractionJob) -> int:
+        """1-based queue position of a queued job, or 0 once it has started."""
+        if job.status != JobStatus.QUEUED:
+            return 0
+        return self._pending_order().index(job) + 1
+
+    def get(self, job_id: int) -> Optional[ExtractionJob]:
+        return self._jobs.get(job_id)
+
+    def jobs(self, guild_id: Optional[int] = None) -> List[ExtractionJob]:
+        """Known jobs (queued, running and recently finished), newest first."""
+        jobs = [job for job in self._jobs.values() if guild_id is None or job.guild_id == guild_id]
+        return sorted(jobs, key=lambda job: job.id, reverse=True)
+
+    def cancel(self, job_id: int) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return False
+
+        if job.status == JobStatus.QUEUED:
+            queue = self._queues.get(job.guild_id)
+            if queue is not None and job in queue:
+                queue.remove(job)
+                if not queue:
+                    del self._queues[job.guild_id]
+            self._finish(job, JobStatus.CANCELLED)
+            job.future.cancel()
+            return True
+
+        if job.status == JobStatus.RUNNING and job.task is not None:
+            job.task.cancel()
+            return True
+
+        return False
+
+    def _finish(self, job: ExtractionJob, status: JobStatus):
+        job.status = status
+        job.finished_at = time.time()
+        self._finished.append(job.id)
+
+        # Forget the oldest finished jobs beyond the history limit
+        while len(self._finished) > self._history:
+            self._jobs.pop(self._finished.popleft(), None)
+
+    async def _next_job(self) -> ExtractionJob:
+        async with self._available:
+            await self._available.wait_for(lambda: bool(self._queues))
+            guild_id, queue = next(iter(self._queues.items()))
+            job = queue.popleft()
+
+            # Rotate the guild to the back so others get the next turn
+            del self._queues[guild_id]
+            if queue:
+                self._queues[guild_id] = queue
+            return job
+
+    async def _worker(self):
+        while True:
+            job = await self._next_job()
+            job.status = JobStatus.RUNNING
+            job.started_at = time.time()
+            metrics.observe("extraction_queue_wait", job.started_at - job.created_at)
+            job.task = asyncio.create_task(self.processor.extract_schedule(job.urls))
+
+            try:
+                data = await job.task
+            except asyncio.CancelledError:
+                self._finish(job, JobStatus.CANCELLED)
+                job.future.cancel()
+                if asyncio.current_task().cancelling():
+                    raise  # the worker itself is being stopped
+            except Exception as e:
+                self._finish(job, JobStatus.FAILED)
+                job.future.set_exception(e)
+            else:
+                self._finish(job, JobStatus.DONE if data else JobStatus.FAILED)
+                job.future.set_result(data)
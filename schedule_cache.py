@@ -0,0 +1,139 @@
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from utils.shared_db import connect_shared
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = "data/extraction_cache.sqlite3"
+
+class ExtractionCache:
+    """
+    Persistent cache of AI schedule extraction results.
+    Entries are keyed by a hash of the image bytes plus the prompt, model and
+    schema version, expire after `ttl_seconds`, and the least recently used
+    entries are evicted once the cache exceeds `max_entries` or `max_bytes`.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = 500,
+                 max_bytes: int = 50 * 1024 * 1024, ttl_seconds: int = 30 * 24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    @staticmethod
+    def make_key(image_bytes, prompt: str, model: str, schema_version: str) -> str:
+        """Content address for an extraction request."""
+        digest = hashlib.sha256()
+        digest.update(image_bytes)
+        for part in (prompt, model, schema_version):
+            digest.update(b"\0")
+            digest.update(part.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = connect_shared(self.path)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " payload TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+            self._conn.commit()
+        return self._conn
+
+    def _get_blocking(self, key: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT payload, created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            payload, created_at = row
+            if now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                conn.commit()
+                return None
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            conn.commit()
+        return json.loads(payload)
+
+    def _put_blocking(self, key: str, value: dict):
+        payload = json.dumps(value)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, payload, size, created_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), now, now),
+            )
+            self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Drop expired entries, then the least recently used ones beyond the count/size limits."""
+        conn.execute("DELETE FROM entries WHERE created_at < ?", (now - self.ttl_seconds,))
+        conn.execute(
+            "DELETE FROM entries WHERE key IN ("
+            " SELECT key FROM ("
+            "  SELECT key,"
+            "   SUM(size) OVER (ORDER BY last_access DESC) AS running_size,"
+            "   ROW_NUMBER() OVER (ORDER BY last_access DESC) AS rank"
+            "  FROM entries)"
+            " WHERE running_size > ? OR rank > ?)",
+            (self.max_bytes, self.max_entries),
+        )
+
+    def _stats_blocking(self) -> dict:
+        with self._lock:
+            entries, size = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    async def get(self, key: str) -> Optional[dict]:
+        try:
+            value = await asyncio.to_thread(self._get_blocking, key)
+        except Exception as e:
+            logger.warning("Extraction cache read failed: %s", e)
+            value = None
+
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def put(self, key: str, value: dict):
+        try:
+            await asyncio.to_thread(self._put_blocking, key, value)
+        except Exception as e:
+            logger.warning("Extraction cache write failed: %s", e)
+
+    async def stats(self) -> dict:
+        return await asyncio.to_thread(self._stats_blocking)
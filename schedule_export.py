@@ -0,0 +1,157 @@
+import csv
+import hashlib
+import io
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator, List, Optional
+
+import pytz
+
+from schedule_store import StoredWeek, normalize_name
+from shifts import DAYS, format_minutes
+
+EXPORT_FORMATS = ("ics", "csv", "json")
+CONTENT_TYPES = {
+    "ics": "text/calendar; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+    "json": "application/json",
+}
+
+ICS_PRODUCT_ID = "-//ScheduleDiscordBot//Schedule Export//EN"
+
+def _ics_escape(text: str) -> str:
+    return (text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+def _ics_line(line: str) -> str:
+    """Fold a content line to 75 octets as RFC 5545 requires."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+
+    chunks = []
+    while encoded:
+        limit = 75 if not chunks else 74  # continuation lines start with a space
+        cut = min(limit, len(encoded))
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1  # don't split a UTF-8 sequence
+        chunks.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+    return "\r\n ".join(chunks) + "\r\n"
+
+def _ics_time(moment: datetime) -> str:
+    return moment.astimezone(pytz.UTC).strftime("%Y%m%dT%H%M%SZ")
+
+def _selected(week: StoredWeek, employee: Optional[str]) -> List[str]:
+    if employee is None:
+        return list(week.employees)
+    wanted = normalize_name(employee)
+    return [name for name in week.employees if normalize_name(name) == wanted]
+
+def iter_ics(weeks: Iterable[StoredWeek], employee: Optional[str] = None,
+             calendar_name: str = "Work Schedule") -> Iterator[str]:
+    """
+    iCalendar feed for one employee, or the whole roster, across `weeks`.
+    Event UIDs are stable per shift slot, so calendar apps update events in
+    place when a week is re-uploaded. Yields one event at a time.
+    """
+    yield _ics_line("BEGIN:VCALENDAR")
+    yield _ics_line("VERSION:2.0")
+    yield _ics_line(f"PRODID:{ICS_PRODUCT_ID}")
+    yield _ics_line("CALSCALE:GREGORIAN")
+    yield _ics_line(f"X-WR-CALNAME:{_ics_escape(calendar_name)}")
+
+    for week in weeks:
+        try:
+            week_start = week.week_start
+        except ValueError:
+            continue  # no usable dates to place the shifts on
+        stamp = datetime.fromtimestamp(week.uploaded_at or 0, tz=timezone.utc)
+
+        for name in _selected(week, employee):
+            for day in DAYS:
+                for index, shift in enumerate(week.shifts.get(name, {}).get(day, ())):
+                    uid = hashlib.sha1(
+                        f"{week.guild_id}:{week.week_key}:{normalize_name(name)}:{day}:{index}".encode("utf-8")
+                    ).hexdigest()
+                    lines = ["BEGIN:VEVENT", f"UID:{uid}@schedbot", f"DTSTAMP:{_ics_time(stamp)}"]
+                    if shift.is_timed:
+                        start, end = shift.datetimes(week_start, day)
+                        lines += [f"DTSTART:{_ics_time(start)}", f"DTEND:{_ics_time(end)}",
+                                  f"SUMMARY:{_ics_escape(f'{name} shift')}"]
+                    else:
+                        # Notes such as PTO become all-day events
+                        date = week_start.date() + timedelta(days=DAYS.index(day))
+                        lines += [f"DTSTART;VALUE=DATE:{date:%Y%m%d}",
+                                  f"DTEND;VALUE=DATE:{date + timedelta(days=1):%Y%m%d}",
+                                  f"SUMMARY:{_ics_escape(f'{name}: {shift.note}')}",
+                                  "TRANSP:TRANSPARENT"]
+                    if shift.is_timed and shift.note:
+                        lines.append(f"DESCRIPTION:{_ics_escape(shift.note)}")
+                    lines.append("END:VEVENT")
+                    yield "".join(_ics_line(line) for line in lines)
+
+    yield _ics_line("END:VCALENDAR")
+
+def iter_csv(weeks: Iterable[StoredWeek], employee: Optional[str] = None) -> Iterator[str]:
+    """One CSV row per shift; days off are left out."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def _flush() -> str:
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
+
+    writer.writerow(["week", "employee", "day", "start", "end", "overnight", "hours", "note"])
+    yield _flush()
+    for week in weeks:
+        for name in _selected(week, employee):
+            for day in DAYS:
+                for shift in week.shifts.get(name, {}).get(day, ()):
+                    writer.writerow([
+                        week.week_key, name, day,
+                        format_minutes(shift.start) if shift.is_timed else "",
+                        format_minutes(shift.end) if shift.is_timed else "",
+                        "yes" if shift.overnight else "",
+                        f"{shift.duration_minutes / 60:g}",
+                        shift.note or "",
+                    ])
+            yield _flush()
+
+def iter_json(weeks: Iterable[StoredWeek], employee: Optional[str] = None) -> Iterator[str]:
+    """A JSON array with one object per week: its dates, raw time slots and parsed shifts."""
+    yield "["
+    for count, week in enumerate(weeks):
+        names = _selected(week, employee)
+        document = {
+            "week": week.week_key,
+            "from": week.week.get("From"),
+            "to": week.week.get("To"),
+            "employees": [
+                {
+                    "name": name,
+                    "schedule": week.employees[name],
+                    "shifts": {
+                        day: [shift._asdict() for shift in shifts]
+                        for day, shifts in week.shifts.get(name, {}).items()
+                    },
+                }
+                for name in names
+            ],
+        }
+        yield ("," if count else "") + json.dumps(document)
+    yield "]"
+
+def render(fmt: str, weeks: List[StoredWeek], employee: Optional[str] = None) -> bytes:
+    """A whole export as bytes (for Discord attachments and cached feeds)."""
+    if fmt == "ics":
+        chunks = iter_ics(weeks, employee, f"{employee} — Work Schedule" if employee else "Work Schedule")
+    elif fmt == "csv":
+        chunks = iter_csv(weeks, employee)
+    elif fmt == "json":
+        chunks = iter_json(weeks, employee)
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+    return "".join(chunks).encode("utf-8")
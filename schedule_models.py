@@ -0,0 +1,20 @@
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+class Week(BaseModel):
+    from_date: str = Field(alias="from")
+    to_date: str = Field(alias="to")
+
+class Employee(BaseModel):
+    name: str
+    Monday: Optional[str] = None
+    Tuesday: Optional[str] = None
+    Wednesday: Optional[str] = None
+    Thursday: Optional[str] = None
+    Friday: Optional[str] = None
+    Saturday: Optional[str] = None
+    Sunday: Optional[str] = None
+
+class Schedule(BaseModel):
+    week: Week
+    employees: List[Employee]  # Changed from Dict to List
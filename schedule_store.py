@@ -0,0 +1,438 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from hours_rollup import ROLLING_WEEKS, EmployeeWeek, HoursSummary, overtime_weekly_minutes, week_hours
+from shifts import DAYS, Shift, parse_week_shifts, shifts_from_json, shifts_to_json
+from utils.coverage_index import CoverageIndex
+from utils.name_index import EmployeeNameIndex
+from utils.roster_render import RosterPages
+from utils.shared_db import SHARED_STATE_POLL_SECONDS, connect_shared, data_version
+
+logger = logging.getLogger(__name__)
+
+STORE_PATH = "data/schedules.sqlite3"
+
+_DAY_COLUMNS = ", ".join(day.lower() for day in DAYS)
+
+# Date formats Gemini tends to return for the week range
+WEEK_DATE_FORMATS = ("%m/%d/%Y", "%m/%d/%y", "%Y-%m-%d", "%B %d, %Y", "%b %d, %Y")
+
+def normalize_name(name: str) -> str:
+    """Case- and whitespace-insensitive form of an employee name."""
+    return " ".join(name.casefold().split())
+
+def parse_week_date(text: str) -> Optional[datetime]:
+    for fmt in WEEK_DATE_FORMATS:
+        try:
+            return datetime.strptime(text.strip(), fmt)
+        except ValueError:
+            continue
+    return None
+
+def week_key_for(text: str) -> str:
+    """Stable key for a week: ISO start date when parseable, else the raw text."""
+    parsed = parse_week_date(text)
+    return parsed.date().isoformat() if parsed else text.strip()
+
+class StoredWeek:
+    """One guild's schedule for one week."""
+
+    def __init__(self, guild_id: int, week_key: str, week: dict, employees: Dict[str, dict],
+                 shifts: Optional[Dict[str, Dict[str, Tuple[Shift, ...]]]] = None,
+                 uploaded_at: Optional[float] = None):
+        self.guild_id = guild_id
+        self.week_key = week_key
+        self.week = week  # {"From": ..., "To": ...}
+        self.employees = employees  # {name: {day: time slot}}
+        # {name: {day: (Shift, ...)}}, parsed at extraction time; days off are absent
+        self.shifts = shifts if shifts is not None else parse_week_shifts(employees)
+        self.uploaded_at = uploaded_at if uploaded_at is not None else time.time()
+        self._name_index: Optional[EmployeeNameIndex] = None
+        self._coverage: Optional[CoverageIndex] = None
+        self._roster: Optional[RosterPages] = None
+
+    @property
+    def name_index(self) -> EmployeeNameIndex:
+        """Employee name search index, built on first use."""
+        if self._name_index is None:
+            self._name_index = EmployeeNameIndex(self.employees)
+        return self._name_index
+
+    @property
+    def coverage(self) -> CoverageIndex:
+        """Who's-working interval index and staffing matrix, built on first use."""
+        if self._coverage is None:
+            self._coverage = CoverageIndex(self.shifts)
+        return self._coverage
+
+    @property
+    def roster(self) -> RosterPages:
+        """Rendered schedule embeds and roster pages, built on first use."""
+        if self._roster is None:
+            self._roster = RosterPages(self)
+        return self._roster
+
+    @property
+    def week_start(self) -> datetime:
+        start = parse_week_date(self.week["From"])
+        if start is None:
+            raise ValueError(f"Unrecognized week start date: {self.week['From']}")
+        return start
+
+class ScheduleStore:
+    """
+    SQLite-backed schedules keyed by guild and week, with an index on the
+    normalized employee name. Weeks load lazily and the most recently used
+    ones stay in an in-memory LRU. Every save also maintains an `hours`
+    rollup (minutes per employee and day, rolling totals, days off), so
+    reports never re-parse stored weeks. When several bot processes share the
+    database, each one polls for the others' writes and drops what they
+    made stale.
+    """
+
+    def __init__(self, path: str = STORE_PATH, hot_weeks: int = 32):
+        self.path = path
+        self.hot_weeks = hot_weeks
+        self._hot: "OrderedDict[tuple, StoredWeek]" = OrderedDict()
+        self._latest: Dict[int, Optional[str]] = {}
+        self._revisions: Dict[int, int] = {}  # bumped on every save, for export caches
+        self._data_version: Optional[int] = None
+        self._watcher: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = connect_shared(self.path)
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS weeks ("
+                " guild_id INTEGER NOT NULL,"
+                " week_key TEXT NOT NULL,"
+                " from_date TEXT NOT NULL,"
+                " to_date TEXT NOT NULL,"
+                " uploaded_at REAL NOT NULL,"
+                " PRIMARY KEY (guild_id, week_key));"
+                "CREATE TABLE IF NOT EXISTS employees ("
+                " guild_id INTEGER NOT NULL,"
+                " week_key TEXT NOT NULL,"
+                " name TEXT NOT NULL,"
+                " norm_name TEXT NOT NULL,"
+                " schedule TEXT NOT NULL,"
+                " shifts TEXT,"
+                " PRIMARY KEY (guild_id, week_key, name));"
+                "CREATE INDEX IF NOT EXISTS employees_by_name ON employees (guild_id, norm_name);"
+                "CREATE INDEX IF NOT EXISTS weeks_by_upload ON weeks (guild_id, uploaded_at);"
+                "CREATE TABLE IF NOT EXISTS revisions ("
+                " guild_id INTEGER PRIMARY KEY,"
+                " revision INTEGER NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS hours ("
+                " guild_id INTEGER NOT NULL,"
+                " week_key TEXT NOT NULL,"
+                " norm_name TEXT NOT NULL,"
+                " name TEXT NOT NULL,"
+                + "".join(f" {day.lower()} INTEGER NOT NULL," for day in DAYS) +
+                " total_minutes INTEGER NOT NULL,"
+                " rolling_minutes INTEGER NOT NULL,"
+                " pto_days INTEGER NOT NULL,"
+                " sick_days INTEGER NOT NULL,"
+                " PRIMARY KEY (guild_id, week_key, norm_name));"
+                "CREATE INDEX IF NOT EXISTS hours_by_employee ON hours (guild_id, norm_name, week_key);"
+            )
+            # Databases created before parsed shifts were stored
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(employees)")}
+            if "shifts" not in columns:
+                self._conn.execute("ALTER TABLE employees ADD COLUMN shifts TEXT")
+                self._conn.commit()
+            self._backfill_hours(self._conn)
+        return self._conn
+
+    def _backfill_hours(self, conn: sqlite3.Connection):
+        """Roll up weeks stored before the hours table existed (a one-off parse per week)."""
+        missing = conn.execute(
+            "SELECT guild_id, week_key FROM weeks w WHERE NOT EXISTS"
+            " (SELECT 1 FROM hours h WHERE h.guild_id = w.guild_id AND h.week_key = w.week_key)"
+        ).fetchall()
+        for guild_id, week_key in missing:
+            week = self._read_week(conn, guild_id, week_key)
+            if week is not None and week.employees:
+                with conn:
+                    self._write_hours(conn, week)
+
+    @staticmethod
+    def _write_hours(conn: sqlite3.Connection, week: StoredWeek):
+        """Replace a week's hours rows, then refresh rolling totals for it and the weeks it rolls into."""
+        conn.execute("DELETE FROM hours WHERE guild_id = ? AND week_key = ?", (week.guild_id, week.week_key))
+        conn.executemany(
+            f"INSERT INTO hours (guild_id, week_key, norm_name, name, {_DAY_COLUMNS},"
+            " total_minutes, rolling_minutes, pto_days, sick_days)"
+            f" VALUES (?, ?, ?, ?, {', '.join('?' * len(DAYS))}, ?, ?, ?, ?)",
+            [
+                (week.guild_id, week.week_key, normalize_name(row.name), row.name, *row.daily,
+                 row.total, row.total, row.pto_days, row.sick_days)
+                for row in week_hours(week.shifts)
+            ],
+        )
+        # Week keys are ISO dates when parseable; others only roll up themselves
+        span = f"{(ROLLING_WEEKS - 1) * 7} days"
+        conn.execute(
+            "UPDATE hours SET rolling_minutes = COALESCE((SELECT SUM(h.total_minutes) FROM hours h"
+            "  WHERE h.guild_id = hours.guild_id AND h.norm_name = hours.norm_name"
+            "  AND h.week_key BETWEEN date(hours.week_key, '-' || ?) AND hours.week_key), total_minutes)"
+            " WHERE guild_id = ? AND week_key BETWEEN ? AND COALESCE(date(?, '+' || ?), ?)",
+            (span, week.guild_id, week.week_key, week.week_key, span, week.week_key),
+        )
+
+    def _remember(self, week: StoredWeek):
+        key = (week.guild_id, week.week_key)
+        self._hot[key] = week
+        self._hot.move_to_end(key)
+        while len(self._hot) > self.hot_weeks:
+            self._hot.popitem(last=False)
+
+    def _save_blocking(self, week: StoredWeek) -> int:
+        """Write a week and return the guild's new revision (shared by every process)."""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO weeks (guild_id, week_key, from_date, to_date, uploaded_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (week.guild_id, week.week_key, week.week.get("From", ""), week.week.get("To", ""), week.uploaded_at),
+                )
+                conn.execute(
+                    "DELETE FROM employees WHERE guild_id = ? AND week_key = ?",
+                    (week.guild_id, week.week_key),
+                )
+                shifts = shifts_to_json(week.shifts)
+                conn.executemany(
+                    "INSERT INTO employees (guild_id, week_key, name, norm_name, schedule, shifts)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (week.guild_id, week.week_key, name, normalize_name(name),
+                         json.dumps(schedule), json.dumps(shifts.get(name, {})))
+                        for name, schedule in week.employees.items()
+                    ],
+                )
+                self._write_hours(conn, week)
+                conn.execute(
+                    "INSERT INTO revisions (guild_id, revision) VALUES (?, 1)"
+                    " ON CONFLICT (guild_id) DO UPDATE SET revision = revision + 1",
+                    (week.guild_id,),
+                )
+                return conn.execute(
+                    "SELECT revision FROM revisions WHERE guild_id = ?", (week.guild_id,)
+                ).fetchone()[0]
+
+    def _employee_hours_blocking(self, guild_id: int, name: str, limit: int) -> List[EmployeeWeek]:
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT h.week_key, w.from_date, h.name, {', '.join('h.' + day.lower() for day in DAYS)},"
+                " h.total_minutes, h.rolling_minutes, h.pto_days, h.sick_days"
+                " FROM hours h JOIN weeks w ON w.guild_id = h.guild_id AND w.week_key = h.week_key"
+                " WHERE h.guild_id = ? AND h.norm_name = ? ORDER BY h.week_key DESC LIMIT ?",
+                (guild_id, normalize_name(name), limit),
+            ).fetchall()
+        days = len(DAYS)
+        return [EmployeeWeek(row[0], row[1], row[2], tuple(row[3:3 + days]), *row[3 + days:]) for row in rows]
+
+    def _hours_report_blocking(self, guild_id: int, start_key: str, end_key: str) -> List[HoursSummary]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT MAX(name), COUNT(*), SUM(total_minutes), MAX(rolling_minutes),"
+                " SUM(total_minutes > ?), SUM(pto_days), SUM(sick_days)"
+                " FROM hours WHERE guild_id = ? AND week_key BETWEEN ? AND ?"
+                " GROUP BY norm_name ORDER BY SUM(total_minutes) DESC",
+                (overtime_weekly_minutes(), guild_id, start_key, end_key),
+            ).fetchall()
+        return [HoursSummary(*row) for row in rows]
+
+    def _foreign_revisions_blocking(self) -> Optional[Dict[int, int]]:
+        """Every guild's revision if another process has written since the last check, else None."""
+        with self._lock:
+            conn = self._connect()
+            version = data_version(conn)
+            if version == self._data_version:
+                return None
+            self._data_version = version
+            return dict(conn.execute("SELECT guild_id, revision FROM revisions").fetchall())
+
+    async def _watch(self):
+        while True:
+            try:
+                revisions = await asyncio.to_thread(self._foreign_revisions_blocking)
+            except Exception as e:
+                logger.warning("Schedule store poll failed: %s", e)
+                revisions = None
+
+            if revisions is not None:
+                # Forget cached weeks and latest-week pointers only for guilds that changed
+                changed = {
+                    guild_id for guild_id, revision in revisions.items()
+                    if self._revisions.get(guild_id) != revision
+                }
+                for key in [key for key in self._hot if key[0] in changed]:
+                    del self._hot[key]
+                for guild_id in changed:
+                    self._latest.pop(guild_id, None)
+                self._revisions.update(revisions)
+            await asyncio.sleep(SHARED_STATE_POLL_SECONDS)
+
+    def start(self):
+        """Watch for schedules saved by other bot processes."""
+        if self._watcher is None:
+            self._watcher = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            await asyncio.gather(self._watcher, return_exceptions=True)
+            self._watcher = None
+
+    def _load_blocking(self, guild_id: int, week_key: str) -> Optional[StoredWeek]:
+        with self._lock:
+            return self._read_week(self._connect(), guild_id, week_key)
+
+    @staticmethod
+    def _read_week(conn: sqlite3.Connection, guild_id: int, week_key: str) -> Optional[StoredWeek]:
+        row = conn.execute(
+            "SELECT from_date, to_date, uploaded_at FROM weeks WHERE guild_id = ? AND week_key = ?",
+            (guild_id, week_key),
+        ).fetchone()
+        if row is None:
+            return None
+        employees = conn.execute(
+            "SELECT name, schedule, shifts FROM employees WHERE guild_id = ? AND week_key = ? ORDER BY rowid",
+            (guild_id, week_key),
+        ).fetchall()
+
+        schedules = {name: json.loads(schedule) for name, schedule, _ in employees}
+        if any(shifts is None for _, _, shifts in employees):
+            return StoredWeek(guild_id, week_key, {"From": row[0], "To": row[1]}, schedules, uploaded_at=row[2])
+        return StoredWeek(
+            guild_id,
+            week_key,
+            {"From": row[0], "To": row[1]},
+            schedules,
+            shifts_from_json({name: json.loads(shifts) for name, _, shifts in employees}),
+            uploaded_at=row[2],
+        )
+
+    def _latest_blocking(self, guild_id: int) -> Optional[str]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT week_key FROM weeks WHERE guild_id = ? ORDER BY uploaded_at DESC LIMIT 1",
+                (guild_id,),
+            ).fetchone()
+        return row[0] if row else None
+
+    def _list_blocking(self, guild_id: int) -> List[tuple]:
+        with self._lock:
+            return self._connect().execute(
+                "SELECT week_key, from_date, to_date FROM weeks WHERE guild_id = ? ORDER BY week_key DESC",
+                (guild_id,),
+            ).fetchall()
+
+    def _employee_weeks_blocking(self, guild_id: int, name: str) -> List[str]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT week_key FROM employees WHERE guild_id = ? AND norm_name = ? ORDER BY week_key",
+                (guild_id, normalize_name(name)),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    async def save_week(self, guild_id: Optional[int], data: dict) -> StoredWeek:
+        """Store an extracted schedule (the processor's dict format) as the guild's latest week."""
+        guild_id = guild_id or 0
+        shifts = shifts_from_json(data["Shifts"]) if "Shifts" in data else None
+        week = StoredWeek(guild_id, week_key_for(data["Week"]["From"]), data["Week"], data["Employees"], shifts)
+        revision = await asyncio.to_thread(self._save_blocking, week)
+        self._remember(week)
+        self._latest[guild_id] = week.week_key
+        self._revisions[guild_id] = revision
+        return week
+
+    def revision(self, guild_id: Optional[int]) -> int:
+        """Counter bumped whenever a guild's schedules change, in this process or (once polled) another."""
+        return self._revisions.get(guild_id or 0, 0)
+
+    async def get_week(self, guild_id: Optional[int], week: Optional[str] = None) -> Optional[StoredWeek]:
+        """Return a stored week by its start date, or the guild's latest upload when `week` is omitted."""
+        guild_id = guild_id or 0
+
+        if week is None:
+            if guild_id not in self._latest:
+                self._latest[guild_id] = await asyncio.to_thread(self._latest_blocking, guild_id)
+            week_key = self._latest[guild_id]
+            if week_key is None:
+                return None
+        else:
+            week_key = week_key_for(week)
+
+        stored = self._hot.get((guild_id, week_key))
+        if stored is None:
+            stored = await asyncio.to_thread(self._load_blocking, guild_id, week_key)
+            if stored is None:
+                return None
+        self._remember(stored)
+        return stored
+
+    async def list_weeks(self, guild_id: Optional[int]) -> List[tuple]:
+        """(week_key, from, to) for every stored week of a guild, newest first."""
+        return await asyncio.to_thread(self._list_blocking, guild_id or 0)
+
+    async def weeks_between(self, guild_id: Optional[int], start: Optional[str] = None,
+                            end: Optional[str] = None, limit: Optional[int] = None) -> List[StoredWeek]:
+        """
+        Stored weeks whose start date falls between `start` and `end`
+        (inclusive, either open-ended), oldest first; `limit` keeps the newest.
+        """
+        start_key = week_key_for(start) if start else None
+        end_key = week_key_for(end) if end else None
+        keys = [
+            week_key for week_key, _, _ in await self.list_weeks(guild_id)
+            if (start_key is None or week_key >= start_key) and (end_key is None or week_key <= end_key)
+        ]
+        if limit is not None:
+            keys = keys[:limit]
+
+        weeks = []
+        for week_key in reversed(keys):
+            week = await self.get_week(guild_id, week_key)
+            if week is not None:
+                weeks.append(week)
+        return weeks
+
+    async def employee_hours(self, guild_id: Optional[int], name: str, weeks: int = 8) -> List[EmployeeWeek]:
+        """An employee's hours rollups for their most recent `weeks` weeks, newest first."""
+        return await asyncio.to_thread(self._employee_hours_blocking, guild_id or 0, name, weeks)
+
+    async def hours_report(self, guild_id: Optional[int], start: Optional[str] = None,
+                           end: Optional[str] = None) -> Tuple[List[str], List[HoursSummary]]:
+        """
+        Per-employee totals for the stored weeks between `start` and `end`
+        (defaults: the latest ROLLING_WEEKS uploads), biggest first, along
+        with the week keys covered. Reads only the hours rollups.
+        """
+        start_key = week_key_for(start) if start else None
+        end_key = week_key_for(end) if end else None
+        keys = [
+            week_key for week_key, _, _ in await self.list_weeks(guild_id)
+            if (start_key is None or week_key >= start_key) and (end_key is None or week_key <= end_key)
+        ]
+        if start is None:
+            keys = keys[:ROLLING_WEEKS]
+        if not keys:
+            return [], []
+        keys.reverse()
+        return keys, await asyncio.to_thread(self._hours_report_blocking, guild_id or 0, keys[0], keys[-1])
+
+    async def employee_weeks(self, guild_id: Optional[int], name: str) -> List[str]:
+        """Week keys in which an employee (by normalized name) appears."""
+        return await asyncio.to_thread(self._employee_weeks_blocking, guild_id or 0, name)
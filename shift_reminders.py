@@ -0,0 +1,304 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import discord
+
+from auto_sync import changed_employees
+from metrics import metrics
+from schedule_store import StoredWeek, normalize_name
+from shifts import DAYS, TIMEZONE
+from utils.shared_db import connect_shared
+
+logger = logging.getLogger(__name__)
+
+REMINDERS_PATH = "data/reminders.sqlite3"
+
+DEFAULT_LEAD_MINUTES = 60
+
+# Reminders that come due while the bot is down are still sent if the shift hasn't started
+MAX_SLEEP_SECONDS = 3600  # re-check the clock at least hourly (suspend, clock changes)
+
+# (user_id, guild_id, week_key, shift start timestamp)
+ReminderKey = Tuple[int, int, str, float]
+
+def shard_for(guild_id: int, shard_count: int) -> int:
+    """The shard Discord routes a guild's events to."""
+    return (guild_id >> 22) % shard_count
+
+class ShiftReminderService:
+    """
+    DM reminders before each shift of the employee a user follows.
+    Pending reminders are persisted in SQLite and mirrored in one in-memory
+    min-heap of deadlines; a single task sleeps until the earliest one.
+    Uploads only replace the reminders of subscribers whose employee's
+    shifts changed. Heap entries are never removed in place: a replaced
+    reminder is dropped from `_live` and skipped when it surfaces.
+    """
+
+    def __init__(self, bot, path: str = REMINDERS_PATH):
+        self.bot = bot
+        self.path = path
+        self._heap: List[Tuple[float, int, ReminderKey]] = []
+        self._live: Dict[ReminderKey, float] = {}  # key -> fire_at of its current heap entry
+        self._order = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._sleeper: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = connect_shared(self.path)
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS subscriptions ("
+                " user_id INTEGER NOT NULL,"
+                " guild_id INTEGER NOT NULL,"
+                " employee TEXT NOT NULL,"
+                " norm_name TEXT NOT NULL,"
+                " lead_minutes INTEGER NOT NULL,"
+                " PRIMARY KEY (user_id, guild_id));"
+                "CREATE INDEX IF NOT EXISTS subscriptions_by_employee ON subscriptions (guild_id, norm_name);"
+                "CREATE TABLE IF NOT EXISTS reminders ("
+                " user_id INTEGER NOT NULL,"
+                " guild_id INTEGER NOT NULL,"
+                " week_key TEXT NOT NULL,"
+                " shift_start REAL NOT NULL,"
+                " fire_at REAL NOT NULL,"
+                " message TEXT NOT NULL,"
+                " PRIMARY KEY (user_id, guild_id, week_key, shift_start));"
+            )
+        return self._conn
+
+    def _owns(self, guild_id: int) -> bool:
+        """Whether this process runs the shard for `guild_id`, so each reminder is sent once."""
+        if self.bot.shard_ids is None or not self.bot.shard_count:
+            return True
+        return shard_for(guild_id, self.bot.shard_count) in self.bot.shard_ids
+
+    @staticmethod
+    def _build(week: StoredWeek, employee: str, lead_minutes: int) -> List[Tuple[float, float, str]]:
+        """(shift_start, fire_at, message) for every timed shift of `employee` in `week`."""
+        try:
+            week_start = week.week_start
+        except ValueError:
+            return []
+
+        wanted = normalize_name(employee)
+        name = next((name for name in week.employees if normalize_name(name) == wanted), None)
+        if name is None:
+            return []
+
+        reminders = []
+        for day in DAYS:
+            for shift in week.shifts.get(name, {}).get(day, ()):
+                if not shift.is_timed:
+                    continue
+                start, _ = shift.datetimes(week_start, day)
+                message = f"⏰ **{name}** works {day} {start:%m/%d}, {shift.format()}"
+                fire_at = start - timedelta(minutes=lead_minutes)
+                reminders.append((start.timestamp(), fire_at.timestamp(), message))
+        return reminders
+
+    def _replace_blocking(self, guild_id: int, week_key: str,
+                          reminders: Dict[int, List[Tuple[float, float, str]]]) -> List[ReminderKey]:
+        """Swap the given users' reminders for one week; returns the keys that were removed."""
+        with self._lock:
+            conn = self._connect()
+            removed = []
+            with conn:
+                for user_id, rows in reminders.items():
+                    removed.extend(
+                        (user_id, guild_id, week_key, shift_start) for (shift_start,) in conn.execute(
+                            "SELECT shift_start FROM reminders WHERE user_id = ? AND guild_id = ? AND week_key = ?",
+                            (user_id, guild_id, week_key),
+                        )
+                    )
+                    conn.execute(
+                        "DELETE FROM reminders WHERE user_id = ? AND guild_id = ? AND week_key = ?",
+                        (user_id, guild_id, week_key),
+                    )
+                    conn.executemany(
+                        "INSERT INTO reminders (user_id, guild_id, week_key, shift_start, fire_at, message)"
+                        " VALUES (?, ?, ?, ?, ?, ?)",
+                        [(user_id, guild_id, week_key, *row) for row in rows],
+                    )
+        return removed
+
+    def _subscribers_blocking(self, guild_id: int, names) -> List[tuple]:
+        with self._lock:
+            if not names:
+                return []
+            return self._connect().execute(
+                "SELECT user_id, employee, lead_minutes FROM subscriptions"
+                f" WHERE guild_id = ? AND norm_name IN ({','.join('?' * len(names))})",
+                (guild_id, *names),
+            ).fetchall()
+
+    def _pending_blocking(self, now: float) -> List[tuple]:
+        """Reminders whose shift hasn't started, after dropping the rest."""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM reminders WHERE shift_start <= ?", (now,))
+            return conn.execute("SELECT user_id, guild_id, week_key, shift_start, fire_at FROM reminders").fetchall()
+
+    def _take_blocking(self, key: ReminderKey) -> Optional[str]:
+        """Delete a due reminder and return its message (None if it was replaced meanwhile)."""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                row = conn.execute(
+                    "SELECT message FROM reminders WHERE user_id = ? AND guild_id = ? AND week_key = ? AND shift_start = ?",
+                    key,
+                ).fetchone()
+                conn.execute(
+                    "DELETE FROM reminders WHERE user_id = ? AND guild_id = ? AND week_key = ? AND shift_start = ?",
+                    key,
+                )
+        return row[0] if row else None
+
+    def _subscribe_blocking(self, user_id: int, guild_id: int, employee: str, lead_minutes: int):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO subscriptions (user_id, guild_id, employee, norm_name, lead_minutes)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (user_id, guild_id, employee, normalize_name(employee), lead_minutes),
+                )
+
+    def _unsubscribe_blocking(self, user_id: int, guild_id: int) -> Tuple[bool, List[ReminderKey]]:
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                deleted = conn.execute(
+                    "DELETE FROM subscriptions WHERE user_id = ? AND guild_id = ?", (user_id, guild_id)
+                ).rowcount
+                removed = [
+                    (user_id, guild_id, week_key, shift_start) for week_key, shift_start in conn.execute(
+                        "SELECT week_key, shift_start FROM reminders WHERE user_id = ? AND guild_id = ?",
+                        (user_id, guild_id),
+                    )
+                ]
+                conn.execute("DELETE FROM reminders WHERE user_id = ? AND guild_id = ?", (user_id, guild_id))
+        return deleted > 0, removed
+
+    def _push(self, key: ReminderKey, fire_at: float):
+        self._live[key] = fire_at
+        heapq.heappush(self._heap, (fire_at, next(self._order), key))
+        if self._heap[0][2] == key:
+            self._wakeup.set()  # new earliest deadline
+
+    def _discard(self, keys: List[ReminderKey]):
+        for key in keys:
+            self._live.pop(key, None)
+        # Rebuild once stale entries dominate, so replaced reminders can't pile up
+        if len(self._heap) > 2 * len(self._live) + 64:
+            self._heap = [entry for entry in self._heap if self._live.get(entry[2]) == entry[0]]
+            heapq.heapify(self._heap)
+
+    async def start(self):
+        """Load pending reminders for this process's guilds and start the sleeper."""
+        for user_id, guild_id, week_key, shift_start, fire_at in await asyncio.to_thread(
+            self._pending_blocking, time.time()
+        ):
+            if self._owns(guild_id):
+                self._push((user_id, guild_id, week_key, shift_start), fire_at)
+        logger.info("Loaded shift reminders: pending=%d", len(self._live))
+        if self._sleeper is None:
+            self._sleeper = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._sleeper is not None:
+            self._sleeper.cancel()
+            await asyncio.gather(self._sleeper, return_exceptions=True)
+            self._sleeper = None
+
+    async def _install(self, guild_id: int, week: StoredWeek, subscribers: List[tuple]) -> int:
+        """Rebuild one week's reminders for the given (user_id, employee, lead_minutes) subscribers."""
+        now = time.time()
+        reminders = {
+            user_id: [row for row in self._build(week, employee, lead) if row[0] > now]
+            for user_id, employee, lead in subscribers
+        }
+        removed = await asyncio.to_thread(self._replace_blocking, guild_id, week.week_key, reminders)
+        self._discard(removed)
+        if self._owns(guild_id):
+            for user_id, rows in reminders.items():
+                for shift_start, fire_at, _ in rows:
+                    self._push((user_id, guild_id, week.week_key, shift_start), fire_at)
+        return sum(len(rows) for rows in reminders.values())
+
+    async def subscribe(self, user_id: int, guild_id: Optional[int], employee: str,
+                        lead_minutes: int = DEFAULT_LEAD_MINUTES) -> int:
+        """Remind a user before `employee`'s shifts; returns how many upcoming shifts were found."""
+        guild_id = guild_id or 0
+        await asyncio.to_thread(self._subscribe_blocking, user_id, guild_id, employee, lead_minutes)
+        # Weeks that can still have upcoming shifts: the current one and anything later
+        since = (datetime.now(TIMEZONE) - timedelta(days=7)).date().isoformat()
+        scheduled = 0
+        for week in await self.bot.store.weeks_between(guild_id, since):
+            scheduled += await self._install(guild_id, week, [(user_id, employee, lead_minutes)])
+        return scheduled
+
+    async def unsubscribe(self, user_id: int, guild_id: Optional[int]) -> bool:
+        deleted, removed = await asyncio.to_thread(self._unsubscribe_blocking, user_id, guild_id or 0)
+        self._discard(removed)
+        return deleted
+
+    async def schedule_changed(self, previous: Optional[StoredWeek], week: StoredWeek):
+        """Rebuild reminders for subscribers of employees whose shifts changed in `week`."""
+        names = changed_employees(previous, week)
+        subscribers = await asyncio.to_thread(self._subscribers_blocking, week.guild_id, names)
+        if subscribers:
+            count = await self._install(week.guild_id, week, subscribers)
+            logger.info("Rebuilt shift reminders: guild=%s week=%s users=%d reminders=%d",
+                        week.guild_id, week.week_key, len(subscribers), count)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            fire_at, _, key = self._heap[0]
+            delay = fire_at - time.time()
+            if delay > 0:
+                # asyncio.wait rather than wait_for: it never swallows a cancel that races a wakeup
+                waiter = asyncio.ensure_future(self._wakeup.wait())
+                try:
+                    await asyncio.wait([waiter], timeout=min(delay, MAX_SLEEP_SECONDS))
+                finally:
+                    waiter.cancel()
+                continue
+
+            heapq.heappop(self._heap)
+            if self._live.get(key) != fire_at:
+                continue  # replaced or cancelled since it was pushed
+            del self._live[key]
+            try:
+                await self._send(key)
+            except Exception:
+                logger.exception("Shift reminder failed: user=%s", key[0])
+
+    async def _send(self, key: ReminderKey):
+        message = await asyncio.to_thread(self._take_blocking, key)
+        if message is None or key[3] <= time.time():
+            return  # gone, or the shift already started while we were offline
+
+        user_id = key[0]
+        try:
+            user = self.bot.get_user(user_id) or await self.bot.fetch_user(user_id)
+            await user.send(message)
+            metrics.inc("shift_reminders", result="sent")
+        except discord.HTTPException as e:
+            # Closed DMs (403) and unknown users won't succeed on retry either
+            metrics.inc("shift_reminders", result="failed")
+            logger.warning("Could not DM shift reminder: user=%s error=%s", user_id, e)
@@ -0,0 +1,188 @@
+import re
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import pytz
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+TIMEZONE = pytz.timezone("America/New_York")
+
+# Notes that just mean the employee isn't working
+DAY_OFF_NOTES = {"off", "day off", "-", "n/a", "none"}
+
+# Without AM/PM, start hours below this are read as afternoon ("1-9" is 1 PM - 9 PM)
+EARLIEST_AMBIGUOUS_START_HOUR = 7
+
+_TIME = r"(?:(?P<{0}h>\d{{1,2}})(?::?(?P<{0}m>\d{{2}}))?\s*(?P<{0}p>[ap]\.?\s?m\.?|[ap](?![a-z]))?|(?P<{0}w>noon|midnight))"
+_RANGE = re.compile(
+    _TIME.format("s") + r"\s*(?:-|–|—|to|until)\s*" + _TIME.format("e"),
+    re.IGNORECASE,
+)
+_POINT = re.compile(r"^\s*" + _TIME.format("s") + r"\s*$", re.IGNORECASE)
+
+class Shift(NamedTuple):
+    """
+    One work shift, in minutes after midnight. `end` is on the next day when
+    `overnight` is set. Note-only entries (PTO, sick) have no start or end.
+    """
+    start: Optional[int]
+    end: Optional[int]
+    overnight: bool = False
+    note: Optional[str] = None
+
+    @property
+    def is_timed(self) -> bool:
+        return self.start is not None
+
+    @property
+    def duration_minutes(self) -> int:
+        if not self.is_timed:
+            return 0
+        return self.end - self.start + (24 * 60 if self.overnight else 0)
+
+    def datetimes(self, week_start: datetime, day: str) -> Tuple[datetime, datetime]:
+        """Localized start/end datetimes for this shift on `day` of the week starting `week_start`."""
+        day_start = datetime.combine(week_start.date() + timedelta(days=DAYS.index(day)), datetime.min.time())
+        start = TIMEZONE.localize(day_start + timedelta(minutes=self.start))
+        end = TIMEZONE.localize(day_start + timedelta(minutes=self.end + (24 * 60 if self.overnight else 0)))
+        return start, end
+
+    def format(self) -> str:
+        if not self.is_timed:
+            return self.note or ""
+        text = f"{format_minutes(self.start)} - {format_minutes(self.end)}"
+        if self.note:
+            text += f" ({self.note})"
+        return text
+
+def format_minutes(minutes: int) -> str:
+    return datetime.min.replace(hour=minutes // 60, minute=minutes % 60).strftime("%I:%M %p")
+
+def _read_time(match, prefix: str) -> Tuple[int, int, Optional[str]]:
+    """(hour, minute, meridiem) for one side of a range; meridiem is "a", "p" or None."""
+    word = match.group(prefix + "w")
+    if word:
+        return (12, 0, "p") if word.lower() == "noon" else (12, 0, "a")
+    meridiem = match.group(prefix + "p")
+    return (
+        int(match.group(prefix + "h")),
+        int(match.group(prefix + "m") or 0),
+        meridiem[0].lower() if meridiem else None,
+    )
+
+def _to_minutes(hour: int, minute: int, meridiem: str) -> int:
+    hour %= 12
+    if meridiem == "p":
+        hour += 12
+    return hour * 60 + minute
+
+def _parse_range(match) -> Optional[Tuple[int, int]]:
+    sh, sm, sp = _read_time(match, "s")
+    eh, em, ep = _read_time(match, "e")
+    if sh > 24 or eh > 24 or sm > 59 or em > 59:
+        return None
+
+    # 24-hour clock ("17:00 - 01:00")
+    if sp is None and ep is None and (sh > 12 or eh > 12 or sh == 0 or eh == 0):
+        return (sh % 24) * 60 + sm, (eh % 24) * 60 + em
+
+    if sp is None and ep is None:
+        # A bare 12 is noon, as in parse_time_of_day
+        sp = "p" if sh < EARLIEST_AMBIGUOUS_START_HOUR or sh == 12 else "a"
+
+    if sp is None:
+        # "9-5 PM": take the end's meridiem unless that puts the start after the end
+        start = _to_minutes(sh, sm, ep)
+        if start >= _to_minutes(eh, em, ep):
+            start = _to_minutes(sh, sm, "a")
+        return start, _to_minutes(eh, em, ep)
+
+    start = _to_minutes(sh, sm, sp)
+    if ep is not None:
+        return start, _to_minutes(eh, em, ep)
+
+    # "9 AM - 5": the first reading of the end that comes after the start
+    for meridiem in ("a", "p"):
+        end = _to_minutes(eh, em, meridiem)
+        if end > start:
+            return start, end
+    return start, _to_minutes(eh, em, "a")
+
+def parse_time_of_day(text: str) -> Optional[int]:
+    """
+    Minutes after midnight for a single time such as "3pm", "15:30" or
+    "noon". Without AM/PM, hours are read like shift starts ("3" is 3 PM).
+    """
+    match = _POINT.match(text or "")
+    if match is None:
+        return None
+    hour, minute, meridiem = _read_time(match, "s")
+    if hour > 24 or minute > 59 or (meridiem is not None and not 1 <= hour <= 12):
+        return None
+    if meridiem is None and (hour > 12 or hour == 0):
+        return (hour % 24) * 60 + minute
+    if meridiem is None:
+        meridiem = "p" if hour < EARLIEST_AMBIGUOUS_START_HOUR or hour == 12 else "a"
+    return _to_minutes(hour, minute, meridiem)
+
+def _clean_note(text: str) -> Optional[str]:
+    note = re.sub(r"[\s,;/&()\[\]]+", " ", text)
+    note = re.sub(r"^(?:and\s+)+|(?:\s+and)+$", "", note.strip(), flags=re.IGNORECASE).strip(" -–—")
+    return note or None
+
+def parse_shift_text(text: Optional[str]) -> Tuple[Shift, ...]:
+    """
+    Parse a day's time slot as extracted from the schedule image.
+    Handles 12h and 24h times, missing AM/PM, overnight and split shifts
+    ("9-1, 5-9"); any leftover text (PTO, sick, training) becomes the note.
+    Returns () for days off.
+    """
+    if not text or not text.strip():
+        return ()
+
+    ranges = []
+    leftover = []
+    position = 0
+    for match in _RANGE.finditer(text):
+        parsed = _parse_range(match)
+        if parsed is None:
+            continue
+        leftover.append(text[position:match.start()])
+        position = match.end()
+        ranges.append(parsed)
+    leftover.append(text[position:])
+
+    note = _clean_note(" ".join(leftover))
+    if not ranges:
+        if note is None or note.casefold() in DAY_OFF_NOTES:
+            return ()
+        return (Shift(None, None, False, note),)
+
+    shifts = []
+    for index, (start, end) in enumerate(ranges):
+        shifts.append(Shift(start, end, end <= start, note if index == 0 else None))
+    return tuple(shifts)
+
+def parse_week_shifts(employees: Dict[str, dict]) -> Dict[str, Dict[str, Tuple[Shift, ...]]]:
+    """Parse every employee's time slots; days off are left out."""
+    week_shifts = {}
+    for name, schedule in employees.items():
+        week_shifts[name] = {}
+        for day in DAYS:
+            shifts = parse_shift_text(schedule.get(day))
+            if shifts:
+                week_shifts[name][day] = shifts
+    return week_shifts
+
+def shifts_to_json(week_shifts: Dict[str, Dict[str, Tuple[Shift, ...]]]) -> Dict[str, Dict[str, List[list]]]:
+    return {
+        name: {day: [list(shift) for shift in shifts] for day, shifts in days.items()}
+        for name, days in week_shifts.items()
+    }
+
+def shifts_from_json(data: Dict[str, Dict[str, List[list]]]) -> Dict[str, Dict[str, Tuple[Shift, ...]]]:
+    return {
+        name: {day: tuple(Shift(*shift) for shift in shifts) for day, shifts in days.items()}
+        for name, days in data.items()
+    }
@@ -0,0 +1,37 @@
+from utils.name_index import EmployeeNameIndex
+
+ROSTER = ["Maria Garcia", "Mario Rossi", "Anne Marie Lee", "Bob Stone"]
+
+def test_exact_and_prefix_matches_resolve():
+    index = EmployeeNameIndex(ROSTER)
+    assert index.resolve("bob stone") == "Bob Stone"
+    assert index.resolve("  MARIA   garcia ") == "Maria Garcia"
+    assert index.resolve("bob") == "Bob Stone"
+    assert index.resolve("lee") == "Anne Marie Lee"
+
+def test_short_substring_finds_every_name_containing_it():
+    index = EmployeeNameIndex(ROSTER)
+    assert set(index.search("ar")) >= {"Maria Garcia", "Mario Rossi", "Anne Marie Lee"}
+    assert index.resolve("ar") is None
+
+def test_ambiguous_prefix_is_not_resolved():
+    index = EmployeeNameIndex(ROSTER)
+    assert index.resolve("mar") is None
+    assert index.resolve("mari") is None
+    assert index.resolve("mario") == "Mario Rossi"
+
+def test_unique_short_substring_resolves():
+    index = EmployeeNameIndex(ROSTER)
+    assert index.resolve("ton") == "Bob Stone"
+    assert index.resolve("ss") == "Mario Rossi"
+
+def test_typos_are_suggested_but_never_resolved():
+    index = EmployeeNameIndex(ROSTER)
+    assert index.search("garcai")[0] == "Maria Garcia"
+    assert index.resolve("garcai") is None
+
+def test_unknown_and_empty_queries():
+    index = EmployeeNameIndex(ROSTER)
+    assert index.resolve("zz") is None
+    assert index.resolve("") is None
+    assert index.search("", limit=2) == ROSTER[:2]
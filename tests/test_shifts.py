@@ -0,0 +1,58 @@
+import pytest
+
+from shifts import Shift, parse_shift_text, parse_time_of_day
+
+def _hours(hour: int, minute: int = 0) -> int:
+    return hour * 60 + minute
+
+@pytest.mark.parametrize("text, start, end", [
+    ("12-8", _hours(12), _hours(20)),
+    ("12-5", _hours(12), _hours(17)),
+    ("12:30-9", _hours(12, 30), _hours(21)),
+    ("12-5 PM", _hours(12), _hours(17)),
+])
+def test_bare_twelve_starts_at_noon(text, start, end):
+    assert parse_shift_text(text) == (Shift(start, end, False),)
+
+def test_bare_twelve_agrees_with_parse_time_of_day():
+    assert parse_shift_text("12-8")[0].start == parse_time_of_day("12")
+
+@pytest.mark.parametrize("text, start, end", [
+    ("9-5", _hours(9), _hours(17)),
+    ("9-5 PM", _hours(9), _hours(17)),
+    ("9am-5pm", _hours(9), _hours(17)),
+    ("9 AM - 5", _hours(9), _hours(17)),
+    ("1-9", _hours(13), _hours(21)),
+    ("11-7", _hours(11), _hours(19)),
+])
+def test_twelve_hour_ranges(text, start, end):
+    assert parse_shift_text(text) == (Shift(start, end, False),)
+
+@pytest.mark.parametrize("text, start, end, overnight", [
+    ("09:00-17:00", _hours(9), _hours(17), False),
+    ("13:30-21:00", _hours(13, 30), _hours(21), False),
+    ("17:00 - 01:00", _hours(17), _hours(1), True),
+    ("0:00-8:00", _hours(0), _hours(8), False),
+])
+def test_twenty_four_hour_ranges(text, start, end, overnight):
+    assert parse_shift_text(text) == (Shift(start, end, overnight),)
+
+def test_overnight_and_split_shifts():
+    assert parse_shift_text("10pm-6am") == (Shift(_hours(22), _hours(6), True),)
+    assert parse_shift_text("9-1, 5-9") == (Shift(_hours(9), _hours(13), False), Shift(_hours(17), _hours(21), False))
+
+def test_notes_and_days_off():
+    assert parse_shift_text("PTO") == (Shift(None, None, False, "PTO"),)
+    assert parse_shift_text("off") == ()
+    assert parse_shift_text(None) == ()
+
+@pytest.mark.parametrize("text, minute", [
+    ("12", _hours(12)),
+    ("3", _hours(15)),
+    ("3pm", _hours(15)),
+    ("15:30", _hours(15, 30)),
+    ("noon", _hours(12)),
+    ("midnight", 0),
+])
+def test_parse_time_of_day(text, minute):
+    assert parse_time_of_day(text) == minute
@@ -0,0 +1,113 @@
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Tuple
+
+from shifts import DAYS, Shift
+
+if TYPE_CHECKING:
+    import numpy as np
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = len(DAYS) * MINUTES_PER_DAY
+
+# Resolution of the staffing matrix
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = MINUTES_PER_DAY // SLOT_MINUTES
+
+class OnShift(NamedTuple):
+    """One shift found by a coverage query, in minutes since Monday 00:00."""
+    name: str
+    start: int
+    end: int
+    note: str
+
+class CoverageIndex:
+    """
+    "Who's working when" index over one week's parsed shifts.
+    Built once per loaded schedule: every timed shift becomes an interval on
+    a Monday-to-Sunday minute timeline, kept in NumPy arrays sorted by
+    start, plus a per-15-minute staffing matrix of shape (7, 96). Overnight
+    shifts run into the next day; Sunday nights stop at the end of the week.
+    """
+
+    def __init__(self, week_shifts: Dict[str, Dict[str, Tuple[Shift, ...]]]):
+        # NumPy loads with the first coverage query, not at startup
+        import numpy as np
+
+        names, starts, ends, notes = [], [], [], []
+        self.day_notes: Dict[str, List[Tuple[str, str]]] = {day: [] for day in DAYS}
+
+        for name, days in week_shifts.items():
+            for day, shifts in days.items():
+                offset = DAYS.index(day) * MINUTES_PER_DAY
+                for shift in shifts:
+                    if not shift.is_timed:
+                        self.day_notes[day].append((name, shift.note))
+                        continue
+                    start = offset + shift.start
+                    names.append(name)
+                    starts.append(start)
+                    ends.append(min(MINUTES_PER_WEEK, start + shift.duration_minutes))
+                    notes.append(shift.note or "")
+
+        order = np.argsort(np.asarray(starts, dtype=np.int32), kind="stable")
+        self.starts = np.asarray(starts, dtype=np.int32)[order]
+        self.ends = np.asarray(ends, dtype=np.int32)[order]
+        self.names = [names[i] for i in order]
+        self.notes = [notes[i] for i in order]
+        # Bounds how far back a query has to look for shifts still running
+        self.longest = int((self.ends - self.starts).max()) if len(order) else 0
+        self.staffing = self._staffing_matrix()
+
+    def _staffing_matrix(self) -> "np.ndarray":
+        """People on shift during each 15-minute slot (any part of it), as a (7, 96) array."""
+        import numpy as np
+
+        slots = len(DAYS) * SLOTS_PER_DAY
+        delta = np.zeros(slots + 1, dtype=np.int32)
+        np.add.at(delta, self.starts // SLOT_MINUTES, 1)
+        np.add.at(delta, -(-self.ends // SLOT_MINUTES), -1)
+        return np.cumsum(delta[:slots]).reshape(len(DAYS), SLOTS_PER_DAY)
+
+    def overlapping(self, start: int, end: int) -> List[OnShift]:
+        """Shifts overlapping [start, end) on the week timeline, by start time."""
+        import numpy as np
+
+        lo = int(np.searchsorted(self.starts, start - self.longest, side="right"))
+        hi = int(np.searchsorted(self.starts, end, side="left"))
+        hits = lo + np.flatnonzero(self.ends[lo:hi] > start)
+        return [OnShift(self.names[i], int(self.starts[i]), int(self.ends[i]), self.notes[i]) for i in hits]
+
+    def working_at(self, day: str, minute: int) -> List[OnShift]:
+        """Everyone on shift at `minute` after midnight on `day`."""
+        moment = DAYS.index(day) * MINUTES_PER_DAY + minute
+        return self.overlapping(moment, moment + 1)
+
+    def working_on(self, day: str) -> List[OnShift]:
+        """Everyone with shift time on `day`, including overnight shifts from the day before."""
+        offset = DAYS.index(day) * MINUTES_PER_DAY
+        return self.overlapping(offset, offset + MINUTES_PER_DAY)
+
+    def understaffed(self, minimum: int) -> Dict[str, List[Tuple[int, int, int]]]:
+        """
+        Per day, (start, end, fewest on shift) for every stretch below `minimum`
+        during opening hours: from the first shift starting that day to the
+        last one ending. Overnight shifts from the day before don't open it.
+        """
+        import numpy as np
+
+        gaps = {}
+        for index, day in enumerate(DAYS):
+            offset = index * MINUTES_PER_DAY
+            lo, hi = np.searchsorted(self.starts, [offset, offset + MINUTES_PER_DAY])
+            if lo == hi:
+                continue
+            row = self.staffing[index]
+            first = (int(self.starts[lo]) - offset) // SLOT_MINUTES
+            last = -(-min(MINUTES_PER_DAY, int(self.ends[lo:hi].max()) - offset) // SLOT_MINUTES)
+            short = np.zeros(SLOTS_PER_DAY + 2, dtype=np.int8)
+            short[first + 1:last + 1] = row[first:last] < minimum
+            edges = np.flatnonzero(np.diff(short))
+            gaps[day] = [
+                (int(begin) * SLOT_MINUTES, int(finish) * SLOT_MINUTES, int(row[begin:finish].min()))
+                for begin, finish in zip(edges[::2], edges[1::2])
+            ]
+        return {day: stretches for day, stretches in gaps.items() if stretches}
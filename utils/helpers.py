@@ -1,56 +1,60 @@
 from typing import Optional
-import pytz
-from datetime import datetime, timedelta
+from discord import app_commands
 
-from calendar_api import get_calendar_list
+from calendar_api import create_new_calendar, get_calendar_list, get_primary_calendar
 
-def find_employee(bot, search_name: str) -> dict:
-    """Find employee by name (case-insensitive, partial match)."""
-    search_name = search_name.lower()
-    
-    for emp_name, schedule in bot.schedules.items():
-        if search_name in emp_name.lower():
-            return {"name": emp_name, "schedule": schedule}
-    
-    return None
-
-def format_employee_schedule(self, name: str, schedule: dict) -> str:
-    """Format employee schedule for display."""
-    week_info = f"**Week:** {self.current_week['From']} to {self.current_week['To']}" if self.current_week else ""
-    
-    schedule_lines = []
-    days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-    
-    for day in days:
-        time_slot = schedule.get(day)
-        if time_slot:
-            schedule_lines.append(f"**{day}:** {time_slot}")
-        else:
-            schedule_lines.append(f"**{day}:** Off")
-    
-    return f"**{name}**\n" + "\n".join(schedule_lines)
+def find_employee(week, search_name: str) -> dict:
+    """Find employee by name (case-insensitive, partial match). Ambiguous names return None."""
+    emp_name = week.name_index.resolve(search_name)
+    if emp_name is None:
+        return None
+    return {"name": emp_name, "schedule": week.employees[emp_name], "shifts": week.shifts.get(emp_name, {})}
 
-def combine_day_and_time(week_start, day_name, time_str):
-    # Map weekday strings to offsets
-    day_index = ["Monday","Tuesday","Wednesday","Thursday","Friday","Saturday","Sunday"].index(day_name)
-    tz = pytz.timezone("America/New_York")
+def employee_not_found_message(week, search_name: str) -> str:
+    """Not-found message, listing the closest names when there are any."""
+    suggestions = week.name_index.search(search_name, limit=5) if week else []
+    message = f"❌ Employee '{search_name}' not found!"
+    if suggestions:
+        message += " Did you mean: " + ", ".join(f"**{name}**" for name in suggestions) + "?"
+    return message
 
-    # Trim things like "09:00 AM"
-    t = datetime.strptime(time_str.strip(), "%I:%M %p").time()
-    dt = datetime.combine(week_start + timedelta(days=day_index), t)
-    return tz.localize(dt)
+def employee_autocomplete(bot):
+    """Autocomplete callback for employee name parameters, ranked by the week's name index."""
+    async def _autocomplete(interaction, current: str):
+        week = await bot.store.get_week(interaction.guild_id, getattr(interaction.namespace, "week", None))
+        if not week:
+            return []
+        return [
+            app_commands.Choice(name=name[:100], value=name[:100])
+            for name in week.name_index.search(current, limit=25)
+        ]
+    return _autocomplete
 
-def find_existing_work_calendar(target_name: Optional[str] ="Work Schedule"):
-    calendars = get_calendar_list()
+async def find_existing_work_calendar(user_id: int, target_name: Optional[str] ="Work Schedule"):
+    calendars = await get_calendar_list(user_id)
     for calendar in calendars:
         if calendar.get("summary", "").lower() == target_name.lower():
             return calendar
     return None
 
-async def verify_sync_prerequisites(bot, interaction, employee_name, test_calendar_connection_func, find_employee_func):
-    """Verify all prerequisites before syncing calendar."""
+async def resolve_sync_calendar(user_id: int, use_primary: bool):
+    """Return (calendar_id, calendar_name) for the primary or the "Work Schedule" calendar."""
+    if use_primary:
+        return "primary", (await get_primary_calendar(user_id)).get("summary")
+
+    # Check for existing "Work Schedule" calendar
+    existing_calendar = await find_existing_work_calendar(user_id)
+    if existing_calendar:
+        return existing_calendar["id"], existing_calendar["summary"]
+
+    # Create if none exists
+    new_calendar = await create_new_calendar(user_id)
+    return new_calendar["id"], new_calendar["summary"]
+
+async def verify_sync_prerequisites(week, interaction, employee_name, test_calendar_connection_func, find_employee_func):
+    """Verify all prerequisites before syncing calendar. Defers the interaction once the connection check starts."""
     # 1. Check if schedules exist
-    if not hasattr(bot, "schedules") or not bot.schedules:
+    if week is None or not week.employees:
         await interaction.response.send_message(
             "❌ No schedule data loaded. Upload a schedule first!",
             ephemeral=True,
@@ -58,19 +62,21 @@ async def verify_sync_prerequisites(bot, interaction, employee_name, test_calend
         return None
 
     # 2. Check if employee exists
-    employee_schedule = find_employee_func(bot, employee_name)
+    employee_schedule = find_employee_func(week, employee_name)
     if not employee_schedule:
         await interaction.response.send_message(
-            f"❌ Employee '{employee_name}' not found!",
+            employee_not_found_message(week, employee_name),
             ephemeral=True,
         )
         return None
 
-    # 3. Check Google Calendar connection
-    is_connected = test_calendar_connection_func()
+    # 3. Check Google Calendar connection; it can retry for longer than Discord's 3 s window
+    # for a first response, so defer first and report through the followup
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    is_connected = await test_calendar_connection_func(interaction.user.id)
     if not is_connected:
-        await interaction.response.send_message(
-            "❌ Failed to connect to Google Calendar.",
+        await interaction.followup.send(
+            "❌ Failed to connect to Google Calendar. Use `/connect_to_google` to link your account.",
             ephemeral=True,
         )
         return None
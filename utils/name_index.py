@@ -0,0 +1,130 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+# Match tiers, best first
+EXACT, NAME_PREFIX, TOKEN_PREFIX, SUBSTRING, FUZZY = range(5)
+
+# Minimum trigram similarity for a fuzzy (typo) match
+MIN_FUZZY_SIMILARITY = 0.3
+
+def _normalize(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance between two short strings."""
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+class EmployeeNameIndex:
+    """
+    Search index over one week's employee names.
+    Built once per loaded schedule: casefolded tokens go into a prefix trie
+    and full names into a trigram index. Only the substring check scans the
+    normalized names, which is a plain `in` per name.
+    """
+
+    def __init__(self, names: Iterable[str]):
+        self.names: List[str] = list(names)
+        self._normalized = [_normalize(name) for name in self.names]
+        self._exact: Dict[str, int] = {}
+        self._trie: dict = {}
+        self._trigrams: Dict[str, Set[int]] = defaultdict(set)
+
+        for name_id, normalized in enumerate(self._normalized):
+            self._exact.setdefault(normalized, name_id)
+            for token in normalized.split():
+                node = self._trie
+                for char in token:
+                    node = node.setdefault(char, {})
+                    node.setdefault("$", set()).add(name_id)
+            for gram in _trigrams(normalized):
+                self._trigrams[gram].add(name_id)
+
+    def _prefix_ids(self, prefix: str) -> Set[int]:
+        node = self._trie
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return set()
+        return node.get("$", set())
+
+    def _rank(self, query: str) -> List[tuple]:
+        """(tier, -similarity, name_id) for every candidate matching the query."""
+        ranked = {}
+
+        if query in self._exact:
+            ranked[self._exact[query]] = (EXACT, 0.0)
+
+        # Every query token must be the prefix of some token in the name
+        tokens = query.split()
+        candidates = self._prefix_ids(tokens[0])
+        for token in tokens[1:]:
+            candidates = candidates & self._prefix_ids(token)
+        for name_id in candidates:
+            tier = NAME_PREFIX if self._normalized[name_id].startswith(query) else TOKEN_PREFIX
+            ranked.setdefault(name_id, (tier, 0.0))
+
+        # Trigram similarity orders the matches and covers typos
+        query_grams = _trigrams(query)
+        shared = defaultdict(int)
+        for gram in query_grams:
+            for name_id in self._trigrams.get(gram, ()):
+                shared[name_id] += 1
+
+        def _similarity(name_id: int) -> float:
+            return shared.get(name_id, 0) / len(query_grams | _trigrams(self._normalized[name_id]))
+
+        # Substrings are checked on the names themselves: a short query ("ar") can sit
+        # inside a name without sharing any of its padded trigrams
+        for name_id, normalized in enumerate(self._normalized):
+            if name_id in ranked:
+                ranked[name_id] = (ranked[name_id][0], -_similarity(name_id))
+            elif query in normalized:
+                ranked[name_id] = (SUBSTRING, -_similarity(name_id))
+
+        for name_id in shared:
+            if name_id in ranked:
+                continue
+            normalized = self._normalized[name_id]
+            similarity = _similarity(name_id)
+            if similarity >= MIN_FUZZY_SIMILARITY or min(
+                _edit_distance(query, token) for token in normalized.split()
+            ) <= max(1, len(query) // 3):
+                ranked[name_id] = (FUZZY, -similarity)
+
+        return sorted((tier, score, name_id) for name_id, (tier, score) in ranked.items())
+
+    def search(self, query: str, limit: int = 25) -> List[str]:
+        """Names matching `query`, best first. An empty query lists the roster."""
+        query = _normalize(query)
+        if not query:
+            return self.names[:limit]
+        return [self.names[name_id] for _, _, name_id in self._rank(query)[:limit]]
+
+    def resolve(self, query: str) -> Optional[str]:
+        """
+        The single employee a query refers to, or None when nothing matches
+        or the best matches are ambiguous. Typo-only matches are never
+        resolved automatically.
+        """
+        query = _normalize(query)
+        if not query:
+            return None
+
+        ranked = self._rank(query)
+        if not ranked or ranked[0][0] == FUZZY:
+            return None
+        if ranked[0][0] == EXACT:
+            return self.names[ranked[0][2]]
+
+        best_tier = [entry for entry in ranked if entry[0] == ranked[0][0]]
+        return self.names[best_tier[0][2]] if len(best_tier) == 1 else None
@@ -0,0 +1,29 @@
+import asyncio
+import time
+
+class TokenBucket:
+    """Async token bucket: allows `rate` operations per second with bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: int = 1):
+        """Wait until `tokens` are available, then take them."""
+        tokens = min(tokens, self.capacity)
+
+        # The lock keeps waiters in FIFO order so large requests are not starved
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
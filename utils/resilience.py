@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit breaker is open."""
+
+def backoff_delay(attempt: int, base: float, maximum: float) -> float:
+    """Jittered exponential backoff delay for the given retry attempt."""
+    return min(maximum, base * (2 ** attempt)) * random.uniform(0.5, 1.0)
+
+class Deadline:
+    """A fixed point in time that a call and all of its retries must finish by."""
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def allows(self, delay: float) -> bool:
+        """True if waiting `delay` seconds still leaves time for another attempt."""
+        return delay < self.remaining()
+
+class CircuitBreaker:
+    """
+    Fails fast while a dependency is down. After `failure_threshold`
+    consecutive failures the circuit opens and calls raise CircuitOpenError
+    for `reset_timeout` seconds; then calls are let through again, and the
+    first failure re-opens it while a success closes it. Thread-safe, since
+    Calendar calls run in executor threads.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._half_open = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._half_open or time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half_open"
+            return "open"
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError(f"{self.name} is unavailable; try again shortly")
+            self._half_open = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._half_open = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._half_open or (self._opened_at is None and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self._half_open = False
+                metrics.inc("circuit_open", dependency=self.name)
+                logger.warning("Circuit opened: dependency=%s failures=%d", self.name, self._failures)
+
+async def call_with_retries(call: Callable[[], Awaitable[T]], *, name: str, deadline: Deadline,
+                            attempt_timeout: float, retryable: Callable[[Exception], bool],
+                            breaker: Optional[CircuitBreaker] = None, max_retries: int = 3,
+                            backoff_base: float = 1.0, backoff_max: float = 16.0) -> T:
+    """
+    Await `call()` with a per-attempt timeout, retrying timeouts and errors
+    that `retryable` accepts with jittered backoff until `deadline`. Only
+    those transient failures count against `breaker`; any other error means
+    the dependency answered, and is raised straight away.
+    """
+    for attempt in range(max_retries + 1):
+        if breaker is not None:
+            breaker.before_call()
+        timeout = min(attempt_timeout, deadline.remaining())
+        if timeout <= 0:
+            raise asyncio.TimeoutError(f"{name} deadline exceeded")
+
+        try:
+            result = await asyncio.wait_for(call(), timeout)
+        except Exception as e:
+            transient = isinstance(e, asyncio.TimeoutError) or retryable(e)
+            if breaker is not None and transient:
+                breaker.record_failure()
+            elif breaker is not None:
+                breaker.record_success()
+
+            delay = backoff_delay(attempt, backoff_base, backoff_max)
+            if not transient or attempt == max_retries or not deadline.allows(delay):
+                raise
+            metrics.inc("retries", dependency=name)
+            logger.warning("Retrying %s: attempt=%d error=%r retry_in=%.1fs", name, attempt + 1, e, delay)
+            await asyncio.sleep(delay)
+        else:
+            if breaker is not None:
+                breaker.record_success()
+            return result
+
+async def hedged(call: Callable[[], Awaitable[T]], hedge_after: Optional[float], name: str = "call") -> T:
+    """
+    Await `call()`; if it hasn't finished after `hedge_after` seconds, start
+    a second copy and return whichever succeeds first, cancelling the other.
+    Trades a little extra load for a shorter tail. No hedging when None.
+    """
+    if hedge_after is None:
+        return await call()
+
+    first = asyncio.ensure_future(call())
+    done, _ = await asyncio.wait({first}, timeout=hedge_after)
+    if done:
+        return first.result()
+
+    metrics.inc("hedged_requests", dependency=name)
+    pending = {first, asyncio.ensure_future(call())}
+    error: Optional[BaseException] = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
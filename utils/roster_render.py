@@ -0,0 +1,71 @@
+from typing import Dict, List
+
+import discord
+
+from shifts import DAYS
+
+# Discord limits: 25 fields and 6000 characters per embed, 1024 per field value
+FIELD_VALUE_LIMIT = 1024
+EMPLOYEES_PER_PAGE = 12
+PAGE_CHARACTER_BUDGET = 5000
+
+EMBED_COLOR = discord.Color.blurple()
+
+def _truncate(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+class RosterPages:
+    """
+    Pre-rendered embeds for one week: one per employee for /schedule and
+    the full roster split into pages for /roster. Built once per loaded
+    StoredWeek, so a new or changed upload (a new StoredWeek) starts fresh.
+    """
+
+    def __init__(self, week):
+        self.week_label = f"{week.week['From']} to {week.week['To']}"
+        self.employees: Dict[str, discord.Embed] = {}
+        summaries = []
+        for name in week.employees:
+            shifts = week.shifts.get(name, {})
+            self.employees[name] = self._employee_embed(name, shifts)
+            summaries.append((name, self._summary(shifts)))
+        self.pages = self._paginate(summaries)
+
+    def _employee_embed(self, name: str, shifts: dict) -> discord.Embed:
+        embed = discord.Embed(title=name, description=f"**Week:** {self.week_label}", color=EMBED_COLOR)
+        for day in DAYS:
+            day_shifts = shifts.get(day)
+            value = ", ".join(shift.format() for shift in day_shifts) if day_shifts else "Off"
+            embed.add_field(name=day, value=_truncate(value, FIELD_VALUE_LIMIT), inline=True)
+        return embed
+
+    @staticmethod
+    def _summary(shifts: dict) -> str:
+        """Compact week for one roster field: a line per working day."""
+        lines = [
+            f"**{day[:3]}** " + ", ".join(shift.format() for shift in shifts[day])
+            for day in DAYS if shifts.get(day)
+        ]
+        return _truncate("\n".join(lines) or "Off all week", FIELD_VALUE_LIMIT)
+
+    def _paginate(self, summaries: List[tuple]) -> List[discord.Embed]:
+        groups, current, size = [], [], 0
+        for name, summary in summaries:
+            name = _truncate(name, 256)
+            cost = len(name) + len(summary)
+            if current and (len(current) == EMPLOYEES_PER_PAGE or size + cost > PAGE_CHARACTER_BUDGET):
+                groups.append(current)
+                current, size = [], 0
+            current.append((name, summary))
+            size += cost
+        if current or not groups:
+            groups.append(current)
+
+        pages = []
+        for number, group in enumerate(groups, 1):
+            embed = discord.Embed(title="📋 Roster", description=f"**Week:** {self.week_label}", color=EMBED_COLOR)
+            for name, summary in group:
+                embed.add_field(name=name, value=summary, inline=True)
+            embed.set_footer(text=f"Page {number}/{len(groups)} · {len(summaries)} employees")
+            pages.append(embed)
+        return pages
@@ -0,0 +1,23 @@
+import os
+import sqlite3
+
+# How often stores look for writes made by other bot processes
+SHARED_STATE_POLL_SECONDS = 2.0
+
+# Writers from other processes hold the lock briefly; wait for them instead of failing
+BUSY_TIMEOUT_SECONDS = 10.0
+
+def connect_shared(path: str) -> sqlite3.Connection:
+    """
+    Open a SQLite database that several bot processes (one per group of
+    shards) use at once. WAL lets readers carry on while one process writes.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=BUSY_TIMEOUT_SECONDS)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+def data_version(conn: sqlite3.Connection) -> int:
+    """Counter that changes whenever another connection commits to the database."""
+    return conn.execute("PRAGMA data_version").fetchone()[0]